@@ -0,0 +1,250 @@
+"""
+End-to-end throughput of the run_hw* training loops on the stub environments.
+
+    python benchmarks/bench_e2e.py --steps 5000 --json results/e2e.json
+    python benchmarks/bench_e2e.py --loops hw3_dqn_atari hw4_mpc_cheetah --step_latency 0
+
+Every loop runs in its own process: the script's main()
+is called with a fixed command line, with the environments replaced by stubs
+(see stub_envs.py), the run shortened to about --steps environment steps, and
+logs written to a temporary directory. Reported per loop: wall time,
+environment steps (training and evaluation), env steps/sec and the peak RSS of
+the process. The "median" entry is seconds per env step, so the result file can
+be compared with run_benchmarks.py compare.
+"""
+import argparse
+import functools
+import importlib
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+
+
+def _hw1_argv(steps, tmp, hw_dir):
+    return [
+        "--expert_policy_file", os.path.join(hw_dir, "cs285/policies/experts/HalfCheetah.pkl"),
+        "--expert_data", os.path.join(hw_dir, "cs285/expert_data/expert_data_HalfCheetah-v4.pkl"),
+        "--env_name", "HalfCheetah-v4",
+        "--exp_name", "bench_e2e",
+        "--do_dagger",
+        "--n_iter", str(max(2, steps // 1000)),
+        "--batch_size", "1000",
+        "--eval_batch_size", "1000",
+        "--video_log_freq", "-1",
+    ]
+
+
+def _hw2_argv(steps, tmp, hw_dir):
+    return [
+        "--env_name", "HalfCheetah-v4",
+        "--exp_name", "bench_e2e",
+        "-n", str(max(1, steps // 1000)),
+        "--batch_size", "1000",
+        "--eval_batch_size", "400",
+        "--use_reward_to_go",
+        "--use_baseline",
+        "--video_log_freq", "-1",
+    ]
+
+
+def _hw3_argv(config_file):
+    def argv(steps, tmp, hw_dir):
+        return [
+            "-cfg", os.path.join(hw_dir, config_file),
+            "--eval_interval", str(steps),
+            "-neval", "1",
+            "--logdir", os.path.join(tmp, "logs"),
+            "--force_rerun",
+        ]
+
+    return argv
+
+
+def _hw4_argv(config_file):
+    def argv(steps, tmp, hw_dir):
+        return ["-cfg", os.path.join(hw_dir, config_file)]
+
+    return argv
+
+
+def _hw5_explore_argv(steps, tmp, hw_dir):
+    return [
+        "-cfg", os.path.join(hw_dir, "experiments/exploration/pointmass_easy_rnd.yaml"),
+        "--eval_interval", str(steps),
+        "--visualize_interval", str(steps),
+        "-neval", "1",
+        "--dataset_dir", os.path.join(tmp, "datasets"),
+    ]
+
+
+# name: (hw, script module, stub env, command line)
+LOOPS = {
+    "hw1_dagger": ("hw1", "run_hw1", "halfcheetah", _hw1_argv),
+    "hw2_pg": ("hw2", "run_hw2", "halfcheetah", _hw2_argv),
+    "hw3_dqn_atari": ("hw3", "run_hw3_dqn", "atari", _hw3_argv("experiments/dqn/mspacman.yaml")),
+    "hw3_sac": ("hw3", "run_hw3_sac", "halfcheetah", _hw3_argv("experiments/sac/halfcheetah_reparametrize.yaml")),
+    "hw4_mpc_cheetah": ("hw4", "run_hw4", "cheetah", _hw4_argv("experiments/mpc/halfcheetah_cem.yaml")),
+    "hw4_mpc_reacher": ("hw4", "run_hw4", "reacher", _hw4_argv("experiments/mpc/reacher_multi_iter.yaml")),
+    "hw5_explore": ("hw5", "run_hw5_explore", "pointmass", _hw5_explore_argv),
+}
+
+
+def _shorten(config: dict, steps: int, make_env):
+    """Points a config at the stub env and cuts the run down to about `steps` env steps."""
+    config["make_env"] = make_env
+    if "total_steps" in config:
+        config["total_steps"] = steps
+        for key in ("learning_starts", "random_steps", "training_starts"):
+            if key in config:
+                config[key] = min(config[key], steps // 10)
+    if "num_iters" in config:
+        # hw4: an initial random batch and one batch from the agent
+        config["num_iters"] = 2
+        config["initial_batch_size"] = config["batch_size"] = steps // 2
+        config["num_eval_trajectories"] = 0
+    return config
+
+
+def run_child(name: str, steps: int, step_latency, out: str):
+    hw, script, env_name, argv = LOOPS[name]
+    hw_dir = os.path.join(ROOT, hw)
+    scripts_dir = os.path.join(hw_dir, "cs285", "scripts")
+    sys.path[:0] = [hw_dir, scripts_dir, BENCH_DIR]
+
+    from stub_envs import StubEnv, make_stub_env
+
+    def make_env(*args, render=False, **kwargs):
+        return make_stub_env(env_name, step_latency)
+
+    # some scripts overwrite sys.path when imported, so import their dependencies first
+    import gym
+    import numpy
+    import torch
+    import tqdm
+    import cs285
+
+    if os.path.exists(os.path.join(scripts_dir, "scripting_utils.py")):
+        import scripting_utils
+    saved_path = list(sys.path)
+    module = importlib.import_module(script)
+    sys.path[:] = saved_path
+
+    tmp = tempfile.mkdtemp(prefix="bench_e2e_")
+    if hasattr(module, "make_config"):
+        make_config = module.make_config
+        module.make_config = lambda config_file: _shorten(make_config(config_file), steps, make_env)
+    if hasattr(module, "make_logger"):
+        module.make_logger = lambda *args, **kwargs: module.Logger(os.path.join(tmp, "logs"))
+    if hasattr(module, "record_run"):
+        module.record_run = lambda *args, **kwargs: None
+    if hw in ("hw1", "hw2"):
+        # these make their env with gym.make and log under data/
+        module.gym = types.SimpleNamespace(make=make_env, spaces=gym.spaces, Env=gym.Env)
+        run_training_loop = module.run_training_loop
+
+        def run_and_clean_up(params):
+            try:
+                return run_training_loop(params)
+            finally:
+                logdir = params["logdir"] if isinstance(params, dict) else params.logdir
+                shutil.rmtree(logdir, ignore_errors=True)
+
+        module.run_training_loop = run_and_clean_up
+    if hasattr(module, "expert_cache"):
+        # don't leave stub-env expert returns in hw1's real cache
+        module.expert_cache = types.SimpleNamespace(
+            expert_eval_returns=functools.partial(
+                module.expert_cache.expert_eval_returns, cache_dir=os.path.join(tmp, "expert_eval_cache")
+            )
+        )
+
+    sys.argv = [script] + argv(steps, tmp, hw_dir)
+    # run from the temporary directory, so files written relative to the
+    # working directory (e.g. hw5's exploration_visualization/) end up there
+    os.makedirs(os.path.join(tmp, "exploration_visualization"))
+    os.chdir(tmp)
+    start = time.perf_counter()
+    try:
+        module.main()
+    finally:
+        seconds = time.perf_counter() - start
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss = maxrss if sys.platform == "darwin" else maxrss * 1024
+    result = {
+        "seconds": seconds,
+        "env_steps": StubEnv.total_steps,
+        "env_steps_per_sec": StubEnv.total_steps / seconds,
+        "median": seconds / max(StubEnv.total_steps, 1),
+        "peak_rss_mb": peak_rss / 2**20,
+        "steps": steps,
+        "env": env_name,
+        "step_latency": step_latency,
+    }
+    with open(out, "w") as f:
+        json.dump(result, f)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--loops", type=str, nargs="*", default=list(LOOPS), choices=list(LOOPS))
+    parser.add_argument("--steps", type=int, default=5000)
+    parser.add_argument(
+        "--step_latency", type=float, default=None
+    )  # seconds of CPU per env step; default: the stub's estimate of the real env
+    parser.add_argument("--json", type=str, default=None)
+    parser.add_argument("--child", type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--child_out", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        run_child(args.child, args.steps, args.step_latency, args.child_out)
+        return
+
+    results = {}
+    failed = []
+    for name in args.loops:
+        print(f"========== {name} ==========", flush=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "result.json")
+            cmd = [sys.executable, os.path.abspath(__file__), "--child", name, "--child_out", out, "--steps", str(args.steps)]
+            if args.step_latency is not None:
+                cmd += ["--step_latency", str(args.step_latency)]
+            process = subprocess.run(cmd)
+            if process.returncode != 0 or not os.path.exists(out):
+                failed.append(name)
+                continue
+            with open(out, "r") as f:
+                results[f"e2e/{name}"] = json.load(f)
+
+    print(f"\n{'loop':30s} {'env steps':>10s} {'seconds':>9s} {'steps/sec':>10s} {'peak RSS':>10s}")
+    for name, result in results.items():
+        print(
+            f"{name:30s} {result['env_steps']:10d} {result['seconds']:9.1f} "
+            f"{result['env_steps_per_sec']:10.1f} {result['peak_rss_mb']:7.0f} MB"
+        )
+
+    if args.json is not None:
+        from run_benchmarks import collect_meta
+
+        if os.path.dirname(args.json):
+            os.makedirs(os.path.dirname(args.json), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump({"meta": collect_meta(), "results": results}, f, indent=2)
+    if failed:
+        print(f"[WARN] loops failed: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
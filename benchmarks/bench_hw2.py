@@ -0,0 +1,83 @@
+"""
+hw2 benchmarks: PGAgent.update at several batch sizes.
+
+    python benchmarks/bench_hw2.py [--filter "*pg*"] [--json out.json]
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "hw2"))
+
+from harness import Case, main
+
+import torch
+from cs285.agents.pg_agent import PGAgent
+from cs285.infrastructure import pytorch_util as ptu
+
+# (ob_dim, ac_dim, discrete, episode length) of the environments used in hw2
+ENVS = {
+    "cartpole": (4, 2, True, 200),
+    "halfcheetah": (17, 6, False, 1000),
+}
+
+
+def _trajectories(env, batch_size):
+    ob_dim, ac_dim, discrete, ep_len = ENVS[env]
+    obs, actions, rewards, terminals = [], [], [], []
+    collected = 0
+    while collected < batch_size:
+        length = min(ep_len, batch_size - collected)
+        obs.append(np.random.randn(length, ob_dim).astype(np.float32))
+        if discrete:
+            actions.append(np.random.randint(0, ac_dim, size=(length,)))
+        else:
+            actions.append(np.random.uniform(-1, 1, size=(length, ac_dim)).astype(np.float32))
+        rewards.append(np.random.randn(length).astype(np.float32))
+        terminal = np.zeros(length, dtype=bool)
+        terminal[-1] = True
+        terminals.append(terminal)
+        collected += length
+    return obs, actions, rewards, terminals
+
+
+def setup_pg_update(env, batch_size, baseline):
+    ob_dim, ac_dim, discrete, _ = ENVS[env]
+    agent = PGAgent(
+        ob_dim,
+        ac_dim,
+        discrete,
+        n_layers=2,
+        layer_size=64,
+        gamma=0.99,
+        learning_rate=5e-3,
+        use_baseline=baseline,
+        use_reward_to_go=True,
+        baseline_learning_rate=5e-3 if baseline else None,
+        baseline_gradient_steps=5 if baseline else None,
+        gae_lambda=0.95 if baseline else None,
+        normalize_advantages=True,
+    )
+    agent.to(ptu.device)
+    obs, actions, rewards, terminals = _trajectories(env, batch_size)
+    return (lambda: agent.update(obs, actions, rewards, terminals)), batch_size
+
+
+CASES = [
+    Case("hw2/pg/update", setup_pg_update, env="cartpole", batch_size=1000, baseline=False),
+    *[
+        Case("hw2/pg/update", setup_pg_update, env="halfcheetah", batch_size=b, baseline=True)
+        for b in (1000, 5000, 50000)
+    ],
+]
+
+
+def setup(args):
+    np.random.seed(0)
+    torch.manual_seed(0)
+    ptu.init_gpu(use_gpu=not args.no_gpu)
+
+
+if __name__ == "__main__":
+    main(CASES, setup)
@@ -0,0 +1,165 @@
+"""
+hw3 benchmarks: the Atari frame-stacking replay buffer, DQNAgent.update and
+SoftActorCritic.update with 1, 2 and 10 critics.
+
+    python benchmarks/bench_hw3.py [--filter "*sac*"] [--json out.json]
+"""
+import itertools
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "hw3"))
+
+from harness import Case, main
+
+import torch
+from cs285.agents.dqn_agent import DQNAgent
+from cs285.agents.soft_actor_critic import SoftActorCritic
+import cs285.env_configs
+from cs285.infrastructure import pytorch_util as ptu
+from cs285.infrastructure.replay_buffer import MemoryEfficientReplayBuffer
+
+ATARI_FRAME = (84, 84)
+ATARI_OBS = (4, 84, 84)
+
+
+def _random_batch(batch_size, observation_shape, observation_dtype, action_shape, action_dtype, num_actions=None):
+    def observations():
+        if observation_dtype == np.uint8:
+            return np.random.randint(0, 256, size=(batch_size, *observation_shape), dtype=np.uint8)
+        return np.random.randn(batch_size, *observation_shape).astype(observation_dtype)
+
+    if num_actions is not None:
+        actions = np.random.randint(0, num_actions, size=(batch_size, *action_shape)).astype(action_dtype)
+    else:
+        actions = np.random.uniform(-1, 1, size=(batch_size, *action_shape)).astype(action_dtype)
+    return ptu.from_numpy(
+        {
+            "observations": observations(),
+            "actions": actions,
+            "rewards": np.random.randn(batch_size).astype(np.float32),
+            "next_observations": observations(),
+            "dones": np.random.rand(batch_size) < 0.01,
+        }
+    )
+
+
+def _filled_atari_buffer(capacity, num_transitions, episode_len=1000):
+    buffer = MemoryEfficientReplayBuffer(frame_history_len=4, capacity=capacity)
+    frames = np.random.randint(0, 256, size=(64, *ATARI_FRAME), dtype=np.uint8)
+    for t in range(num_transitions):
+        if t % episode_len == 0:
+            buffer.on_reset(observation=frames[t % len(frames)])
+        buffer.insert(
+            action=np.array(t % 4, dtype=np.int64),
+            reward=np.array(1.0),
+            next_observation=frames[(t + 1) % len(frames)],
+            done=np.array(False),
+        )
+    return buffer, frames
+
+
+def setup_atari_buffer_insert(capacity):
+    buffer, frames = _filled_atari_buffer(capacity, 0)
+    buffer.on_reset(observation=frames[0])
+    counter = itertools.count()
+
+    def fn():
+        t = next(counter)
+        buffer.insert(
+            action=np.array(t % 4, dtype=np.int64),
+            reward=np.array(1.0),
+            next_observation=frames[t % len(frames)],
+            done=np.array(False),
+        )
+
+    return fn, 1
+
+
+def setup_atari_buffer_sample(capacity, batch_size):
+    buffer, _ = _filled_atari_buffer(capacity, min(capacity, 20000))
+    return (lambda: buffer.sample(batch_size)), batch_size
+
+
+def setup_dqn_update(config, batch_size):
+    if config == "atari":
+        config = cs285.env_configs.configs["dqn_atari"]("BreakoutNoFrameskip-v4", batch_size=batch_size)
+        observation_shape, observation_dtype, num_actions = ATARI_OBS, np.uint8, 4
+    else:
+        config = cs285.env_configs.configs["dqn_basic"]("LunarLander-v2", batch_size=batch_size)
+        observation_shape, observation_dtype, num_actions = (8,), np.float32, 4
+
+    agent = DQNAgent(observation_shape, num_actions, **config["agent_kwargs"])
+    agent.to(ptu.device)
+    batch = _random_batch(batch_size, observation_shape, observation_dtype, (), np.int64, num_actions)
+    step = itertools.count()
+
+    def fn():
+        agent.update(
+            batch["observations"],
+            batch["actions"],
+            batch["rewards"],
+            batch["next_observations"],
+            batch["dones"],
+            next(step),
+        )
+
+    return fn, batch_size
+
+
+def setup_sac_update(num_critics, batch_size):
+    # HalfCheetah-v4 shapes
+    observation_shape, action_dim = (17,), 6
+    config = cs285.env_configs.configs["sac"](
+        "HalfCheetah-v4",
+        batch_size=batch_size,
+        num_critic_networks=num_critics,
+        target_critic_backup_type="min" if num_critics > 1 else "mean",
+        actor_gradient_type="reparametrize",
+        use_soft_target_update=True,
+        soft_target_update_rate=0.005,
+    )
+    agent = SoftActorCritic(observation_shape, action_dim, **config["agent_kwargs"])
+    agent.to(ptu.device)
+    batch = _random_batch(batch_size, observation_shape, np.float32, (action_dim,), np.float32)
+    step = itertools.count()
+
+    def fn():
+        agent.update(
+            batch["observations"],
+            batch["actions"],
+            batch["rewards"],
+            batch["next_observations"],
+            batch["dones"],
+            next(step),
+        )
+
+    return fn, batch_size
+
+
+CASES = [
+    Case("hw3/atari_buffer/insert", setup_atari_buffer_insert, capacity=20000),
+    *[
+        Case("hw3/atari_buffer/sample", setup_atari_buffer_sample, capacity=20000, batch_size=b)
+        for b in (32, 256)
+    ],
+    Case("hw3/dqn/update", setup_dqn_update, config="basic", batch_size=128),
+    Case("hw3/dqn/update", setup_dqn_update, config="atari", batch_size=32),
+    *[
+        Case("hw3/sac/update", setup_sac_update, num_critics=n, batch_size=256)
+        for n in (1, 2, 10)
+    ],
+]
+
+
+def setup(args):
+    np.random.seed(0)
+    torch.manual_seed(0)
+    ptu.init_gpu(use_gpu=not args.no_gpu)
+    ptu.set_additional_args(args={"learning rate": 1e-3, "bird method": False})
+
+
+if __name__ == "__main__":
+    main(CASES, setup)
@@ -0,0 +1,113 @@
+"""
+hw4 benchmarks: ReplayBuffer insert / batched_insert / sample and
+ModelBasedAgent.get_action with the random-shooting, CEM and MPPI planners.
+
+    python benchmarks/bench_hw4.py [--filter "*get_action*"] [--json out.json]
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "hw4"))
+
+from harness import Case, main
+from stub_envs import CheetahStubEnv
+
+import torch
+from cs285.agents.model_based_agent import ModelBasedAgent
+import cs285.env_configs
+from cs285.infrastructure import pytorch_util as ptu
+from cs285.infrastructure.replay_buffer import ReplayBuffer
+
+# cheetah-cs285-v0 shapes
+OB_DIM = 21
+AC_DIM = 6
+
+
+def _transitions(n):
+    return {
+        "observations": np.random.randn(n, OB_DIM),
+        "actions": np.random.uniform(-1, 1, size=(n, AC_DIM)).astype(np.float32),
+        "rewards": np.random.randn(n),
+        "next_observations": np.random.randn(n, OB_DIM),
+        "dones": np.zeros(n, dtype=bool),
+    }
+
+
+def setup_buffer_insert(capacity):
+    buffer = ReplayBuffer(capacity)
+    data = _transitions(1)
+
+    def fn():
+        buffer.insert(
+            observation=data["observations"][0],
+            action=data["actions"][0],
+            reward=data["rewards"][0],
+            next_observation=data["next_observations"][0],
+            done=data["dones"][0],
+        )
+
+    return fn, 1
+
+
+def setup_buffer_batched_insert(capacity, batch_size):
+    buffer = ReplayBuffer(capacity)
+    data = _transitions(batch_size)
+    return (lambda: buffer.batched_insert(**data)), batch_size
+
+
+def setup_buffer_sample(capacity, batch_size):
+    buffer = ReplayBuffer(capacity)
+    buffer.batched_insert(**_transitions(min(capacity, 100000)))
+    return (lambda: buffer.sample(batch_size)), batch_size
+
+
+def setup_get_action(strategy, num_action_sequences, horizon):
+    planner_kwargs = {}
+    if strategy == "cem":
+        planner_kwargs = dict(cem_num_iters=4, cem_num_elites=5, cem_alpha=1.0)
+    config = cs285.env_configs.configs["mpc"](
+        "cheetah-cs285-v0",
+        "bench",
+        num_layers=2,
+        hidden_size=250,
+        mpc_horizon=horizon,
+        mpc_strategy=strategy,
+        mpc_num_action_sequences=num_action_sequences,
+        **planner_kwargs,
+    )
+    agent = ModelBasedAgent(CheetahStubEnv(), **config["agent_kwargs"])
+    agent.to(ptu.device)
+    data = _transitions(1000)
+    agent.update_statistics(data["observations"], data["actions"], data["next_observations"])
+    obs = data["observations"][0]
+    return (lambda: agent.get_action(obs)), 1
+
+
+CASES = [
+    Case("hw4/replay_buffer/insert", setup_buffer_insert, capacity=1000000),
+    *[
+        Case("hw4/replay_buffer/batched_insert", setup_buffer_batched_insert, capacity=1000000, batch_size=b)
+        for b in (1000, 50000)
+    ],
+    *[
+        Case("hw4/replay_buffer/sample", setup_buffer_sample, capacity=1000000, batch_size=b)
+        for b in (256, 4096)
+    ],
+    *[
+        Case("hw4/mpc/get_action", setup_get_action, strategy=s, num_action_sequences=1000, horizon=15)
+        for s in ("random", "cem", "mppi")
+    ],
+]
+
+
+def setup(args):
+    np.random.seed(0)
+    torch.manual_seed(0)
+    ptu.init_gpu(use_gpu=not args.no_gpu)
+    ptu.set_additional_args(args={"bird method": False})
+
+
+if __name__ == "__main__":
+    main(CASES, setup)
@@ -0,0 +1,155 @@
+"""
+Minimal benchmark harness shared by the bench_hw*.py suites.
+
+A suite is a list of Case objects. A case's setup(**params) builds whatever it
+needs (buffers, agents, batches) and returns the zero-argument function to
+time, or (fn, items) if each call processes `items` elements (transitions,
+samples, ...) so that a throughput can be reported too.
+
+Each case is warmed up, then timed in rounds of `number` calls, with `number`
+chosen so that a round takes at least a millisecond; timing continues until
+both min_rounds and min_time are reached. If CUDA is in use, every round ends
+with a synchronize, so asynchronous GPU work is charged to the case.
+"""
+import argparse
+import fnmatch
+import json
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class Case:
+    def __init__(self, name: str, setup: Callable, **params):
+        self.name = name
+        self.setup = setup
+        self.params = params
+
+    @property
+    def full_name(self) -> str:
+        if not self.params:
+            return self.name
+        return "{}[{}]".format(self.name, ",".join(f"{k}={v}" for k, v in self.params.items()))
+
+
+def _cuda_synchronize():
+    try:
+        import torch
+    except ImportError:
+        return
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+
+
+def time_fn(
+    fn: Callable,
+    min_time: float = 1.0,
+    min_rounds: int = 5,
+    max_rounds: int = 10000,
+    warmup: int = 3,
+    min_round_time: float = 1e-3,
+) -> dict:
+    """Per-call timing statistics (in seconds) of fn."""
+    for _ in range(warmup):
+        fn()
+    _cuda_synchronize()
+
+    # calibrate the number of calls per round
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        _cuda_synchronize()
+        if time.perf_counter() - start >= min_round_time or number >= 10**6:
+            break
+        number *= 10
+
+    times = []
+    start = time.perf_counter()
+    while len(times) < max_rounds and (len(times) < min_rounds or time.perf_counter() - start < min_time):
+        round_start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        _cuda_synchronize()
+        times.append((time.perf_counter() - round_start) / number)
+
+    return {
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "min": min(times),
+        "max": max(times),
+        "rounds": len(times),
+        "calls_per_round": number,
+    }
+
+
+def run_cases(
+    cases: List[Case],
+    patterns: Optional[List[str]] = None,
+    min_time: float = 1.0,
+    min_rounds: int = 5,
+    verbose: bool = True,
+) -> Dict[str, dict]:
+    results = {}
+    for case in cases:
+        name = case.full_name
+        if patterns and not any(fnmatch.fnmatch(name, p) for p in patterns):
+            continue
+        fn = case.setup(**case.params)
+        items = None
+        if isinstance(fn, tuple):
+            fn, items = fn
+        result = time_fn(fn, min_time=min_time, min_rounds=min_rounds)
+        result["params"] = case.params
+        result["ops_per_sec"] = 1.0 / result["median"]
+        if items is not None:
+            result["items"] = items
+            result["items_per_sec"] = items / result["median"]
+        results[name] = result
+        if verbose:
+            print(format_result(name, result), flush=True)
+    return results
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.3f} {unit}"
+    return f"{seconds / 1e-9:8.1f} ns"
+
+
+def format_result(name: str, result: dict) -> str:
+    line = f"{name:70s} {format_time(result['median'])}  (+- {100 * result['stdev'] / result['mean']:4.1f}%)"
+    if "items_per_sec" in result:
+        line += f"  {result['items_per_sec']:,.0f} items/s"
+    return line
+
+
+def main(cases: List[Case], setup: Optional[Callable] = None):
+    """Command line entry point of a bench_hw*.py suite."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--filter", "-k", type=str, nargs="*", default=None
+    )  # fnmatch patterns on the full case names, e.g. "*sample*"
+    parser.add_argument("--min_time", type=float, default=1.0)
+    parser.add_argument("--min_rounds", type=int, default=5)
+    parser.add_argument("--json", type=str, default=None)  # write the results here
+    parser.add_argument("--no_gpu", action="store_true")
+    parser.add_argument("--list", action="store_true")
+    args = parser.parse_args()
+
+    if args.list:
+        for case in cases:
+            print(case.full_name)
+        return
+
+    if setup is not None:
+        setup(args)
+    results = run_cases(cases, args.filter, args.min_time, args.min_rounds)
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+    sys.stdout.flush()
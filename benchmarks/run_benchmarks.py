@@ -0,0 +1,164 @@
+"""
+Runs the benchmark suites and compares result files.
+
+    # run every suite (each hw's cs285 package in its own process)
+    python benchmarks/run_benchmarks.py run --out results/base.json
+    python benchmarks/run_benchmarks.py run --suites hw3 --filter "*sac*" --out results/sac.json
+
+    # compare two runs; exits with 1 if a case got slower than the threshold
+    python benchmarks/run_benchmarks.py compare results/base.json results/new.json --threshold 0.1
+
+A result file holds {"meta": {...}, "results": {case name: stats}}, where the
+stats are per-call seconds (median, mean, stdev, min, max) plus ops_per_sec
+and, for cases that process a batch, items_per_sec.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from harness import format_time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SUITES = ["hw2", "hw3", "hw4"]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCH_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def collect_meta() -> dict:
+    meta = {
+        "time": time.strftime("%d-%m-%Y_%H-%M-%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+    try:
+        import numpy
+        import torch
+
+        meta["numpy"] = numpy.__version__
+        meta["torch"] = torch.__version__
+        meta["cuda"] = torch.cuda.get_device_name(0) if torch.cuda.is_available() else None
+        meta["torch_threads"] = torch.get_num_threads()
+    except ImportError:
+        pass
+    return meta
+
+
+def run(args) -> int:
+    results = {}
+    failed = []
+    for suite in args.suites:
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "results.json")
+            cmd = [
+                sys.executable,
+                os.path.join(BENCH_DIR, f"bench_{suite}.py"),
+                "--json",
+                out,
+                "--min_time",
+                str(args.min_time),
+                "--min_rounds",
+                str(args.min_rounds),
+            ]
+            if args.filter:
+                cmd += ["--filter", *args.filter]
+            if args.no_gpu:
+                cmd.append("--no_gpu")
+            print(f"========== {suite} ==========", flush=True)
+            # run from the hw directory, like the hw's own scripts
+            process = subprocess.run(cmd, cwd=os.path.join(BENCH_DIR, "..", suite))
+            if process.returncode != 0 or not os.path.exists(out):
+                failed.append(suite)
+                continue
+            with open(out, "r") as f:
+                results.update(json.load(f))
+
+    if args.out is not None:
+        if os.path.dirname(args.out):
+            os.makedirs(os.path.dirname(args.out), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump({"meta": collect_meta(), "results": results}, f, indent=2, default=str)
+        print(f"Wrote {len(results)} results to {args.out}")
+    if failed:
+        print(f"[WARN] suites failed: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+def compare(args) -> int:
+    with open(args.base, "r") as f:
+        base = json.load(f)
+    with open(args.new, "r") as f:
+        new = json.load(f)
+
+    print(f"base: {args.base} (commit {base['meta'].get('commit')}, {base['meta'].get('time')})")
+    print(f"new:  {args.new} (commit {new['meta'].get('commit')}, {new['meta'].get('time')})")
+    print(f"{'case':70s} {'base':>12s} {'new':>12s} {'speedup':>8s}")
+
+    regressions = []
+    for name in sorted(set(base["results"]) | set(new["results"])):
+        if name not in base["results"] or name not in new["results"]:
+            where = "new" if name in new["results"] else "base"
+            print(f"{name:70s} {'(only in ' + where + ')':>34s}")
+            continue
+        base_time = base["results"][name][args.stat]
+        new_time = new["results"][name][args.stat]
+        speedup = base_time / new_time
+        flag = ""
+        if new_time > base_time * (1 + args.threshold):
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif new_time < base_time / (1 + args.threshold):
+            flag = "  faster"
+        print(f"{name:70s} {format_time(base_time):>12s} {format_time(new_time):>12s} {speedup:7.2f}x{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} case(s) more than {100 * args.threshold:.0f}% slower")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run")
+    run_parser.add_argument("--suites", type=str, nargs="*", default=SUITES, choices=SUITES)
+    run_parser.add_argument("--filter", "-k", type=str, nargs="*", default=None)
+    run_parser.add_argument("--min_time", type=float, default=1.0)
+    run_parser.add_argument("--min_rounds", type=int, default=5)
+    run_parser.add_argument("--no_gpu", action="store_true")
+    run_parser.add_argument("--out", type=str, default=None)
+
+    compare_parser = subparsers.add_parser("compare")
+    compare_parser.add_argument("base", type=str)
+    compare_parser.add_argument("new", type=str)
+    compare_parser.add_argument(
+        "--threshold", type=float, default=0.1
+    )  # relative slowdown that counts as a regression
+    compare_parser.add_argument("--stat", type=str, default="median", choices=["median", "mean", "min"])
+
+    args = parser.parse_args()
+    sys.exit(run(args) if args.command == "run" else compare(args))
+
+
+if __name__ == "__main__":
+    main()
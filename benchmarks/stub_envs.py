@@ -0,0 +1,250 @@
+"""
+Deterministic, numpy-only stand-ins for the homework environments.
+
+Each stub has the observation / action spaces of the environment it replaces
+and burns a fixed, configurable amount of CPU per step (step_latency, in
+seconds), so the training loops can be benchmarked without MuJoCo, ALE ROMs or
+gym registration, and with a reproducible environment cost:
+
+    cheetah      cheetah-cs285-v0 (hw4)           Box(21,)  Box(6,)    1000 steps
+    reacher      reacher-cs285-v0 (hw4)           Box(20,)  Box(7,)     500 steps
+    halfcheetah  HalfCheetah-v4 (hw1, hw2, hw3)   Box(17,)  Box(6,)    1000 steps
+    atari        wrap_deepmind(...) (hw3)         4x84x84 uint8, Discrete(4)
+    pointmass    PointmassEasy-v0 (hw5)           Box(2,)   Discrete(5)  50 steps
+
+The stubs use the old gym API (reset() -> obs, step() -> obs, reward, done,
+info), fill info["episode"] at the end of an episode like
+RecordEpisodeStatistics, and mark time-limit ends with "TimeLimit.truncated".
+The cheetah and reacher stubs have get_reward(obs, acs) for the MPC planners,
+with the same form as the real environments' rewards.
+"""
+import time
+import types
+
+import gym
+import numpy as np
+
+
+class StubEnv(gym.Env):
+    metadata = {"render_modes": ["rgb_array"], "render_fps": 30}
+
+    # env steps taken by all stubs in this process, for throughput numbers
+    total_steps = 0
+
+    def __init__(
+        self,
+        name: str,
+        observation_space: gym.Space,
+        action_space: gym.Space,
+        max_episode_steps: int,
+        step_latency: float = 0.0,
+        seed: int = 0,
+    ):
+        self.name = name
+        self.observation_space = observation_space
+        self.action_space = action_space
+        self.max_episode_steps = max_episode_steps
+        self.spec = types.SimpleNamespace(id=f"stub-{name}", max_episode_steps=max_episode_steps)
+        self.step_latency = step_latency
+        self._rng = np.random.RandomState(seed)
+        self._state = None
+        self._t = 0
+        self._return = 0.0
+
+    @property
+    def env(self):
+        # scripts read env.env.metadata through the RecordEpisodeStatistics wrapper
+        return self
+
+    def _burn(self):
+        if self.step_latency > 0:
+            end = time.perf_counter() + self.step_latency
+            while time.perf_counter() < end:
+                pass
+
+    def _observation(self):
+        return self._state.copy()
+
+    def _next_state(self, action):
+        raise NotImplementedError
+
+    def _reward(self, action) -> float:
+        return 0.0
+
+    def reset(self, seed=None, **kwargs):
+        if seed is not None:
+            self._rng = np.random.RandomState(seed)
+        self._state = self._initial_state()
+        self._t = 0
+        self._return = 0.0
+        return self._observation()
+
+    def step(self, action):
+        self._burn()
+        self._state = self._next_state(action)
+        reward = float(self._reward(action))
+        self._t += 1
+        self._return += reward
+        StubEnv.total_steps += 1
+
+        info = {}
+        done = self._t >= self.max_episode_steps
+        if done:
+            info["TimeLimit.truncated"] = True
+            info["episode"] = {"r": self._return, "l": self._t}
+        return self._observation(), reward, done, info
+
+    def render(self, mode="rgb_array"):
+        return np.zeros((64, 64, 3), dtype=np.uint8)
+
+
+class _BoxStubEnv(StubEnv):
+    """Continuous control: a fixed random linear system with a bit of noise."""
+
+    def __init__(self, name, ob_dim, ac_dim, max_episode_steps, step_latency=0.0, seed=0):
+        super().__init__(
+            name,
+            gym.spaces.Box(low=-np.inf, high=np.inf, shape=(ob_dim,), dtype=np.float64),
+            gym.spaces.Box(low=-1.0, high=1.0, shape=(ac_dim,), dtype=np.float32),
+            max_episode_steps,
+            step_latency,
+            seed,
+        )
+        system = np.random.RandomState(1234)
+        self._A = np.eye(ob_dim) + 0.01 * system.randn(ob_dim, ob_dim)
+        self._B = 0.1 * system.randn(ob_dim, ac_dim)
+
+    def _initial_state(self):
+        return 0.1 * self._rng.randn(self.observation_space.shape[0])
+
+    def _next_state(self, action):
+        action = np.clip(np.asarray(action, dtype=np.float64).reshape(-1), -1.0, 1.0)
+        state = self._A @ self._state + self._B @ action + 0.01 * self._rng.randn(len(self._state))
+        return np.clip(state, -10.0, 10.0)
+
+    def _reward(self, action):
+        rewards, _ = self.get_reward(self._state, np.asarray(action))
+        return rewards[0]
+
+    def get_reward(self, observations, actions):
+        raise NotImplementedError
+
+
+class CheetahStubEnv(_BoxStubEnv):
+    def __init__(self, step_latency=0.0, seed=0):
+        super().__init__("cheetah", 21, 6, 1000, step_latency, seed)
+
+    def get_reward(self, observations, actions):
+        observations = np.atleast_2d(observations)
+        # run forward, penalize the front leg / shin like cheetah-cs285-v0
+        rewards = (
+            observations[:, 9]
+            - 10.0 * (observations[:, 6] > 0.2)
+            - 10.0 * (observations[:, 7] > 0)
+        )
+        return rewards, np.zeros(len(observations), dtype=bool)
+
+
+class ReacherStubEnv(_BoxStubEnv):
+    def __init__(self, step_latency=0.0, seed=0):
+        super().__init__("reacher", 20, 7, 500, step_latency, seed)
+
+    def get_reward(self, observations, actions):
+        observations = np.atleast_2d(observations)
+        actions = np.atleast_2d(actions)
+        # hand-to-target distance plus a control cost, like reacher-cs285-v0
+        distance = np.linalg.norm(observations[:, -6:-3] - observations[:, -3:], axis=1)
+        rewards = -distance - 0.01 * np.sum(actions**2, axis=1)
+        return rewards, np.zeros(len(observations), dtype=bool)
+
+
+class HalfCheetahStubEnv(_BoxStubEnv):
+    def __init__(self, step_latency=0.0, seed=0):
+        super().__init__("halfcheetah", 17, 6, 1000, step_latency, seed)
+
+    def get_reward(self, observations, actions):
+        observations = np.atleast_2d(observations)
+        actions = np.atleast_2d(actions)
+        rewards = observations[:, 8] - 0.1 * np.sum(actions**2, axis=1)
+        return rewards, np.zeros(len(observations), dtype=bool)
+
+
+class AtariStubEnv(StubEnv):
+    """4 stacked 84x84 uint8 frames; each step shifts in a new pseudo-random frame."""
+
+    def __init__(self, step_latency=0.0, seed=0, max_episode_steps=2000):
+        super().__init__(
+            "atari",
+            gym.spaces.Box(low=0, high=255, shape=(4, 84, 84), dtype=np.uint8),
+            gym.spaces.Discrete(4),
+            max_episode_steps,
+            step_latency,
+            seed,
+        )
+        self._frames = np.random.RandomState(1234).randint(0, 256, size=(32, 84, 84), dtype=np.uint8)
+
+    def _initial_state(self):
+        start = self._rng.randint(len(self._frames))
+        return np.stack([self._frames[(start + i) % len(self._frames)] for i in range(4)])
+
+    def _next_state(self, action):
+        frame = self._frames[(self._t * 7 + int(action)) % len(self._frames)]
+        return np.concatenate([self._state[1:], frame[None]], axis=0)
+
+    def _reward(self, action):
+        return float(self._rng.rand() < 0.05)
+
+
+class PointmassStubEnv(StubEnv):
+    """A point on the unit square moving in 5 discrete directions towards a goal corner."""
+
+    _moves = np.array([[0.0, 0.0], [0.1, 0.0], [-0.1, 0.0], [0.0, 0.1], [0.0, -0.1]])
+
+    def __init__(self, step_latency=0.0, seed=0):
+        super().__init__(
+            "pointmass",
+            gym.spaces.Box(low=np.array([0.0, 0.0]), high=np.array([1.0, 1.0]), dtype=np.float64),
+            gym.spaces.Discrete(5),
+            50,
+            step_latency,
+            seed,
+        )
+        self.num_actions = 5
+
+    def _initial_state(self):
+        return np.array([0.1, 0.1])
+
+    def _next_state(self, action):
+        state = self._state + self._moves[int(action)] + 0.01 * self._rng.randn(2)
+        return np.clip(state, 0.0, 1.0)
+
+    def _reward(self, action):
+        return float(np.linalg.norm(self._state - 0.9) < 0.1)
+
+    def plot_walls(self, ax):
+        ax.set_xlim(0, 1)
+        ax.set_ylim(0, 1)
+
+
+STUB_ENVS = {
+    "cheetah": CheetahStubEnv,
+    "reacher": ReacherStubEnv,
+    "halfcheetah": HalfCheetahStubEnv,
+    "atari": AtariStubEnv,
+    "pointmass": PointmassStubEnv,
+}
+
+# step cost of the real environments on a typical CPU, in seconds
+DEFAULT_STEP_LATENCY = {
+    "cheetah": 50e-6,
+    "reacher": 50e-6,
+    "halfcheetah": 50e-6,
+    "atari": 200e-6,
+    "pointmass": 10e-6,
+}
+
+
+def make_stub_env(name: str, step_latency=None, seed: int = 0, **kwargs) -> StubEnv:
+    if step_latency is None:
+        step_latency = DEFAULT_STEP_LATENCY[name]
+    return STUB_ENVS[name](step_latency=step_latency, seed=seed, **kwargs)
@@ -0,0 +1,66 @@
+"""
+On-disk cache of the expert policy's evaluation returns.
+
+The expert is fixed, so its average return for an (env, expert file, ep_len,
+eval_batch_size) combination only has to be measured once. Results are stored
+under data/expert_eval_cache/<key>.json; the key includes a hash of the expert
+file's contents, so a changed file is evaluated again.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from cs285.infrastructure import utils
+
+
+default_cache_dir = os.path.realpath(
+    os.path.join(os.path.dirname(__file__), "../../data/expert_eval_cache")
+)
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_key(env_name: str, expert_policy_file: str, ep_len: int, eval_batch_size: int) -> dict:
+    return {
+        "env_name": env_name,
+        "expert_policy_file": _file_hash(expert_policy_file),
+        "ep_len": ep_len,
+        "eval_batch_size": eval_batch_size,
+    }
+
+
+def expert_eval_returns(env, expert_policy, params: dict, cache_dir: str = default_cache_dir) -> list:
+    """
+    Returns of the expert's eval rollouts: read from the cache if present,
+    otherwise collected with utils.sample_trajectories_4expert and cached.
+    """
+    key = cache_key(
+        params["env_name"], params["expert_policy_file"], params["ep_len"], params["eval_batch_size"]
+    )
+    path = os.path.join(
+        cache_dir, hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16] + ".json"
+    )
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)["returns"]
+
+    expert_paths, envsteps = utils.sample_trajectories_4expert(
+        env, expert_policy, params["eval_batch_size"], params["ep_len"]
+    )
+    returns = [float(expert["reward"].sum()) for expert in expert_paths]
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # write to a temporary file first, so concurrent runs never read a partial entry
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, "w") as f:
+        json.dump({"key": key, "returns": returns, "envsteps": envsteps, "mean": float(np.mean(returns))}, f, indent=2)
+    os.replace(tmp_path, path)
+    return returns
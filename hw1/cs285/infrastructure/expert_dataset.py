@@ -0,0 +1,168 @@
+"""
+Columnar, memory-mapped expert datasets.
+
+A dataset is a directory with one .npy file per column (observation, action,
+reward, next_observation, terminal), holding the transitions of all episodes
+back to back, plus episode_offsets.npy (num_episodes + 1 row indices; episode
+i is rows offsets[i]:offsets[i + 1]) and meta.json. Columns are opened with
+np.load(mmap_mode='r'), so nothing is read until it is used.
+
+The expert pickles (a list of path dicts) are converted on first use and the
+result is cached under data/expert_datasets/; a cached conversion is redone
+when the pickle's size or modification time changes.
+
+    dataset = load_expert_dataset('cs285/expert_data/expert_data_Ant-v4.pkl')
+    len(dataset), dataset.num_episodes, dataset.episode(0)['reward']
+
+    # convert ahead of time
+    python cs285/infrastructure/expert_dataset.py cs285/expert_data/*.pkl
+"""
+import hashlib
+import json
+import os
+import pickle
+import shutil
+
+import numpy as np
+
+
+default_cache_dir = os.path.realpath(
+    os.path.join(os.path.dirname(__file__), "../../data/expert_datasets")
+)
+
+FORMAT_VERSION = 1
+COLUMNS = ["observation", "action", "reward", "next_observation", "terminal"]
+
+
+class ExpertDataset(object):
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+        assert self.meta["version"] == FORMAT_VERSION, (
+            'Unsupported expert dataset version {}'.format(self.meta["version"]))
+
+        self.episode_offsets = np.load(os.path.join(path, "episode_offsets.npy"))
+        self.columns = {
+            name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+            for name in self.meta["columns"]
+        }
+
+    def __len__(self):
+        return int(self.episode_offsets[-1])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def num_episodes(self):
+        return len(self.episode_offsets) - 1
+
+    def episode(self, i):
+        """Episode i as a path dict of memory-mapped views."""
+        start, end = self.episode_offsets[i], self.episode_offsets[i + 1]
+        return {name: column[start:end] for name, column in self.columns.items()}
+
+    def paths(self):
+        """All episodes as path dicts (views; nothing is copied)."""
+        return [self.episode(i) for i in range(self.num_episodes)]
+
+    def iter_chunks(self, chunk_size=65536, start=0):
+        """Yields dicts of column slices of at most chunk_size rows, from row `start` on."""
+        for chunk_start in range(start, len(self), chunk_size):
+            yield {
+                name: column[chunk_start:chunk_start + chunk_size]
+                for name, column in self.columns.items()
+            }
+
+
+def convert_paths(paths, out_dir, source=None):
+    """Writes a list of path dicts as a dataset at out_dir; returns the ExpertDataset."""
+    lengths = [len(path["reward"]) for path in paths]
+    offsets = np.zeros(len(paths) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(lengths)
+    columns = [name for name in COLUMNS if name in paths[0]]
+
+    # write next to the destination and move it in place when complete, so a
+    # crashed or concurrent conversion never leaves a partial dataset behind
+    tmp_dir = "{}.{}.tmp".format(out_dir.rstrip(os.sep), os.getpid())
+    os.makedirs(tmp_dir)
+    try:
+        meta = {"version": FORMAT_VERSION, "num_transitions": int(offsets[-1]),
+                "num_episodes": len(paths), "columns": {}, "source": source}
+        for name in columns:
+            first = np.asarray(paths[0][name])
+            column = np.lib.format.open_memmap(
+                os.path.join(tmp_dir, name + ".npy"), mode="w+",
+                dtype=first.dtype, shape=(int(offsets[-1]), *first.shape[1:]))
+            for path, start, end in zip(paths, offsets[:-1], offsets[1:]):
+                column[start:end] = path[name]
+            column.flush()
+            del column
+            meta["columns"][name] = {"dtype": first.dtype.str, "shape": list(first.shape[1:])}
+        np.save(os.path.join(tmp_dir, "episode_offsets.npy"), offsets)
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+
+        if os.path.exists(out_dir):
+            shutil.rmtree(out_dir)
+        os.replace(tmp_dir, out_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return ExpertDataset(out_dir)
+
+
+def _source_info(pickle_path):
+    stat = os.stat(pickle_path)
+    return {"path": os.path.realpath(pickle_path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def cached_dataset_dir(pickle_path, cache_dir=default_cache_dir):
+    real_path = os.path.realpath(pickle_path)
+    stem = os.path.splitext(os.path.basename(real_path))[0]
+    return os.path.join(cache_dir, "{}-{}".format(stem, hashlib.sha256(real_path.encode()).hexdigest()[:8]))
+
+
+def convert_pickle(pickle_path, out_dir=None, cache_dir=default_cache_dir):
+    """Converts an expert pickle (list of path dicts) to a dataset; returns the ExpertDataset."""
+    out_dir = out_dir or cached_dataset_dir(pickle_path, cache_dir)
+    with open(pickle_path, "rb") as f:
+        paths = pickle.load(f)
+    os.makedirs(os.path.dirname(out_dir), exist_ok=True)
+    return convert_paths(paths, out_dir, source=_source_info(pickle_path))
+
+
+def load_expert_dataset(path, cache_dir=default_cache_dir):
+    """
+    Opens the dataset at `path`: either a dataset directory, or an expert
+    pickle, which is converted on first use and cached in cache_dir.
+    """
+    if os.path.isdir(path):
+        return ExpertDataset(path)
+
+    out_dir = cached_dataset_dir(path, cache_dir)
+    if os.path.exists(os.path.join(out_dir, "meta.json")):
+        dataset = ExpertDataset(out_dir)
+        if dataset.meta.get("source") == _source_info(path):
+            return dataset
+        print('Expert data {} changed, converting it again...'.format(path))
+    else:
+        print('Converting expert data {} to {}...'.format(path, out_dir))
+    return convert_pickle(path, out_dir)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('pickles', type=str, nargs='+')
+    parser.add_argument('--out_dir', type=str, default=None)  # default: the cache used by load_expert_dataset
+    args = parser.parse_args()
+
+    for pickle_path in args.pickles:
+        out_dir = None
+        if args.out_dir is not None:
+            out_dir = os.path.join(args.out_dir, os.path.splitext(os.path.basename(pickle_path))[0])
+        dataset = convert_pickle(pickle_path, out_dir)
+        print('{}: {} episodes, {} transitions -> {}'.format(
+            pickle_path, dataset.num_episodes, len(dataset), dataset.path))
@@ -3,60 +3,131 @@ from cs285.infrastructure.utils import *
 
 class ReplayBuffer(object):
 
-    def __init__(self, max_size=1000000):
+    def __init__(self, max_size=1000000, keep_paths=False):
 
         self.max_size = max_size
 
-        # store each rollout
+        # number of transitions ever added; the next one goes to index
+        # size % max_size, overwriting the oldest once the buffer is full
+        self.size = 0
+
+        # store each rollout (only if asked for: the paths hold a second copy
+        # of every transition and are never evicted)
+        self.keep_paths = keep_paths
         self.paths = []
 
-        # store (concatenated) component arrays from each rollout
-        self.obs = None
-        self.acs = None
-        self.rews = None
-        self.next_obs = None
-        self.terminals = None
+        # preallocated component arrays, created on the first add_rollouts
+        self._obs = None
+        self._acs = None
+        self._rews = None
+        self._next_obs = None
+        self._terminals = None
+
+        # per-rollout reward arrays, for add_rollouts(..., concat_rew=False)
+        self._path_rews = []
 
     def __len__(self):
-        if self.obs:
-            return self.obs.shape[0]
-        else:
-            return 0
+        return min(self.size, self.max_size)
+
+    # The component arrays, restricted to the filled part of the buffer. These
+    # are views (no copy); once the buffer has wrapped around they are not in
+    # insertion order, which doesn't matter for sampling.
+
+    @property
+    def obs(self):
+        return None if self._obs is None else self._obs[:len(self)]
+
+    @property
+    def acs(self):
+        return None if self._acs is None else self._acs[:len(self)]
+
+    @property
+    def rews(self):
+        if self._path_rews:
+            return self._path_rews
+        return None if self._rews is None else self._rews[:len(self)]
+
+    @property
+    def next_obs(self):
+        return None if self._next_obs is None else self._next_obs[:len(self)]
+
+    @property
+    def terminals(self):
+        return None if self._terminals is None else self._terminals[:len(self)]
+
+    def _allocate(self, values):
+        return np.empty((self.max_size, *values.shape[1:]), dtype=values.dtype)
+
+    def _write(self, buffer, values):
+        # copy values into the ring starting at the current position, wrapping
+        # around at the end; O(len(values))
+        start = self.size % self.max_size
+        first = min(len(values), self.max_size - start)
+        buffer[start:start + first] = values[:first]
+        buffer[:len(values) - first] = values[first:]
 
     def add_rollouts(self, paths, concat_rew=True):
 
         # add new rollouts into our list of rollouts
-        for path in paths:
-            self.paths.append(path)
+        if self.keep_paths:
+            for path in paths:
+                self.paths.append(path)
 
-        # convert new rollouts into their component arrays, and append them onto
-        # our arrays
+        # convert new rollouts into their component arrays, and write them
+        # into the ring
         observations, actions, rewards, next_observations, terminals = (
             convert_listofrollouts(paths, concat_rew))
 
-        if self.obs is None:
-            self.obs = observations[-self.max_size:]
-            self.acs = actions[-self.max_size:]
-            self.rews = rewards[-self.max_size:]
-            self.next_obs = next_observations[-self.max_size:]
-            self.terminals = terminals[-self.max_size:]
-        else:
-            self.obs = np.concatenate([self.obs, observations])[-self.max_size:]
-            self.acs = np.concatenate([self.acs, actions])[-self.max_size:]
+        if self._obs is None:
+            self._obs = self._allocate(observations)
+            self._acs = self._allocate(actions)
+            self._next_obs = self._allocate(next_observations)
+            self._terminals = self._allocate(terminals)
+        if concat_rew and self._rews is None:
+            self._rews = self._allocate(rewards)
+
+        if len(observations) > self.max_size:
+            # only the newest max_size transitions would survive anyway
+            skip = len(observations) - self.max_size
+            observations = observations[skip:]
+            actions = actions[skip:]
+            next_observations = next_observations[skip:]
+            terminals = terminals[skip:]
             if concat_rew:
-                self.rews = np.concatenate(
-                    [self.rews, rewards]
-                )[-self.max_size:]
-            else:
-                if isinstance(rewards, list):
-                    self.rews += rewards
-                else:
-                    self.rews.append(rewards)
-                self.rews = self.rews[-self.max_size:]
-            self.next_obs = np.concatenate(
-                [self.next_obs, next_observations]
-            )[-self.max_size:]
-            self.terminals = np.concatenate(
-                [self.terminals, terminals]
-            )[-self.max_size:]
+                rewards = rewards[skip:]
+            self.size += skip
+
+        self._write(self._obs, observations)
+        self._write(self._acs, actions)
+        self._write(self._next_obs, next_observations)
+        self._write(self._terminals, terminals)
+        if concat_rew:
+            self._write(self._rews, rewards)
+        else:
+            self._path_rews += rewards
+            del self._path_rews[:-self.max_size]
+        self.size += len(observations)
+
+    def add_dataset(self, dataset, chunk_size=65536):
+        """
+        Adds the transitions of an ExpertDataset, reading its (memory-mapped)
+        columns in chunks instead of materializing them as paths.
+        """
+        columns = [
+            ('_obs', 'observation'),
+            ('_acs', 'action'),
+            ('_rews', 'reward'),
+            ('_next_obs', 'next_observation'),
+            ('_terminals', 'terminal'),
+        ]
+        for attr, name in columns:
+            if getattr(self, attr) is None:
+                setattr(self, attr, self._allocate(dataset[name]))
 
+        # only the newest max_size transitions would survive anyway
+        skip = max(len(dataset) - self.max_size, 0)
+        self.size += skip
+        for chunk in dataset.iter_chunks(chunk_size, start=skip):
+            for attr, name in columns:
+                self._write(getattr(self, attr), chunk[name])
+            self.size += len(chunk['observation'])
@@ -0,0 +1,93 @@
+"""
+Epoch-based minibatch sampling of (observation, action) pairs for training
+MLPPolicySL from a ReplayBuffer.
+
+The buffer's observations and actions are mirrored on ptu.device as float32
+tensors of max_size rows, allocated once; when transitions are added, only the
+rows written since the last sync are copied (the same ring positions as in
+ReplayBuffer._write), instead of converting every minibatch on the CPU. Each
+epoch draws one permutation of the buffer (on the device), and minibatches are
+consecutive slices of it, gathered by index, so taking a batch costs O(batch)
+instead of a permutation of the whole buffer.
+
+    sampler = EpochSampler(replay_buffer, batch_size=100)
+    replay_buffer.add_rollouts(paths)
+    sampler.refresh()  # optional: sample() refreshes a stale copy by itself
+    ob_batch, ac_batch = sampler.sample()
+"""
+import torch
+
+from cs285.infrastructure import pytorch_util as ptu
+from cs285.infrastructure.replay_buffer import ReplayBuffer
+
+
+class EpochSampler(object):
+
+    def __init__(self, replay_buffer: ReplayBuffer, batch_size: int):
+        self.replay_buffer = replay_buffer
+        self.batch_size = batch_size
+
+        # device mirrors of the buffer's ring (max_size rows), the filled part
+        # of them, and the buffer.size they are synced to
+        self._obs = None
+        self._acs = None
+        self.obs = None
+        self.acs = None
+        self._synced_size = 0
+
+        # current epoch: a permutation of the buffer and the position in it
+        self._perm = None
+        self._pos = 0
+        self.epoch = 0
+
+    def _allocate(self, values):
+        return torch.empty(
+            (self.replay_buffer.max_size, *values.shape[1:]), dtype=torch.float32, device=ptu.device
+        )
+
+    def _copy(self, mirror, values, start, count):
+        # copy rows start, start + 1, ... (count of them, wrapping around at
+        # max_size) of the buffer's ring to the device
+        first = min(count, self.replay_buffer.max_size - start)
+        mirror[start:start + first] = ptu.from_numpy(values[start:start + first])
+        if count > first:
+            mirror[:count - first] = ptu.from_numpy(values[:count - first])
+
+    def refresh(self):
+        """Copies the transitions added since the last sync to ptu.device."""
+        buffer = self.replay_buffer
+        if self._synced_size == buffer.size:
+            return
+        if self._obs is None:
+            self._obs = self._allocate(buffer.obs)
+            self._acs = self._allocate(buffer.acs)
+
+        new = buffer.size - self._synced_size
+        if new >= buffer.max_size:
+            # every row was overwritten since the last sync
+            start, new = 0, len(buffer)
+        else:
+            start = self._synced_size % buffer.max_size
+        self._copy(self._obs, buffer.obs, start, new)
+        self._copy(self._acs, buffer.acs, start, new)
+
+        self.obs = self._obs[:len(buffer)]
+        self.acs = self._acs[:len(buffer)]
+        self._synced_size = buffer.size
+        # the old permutation doesn't cover the new data: start a new epoch
+        self._perm = None
+
+    def _new_epoch(self):
+        self._perm = torch.randperm(len(self.replay_buffer), device=self._obs.device)
+        self._pos = 0
+        self.epoch += 1
+
+    def sample(self):
+        """Returns the next (observations, actions) minibatch, as float32 tensors on ptu.device."""
+        self.refresh()
+        if self._perm is None or self._pos + self.batch_size > len(self._perm):
+            # drop the incomplete tail of an epoch, so all batches have the same size
+            self._new_epoch()
+        ind = self._perm[self._pos:self._pos + self.batch_size]
+        self._pos += self.batch_size
+        return self.obs[ind], self.acs[ind]
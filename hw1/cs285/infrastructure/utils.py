@@ -11,6 +11,7 @@ import numpy as np
 import time,torch
 
 from cs285.infrastructure import pytorch_util as ptu
+from cs285.infrastructure import timers
 import gym
 from cs285.policies.MLP_policy import MLPPolicySL
 
@@ -42,7 +43,8 @@ def sample_trajectory(env:gym.Env, policy:
 
         # TODO: take that action and get reward and next ob
         # env.step(ac)
-        next_ob, rew, done, _ = env.step(ac.numpy())
+        with timers.phase('env_step'):
+            next_ob, rew, done, _ = env.step(ac.numpy())
         
         # TODO rollout can end due to done, or due to max_path_length
         steps += 1
@@ -113,7 +115,8 @@ def sample_trajectory_4expert(env:gym.Env, policy:
 
         # TODO: take that action and get reward and next ob
         # env.step(ac)
-        next_ob, rew, done, _ = env.step(ac.numpy())
+        with timers.phase('env_step'):
+            next_ob, rew, done, _ = env.step(ac.numpy())
         
         # TODO rollout can end due to done, or due to max_path_length
         steps += 1
@@ -173,6 +176,26 @@ def sample_n_trajectories(env, policy, ntraj, max_path_length, render=False):
 ########################################
 
 
+def relabel_with_expert(paths, expert_policy, chunk_size=10000):
+    """
+        Replace each path's actions with the expert's actions for its observations.
+        All observations go through the expert in one batch, split into chunks
+        of at most chunk_size rows to bound memory.
+    """
+    observations = np.concatenate([path["observation"] for path in paths])
+    actions = []
+    with torch.no_grad():
+        for start in range(0, len(observations), chunk_size):
+            chunk = ptu.from_numpy(observations[start:start + chunk_size].astype(np.float32))
+            actions.append(ptu.to_numpy(expert_policy(chunk)))
+    actions = np.concatenate(actions)
+
+    ends = np.cumsum([len(path["observation"]) for path in paths])
+    for path, path_actions in zip(paths, np.split(actions, ends[:-1])):
+        path["action"] = path_actions
+    return paths
+
+
 def convert_listofrollouts(paths, concat_rew=True):
     """
         Take a list of rollout dictionaries
@@ -5,7 +5,6 @@ Functions to edit:
     1. run_training_loop
 """
 
-import pickle
 import os
 import time
 import gym
@@ -18,8 +17,12 @@ sys.path.append('./cs285')
 sys.path.append('./cs285/infrastructure')
 from cs285.infrastructure import pytorch_util as ptu
 from cs285.infrastructure import utils
+from cs285.infrastructure import expert_cache
+from cs285.infrastructure.expert_dataset import load_expert_dataset
 from cs285.infrastructure.logger import Logger
+from cs285.infrastructure import timers
 from cs285.infrastructure.replay_buffer import ReplayBuffer
+from cs285.infrastructure.sampler import EpochSampler
 from cs285.policies.MLP_policy import MLPPolicySL
 from cs285.policies.loaded_gaussian_policy import LoadedGaussianPolicy
 
@@ -97,6 +100,7 @@ def run_training_loop(params):
 
     # replay buffer
     replay_buffer = ReplayBuffer(params['max_replay_buffer_size'])
+    sampler = EpochSampler(replay_buffer, params['train_batch_size'])
 
     #######################
     ## LOAD EXPERT POLICY
@@ -127,7 +131,9 @@ def run_training_loop(params):
         print("\nCollecting data to be used for training...")
         if itr == 0:
             # BC training from expert data.
-            paths = pickle.load(open(params['expert_data'], 'rb'))
+            # (memory-mapped; a pickle is converted on first use and cached)
+            expert_dataset = load_expert_dataset(params['expert_data'])
+            paths = expert_dataset.paths()
             envsteps_this_batch = 0
             # print('paths',paths)
         else:
@@ -136,7 +142,8 @@ def run_training_loop(params):
             # TODO: collect `params['batch_size']` transitions
             # HINT: use utils.sample_trajectories
             # TODO: implement missing parts of utils.sample_trajectory
-            paths, envsteps_this_batch = utils.sample_trajectories(env,actor,params['batch_size'],params['ep_len'])
+            with timers.phase('collect'):
+                paths, envsteps_this_batch = utils.sample_trajectories(env,actor,params['batch_size'],params['ep_len'])
             # relabel the collected obs with actions from a provided expert policy
             if params['do_dagger']:
                 print("\nRelabelling collected observations with labels from an expert policy...")
@@ -144,13 +151,21 @@ def run_training_loop(params):
                 # HINT: query the policy (using the get_action function) with paths[i]["observation"]
                 # and replace paths[i]["action"] with these expert labels
                 # print([path['observation'].shape for path in paths])
-                for i,path in enumerate(paths):
-                    ac = expert_policy.get_action(path['observation'])
-                    paths[i]['action'] = ac
+                # (all paths in one batched, chunked forward pass)
+                with timers.phase('relabel'):
+                    paths = utils.relabel_with_expert(paths, expert_policy)
 
         total_envsteps += envsteps_this_batch
+        timers.count('env_steps', envsteps_this_batch)
         # add collected data to replay buffer
-        replay_buffer.add_rollouts(paths)
+        with timers.phase('insert'):
+            if itr == 0:
+                replay_buffer.add_dataset(expert_dataset)
+            else:
+                replay_buffer.add_rollouts(paths)
+        # copy the buffer to the device once per iteration, not once per batch
+        with timers.phase('h2d'):
+            sampler.refresh()
 
         # train agent (using sampled data from replay buffer)
         print('\nTraining agent using sampled data from replay buffer...')
@@ -161,14 +176,14 @@ def run_training_loop(params):
           # HINT2: use np.random.permutation to sample random indices
           # HINT3: return corresponding data points from each array (i.e., not different indices from each array)
           # for imitation learning, we only need observations and actions.  
-          length = len(replay_buffer.acs)
-          ind = np.random.permutation(length)[:params['train_batch_size']]
-          ac_batch,ob_batch = replay_buffer.acs[ind],replay_buffer.obs[ind]
-          ob_batch = torch.from_numpy(ob_batch).float()
-          ac_batch = torch.from_numpy(ac_batch).float()
+          # (one permutation per epoch over the device copy of the buffer)
+          with timers.phase('sample'):
+            ob_batch, ac_batch = sampler.sample()
 
           # use the sampled data to train an agent
-          train_log = actor.update(ob_batch, ac_batch)
+          with timers.phase('update'):
+            train_log = actor.update(ob_batch, ac_batch)
+          timers.count('updates')
           training_logs.append(train_log)
 
         # log/save
@@ -190,12 +205,13 @@ def run_training_loop(params):
         if log_metrics:
             # save eval metrics
             print("\nCollecting data for eval...")
-            eval_paths, eval_envsteps_this_batch = utils.sample_trajectories(
-                env, actor, params['eval_batch_size'], params['ep_len'])
+            with timers.phase('eval'):
+                eval_paths, eval_envsteps_this_batch = utils.sample_trajectories(
+                    env, actor, params['eval_batch_size'], params['ep_len'])
 
-            expert_paths, eval_envsteps_this_batch = utils.sample_trajectories_4expert(
-                env, expert_policy, params['eval_batch_size'], params['ep_len'])
-            print('Expert :',np.mean([expert["reward"].sum() for expert in expert_paths]))
+                # the expert doesn't change: its returns are measured once and cached on disk
+                expert_returns = expert_cache.expert_eval_returns(env, expert_policy, params)
+            print('Expert :',np.mean(expert_returns))
 
             logs = utils.compute_metrics(paths, eval_paths)
             # compute additional metrics
@@ -209,6 +225,7 @@ def run_training_loop(params):
             for key, value in logs.items():
                 print('{} : {}'.format(key, value))
                 logger.log_scalar(value, key, itr)
+            timers.log(logger, itr)
             print('Done logging...\n\n')
 
             logger.flush()
@@ -222,7 +239,7 @@ def main():
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('--expert_policy_file', '-epf', type=str, required=True)  # relative to where you're running this script from
-    parser.add_argument('--expert_data', '-ed', type=str, required=True) #relative to where you're running this script from
+    parser.add_argument('--expert_data', '-ed', type=str, required=True) #relative to where you're running this script from; an expert pickle or a converted dataset directory
     parser.add_argument('--env_name', '-env', type=str, help=f'choices: {", ".join(MJ_ENV_NAMES)}', required=True)
     parser.add_argument('--exp_name', '-exp', type=str, default='pick an experiment name', required=True)
     parser.add_argument('--do_dagger', action='store_true')
@@ -248,7 +265,10 @@ def main():
     parser.add_argument('--max_replay_buffer_size', type=int, default=1000000)
     parser.add_argument('--save_params', action='store_true')
     parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--time_phases', action='store_true')  # log per-phase timings and env-steps/updates per second
     args = parser.parse_args()
+    if args.time_phases:
+        timers.enable()
 
     # convert args to dictionary
     params = vars(args)
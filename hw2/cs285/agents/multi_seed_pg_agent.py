@@ -0,0 +1,211 @@
+from typing import List, Optional, Sequence
+import itertools
+import numpy as np
+import torch
+
+from cs285.infrastructure import pytorch_util as ptu
+from cs285.infrastructure import discounting
+from torch import nn
+from torch import optim
+
+
+class MultiSeedPGAgent(nn.Module):
+    """
+    `num_seeds` independent copies of PGAgent, trained together in one process.
+
+    The networks of all seeds are stacked (see ptu.StackedMLP), so acting and
+    every gradient step is one batched forward/backward for all seeds. Seed k's
+    loss only depends on slice k of the weights, so the gradient of the summed
+    loss is each seed's own gradient, and one Adam over the stacked parameters
+    behaves exactly like one Adam per seed (Adam is elementwise).
+
+    Data for seed k is always passed at index k; the seeds' batches can have
+    different sizes and are padded and masked internally.
+
+    If `seeds` is given, seed k's networks are initialized and its actions
+    sampled from its own torch.Generator seeded with seeds[k], so each seed's
+    run doesn't depend on which other seeds are trained alongside it.
+    Otherwise everything is drawn from the global torch RNG.
+    """
+
+    def __init__(
+        self,
+        num_seeds: int,
+        ob_dim: int,
+        ac_dim: int,
+        discrete: bool,
+        n_layers: int,
+        layer_size: int,
+        gamma: float,
+        learning_rate: float,
+        use_baseline: bool,
+        use_reward_to_go: bool,
+        baseline_learning_rate: Optional[float],
+        baseline_gradient_steps: Optional[int],
+        gae_lambda: Optional[float],
+        normalize_advantages: bool,
+        seeds: Optional[Sequence[int]] = None,
+    ):
+        super().__init__()
+        self.num_seeds = num_seeds
+        self.discrete = discrete
+
+        if seeds is None:
+            self.generators = None
+        else:
+            assert len(seeds) == num_seeds
+            self.generators = [torch.Generator().manual_seed(seed) for seed in seeds]
+
+        # create the actor (policy) networks
+        if discrete:
+            self.logits_net = ptu.build_stacked_mlp(
+                num_seeds, ob_dim, ac_dim, n_layers=n_layers, size=layer_size,
+                generators=self.generators,
+            )
+            actor_parameters = self.logits_net.parameters()
+        else:
+            self.mean_net = ptu.build_stacked_mlp(
+                num_seeds, ob_dim, ac_dim, n_layers=n_layers, size=layer_size,
+                generators=self.generators,
+            )
+            self.logstd = nn.Parameter(
+                torch.zeros(num_seeds, 1, ac_dim, dtype=torch.float32, device=ptu.device)
+            )
+            actor_parameters = itertools.chain([self.logstd], self.mean_net.parameters())
+        self.actor_optimizer = optim.Adam(actor_parameters, learning_rate)
+
+        # create the critic (baseline) networks, if needed
+        if use_baseline:
+            self.critic_net = ptu.build_stacked_mlp(
+                num_seeds, ob_dim, 1, n_layers=n_layers, size=layer_size,
+                generators=self.generators,
+            )
+            self.critic_optimizer = optim.Adam(
+                self.critic_net.parameters(), baseline_learning_rate
+            )
+            self.baseline_gradient_steps = baseline_gradient_steps
+        else:
+            self.critic_net = None
+
+        # other agent parameters
+        self.gamma = gamma
+        self.use_reward_to_go = use_reward_to_go
+        self.gae_lambda = gae_lambda
+        self.normalize_advantages = normalize_advantages
+
+    def action_distribution(self, obs: torch.Tensor) -> torch.distributions.Distribution:
+        """obs: (num_seeds, batch_size, ob_dim)"""
+        if self.discrete:
+            return torch.distributions.Categorical(logits=self.logits_net(obs))
+        else:
+            return torch.distributions.Normal(self.mean_net(obs), torch.exp(self.logstd))
+
+    @torch.no_grad()
+    def get_action(self, obs: np.ndarray) -> np.ndarray:
+        """Takes one observation per seed, (num_seeds, ob_dim), and returns one action per seed."""
+        obs = ptu.from_numpy(obs)[:, None]
+        distribution = self.action_distribution(obs)
+        if self.generators is None:
+            return ptu.to_numpy(distribution.sample()[:, 0])
+
+        # draw each seed's action from its own generator (on the CPU, where the
+        # generators live)
+        if self.discrete:
+            probs = distribution.probs[:, 0].cpu()
+            return np.array([
+                torch.multinomial(probs[k], 1, generator=generator).item()
+                for k, generator in enumerate(self.generators)
+            ])
+        else:
+            noise = torch.stack([
+                torch.randn(distribution.mean.shape[1:], generator=generator)
+                for generator in self.generators
+            ]).to(ptu.device)
+            return ptu.to_numpy((distribution.mean + distribution.stddev * noise)[:, 0])
+
+    def _pad(self, arrays: Sequence[np.ndarray]) -> torch.Tensor:
+        """Stacks one array per seed into (num_seeds, max_len, ...), zero-padded."""
+        max_len = max(len(a) for a in arrays)
+        padded = np.zeros((len(arrays), max_len, *arrays[0].shape[1:]), dtype=np.float32)
+        for k, a in enumerate(arrays):
+            padded[k, : len(a)] = a
+        return ptu.from_numpy(padded)
+
+    def update(
+        self,
+        obs: Sequence[Sequence[np.ndarray]],
+        actions: Sequence[Sequence[np.ndarray]],
+        rewards: Sequence[Sequence[np.ndarray]],
+        terminals: Sequence[Sequence[np.ndarray]],
+    ) -> List[dict]:
+        """Same as PGAgent.update, with one list of trajectories per seed. Returns one info dict per seed."""
+        assert len(obs) == self.num_seeds
+
+        # step 1: flatten each seed's trajectories and calculate its Q values
+        dones = [discounting.dones_from_lengths([len(r) for r in seed_rewards]) for seed_rewards in rewards]
+        obs = [np.concatenate(seed_obs, axis=0) for seed_obs in obs]
+        actions = [np.concatenate(seed_actions, axis=0) for seed_actions in actions]
+        rewards = [np.concatenate(seed_rewards, axis=0) for seed_rewards in rewards]
+        if self.use_reward_to_go:
+            q_values = [discounting.discounted_reward_to_go(r, d, self.gamma) for r, d in zip(rewards, dones)]
+        else:
+            q_values = [discounting.discounted_return(r, d, self.gamma) for r, d in zip(rewards, dones)]
+
+        lengths = torch.tensor([len(r) for r in rewards], dtype=torch.float32, device=ptu.device)
+        obs_t = self._pad(obs)
+        mask = (
+            torch.arange(obs_t.shape[1], device=ptu.device)[None] < lengths[:, None]
+        ).float()
+
+        # step 2: calculate advantages from Q values
+        if self.critic_net is None:
+            advantages = q_values
+        else:
+            with torch.no_grad():
+                values = ptu.to_numpy(self.critic_net(obs_t).squeeze(-1))
+            values = [values[k, : len(rewards[k])] for k in range(self.num_seeds)]
+            if self.gae_lambda is None:
+                advantages = [q - v for q, v in zip(q_values, values)]
+            else:
+                advantages = [
+                    discounting.generalized_advantage_estimate(r, v, d, self.gamma, self.gae_lambda)
+                    for r, v, d in zip(rewards, values, dones)
+                ]
+        if self.normalize_advantages:
+            advantages = [(a - a.mean()) / a.std() for a in advantages]
+
+        # step 3: update all actors at once
+        actions_t = self._pad(actions)
+        advantages_t = self._pad(advantages) * mask
+        log_probs = self.action_distribution(obs_t).log_prob(
+            actions_t.long() if self.discrete else actions_t
+        )
+        if self.discrete:
+            # mean over each seed's batch, as in MLPPolicyPG
+            actor_losses = -(log_probs * advantages_t).sum(dim=1) / lengths
+        else:
+            # sum over each seed's batch, as in MLPPolicyPG
+            actor_losses = -(log_probs * advantages_t[..., None]).sum(dim=(1, 2))
+        self.actor_optimizer.zero_grad()
+        actor_losses.sum().backward()
+        self.actor_optimizer.step()
+
+        infos = [{"Actor Loss": loss} for loss in ptu.to_numpy(actor_losses)]
+
+        # step 4: if needed, update all critics/baselines at once
+        if self.critic_net is not None:
+            q_values_t = self._pad(q_values)
+            critic_losses_sum = torch.zeros(self.num_seeds, device=ptu.device)
+            for _ in range(self.baseline_gradient_steps):
+                critic_losses = (
+                    ((self.critic_net(obs_t).squeeze(-1) - q_values_t) ** 2) * mask
+                ).sum(dim=1) / lengths
+                self.critic_optimizer.zero_grad()
+                critic_losses.sum().backward()
+                self.critic_optimizer.step()
+                critic_losses_sum += critic_losses.detach()
+            critic_losses = ptu.to_numpy(critic_losses_sum / self.baseline_gradient_steps)
+            for info, loss in zip(infos, critic_losses):
+                info["Baseline Loss"] = loss
+
+        return infos
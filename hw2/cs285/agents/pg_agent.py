@@ -5,6 +5,7 @@ import torch
 from cs285.networks.policies import MLPPolicyPG
 from cs285.networks.critics import ValueCritic
 from cs285.infrastructure import pytorch_util as ptu
+from cs285.infrastructure import discounting
 from torch import nn
 
 
@@ -61,22 +62,23 @@ class PGAgent(nn.Module):
         total number of samples across all trajectories (i.e. the sum of the lengths of all the arrays).
         """
 
-        # step 1: calculate Q values of each (s_t, a_t) point, using rewards (r_0, ..., r_t, ..., r_T)
-        # rewards = np.concatenate(tuple(rewards),axis=0)
-        # print(rewards.shape) # [batch,]
-        q_values: Sequence[np.ndarray] = self._calculate_q_vals(rewards)
-
         # TODO: flatten the lists of arrays into single arrays, so that the rest of the code can be written in a vectorized
         # way. obs, actions, rewards, terminals, and q_values should all be arrays with a leading dimension of `batch_size`
         # beyond this point.
+        # `dones` marks the last step of every trajectory (whether or not the env terminated there), and is what the
+        # discounted sums below use to find trajectory boundaries.
+        dones = discounting.dones_from_lengths([len(r) for r in rewards]) # [batch,]
         obs = np.concatenate(obs,axis=0) # [batch,4]
         actions = np.concatenate(actions,axis=0) # [batch,]
         terminals = np.concatenate(terminals,axis=0) # [batch,]
         rewards = np.concatenate(rewards,axis=0) # [batch,]
 
+        # step 1: calculate Q values of each (s_t, a_t) point, using rewards (r_0, ..., r_t, ..., r_T)
+        q_values: np.ndarray = self._calculate_q_vals(rewards, dones)
+
         # step 2: calculate advantages from Q values
         advantages: np.ndarray = self._estimate_advantage(
-            obs, rewards, q_values, terminals
+            obs, rewards, q_values, dones
         )
 
         # step 3: use all datapoints (s_t, a_t, adv_t) to update the PG actor/policy
@@ -101,19 +103,22 @@ class PGAgent(nn.Module):
 
         return info
 
-    def _calculate_q_vals(self, rewards: Sequence[np.ndarray]) -> Sequence[np.ndarray]:
-        """Monte Carlo estimation of the Q function."""
+    def _calculate_q_vals(self, rewards: np.ndarray, dones: np.ndarray) -> np.ndarray:
+        """Monte Carlo estimation of the Q function.
+
+        Operates on flat 1D NumPy arrays.
+        """
         if not self.use_reward_to_go:
             # Case 1: in trajectory-based PG, we ignore the timestep and instead use the discounted return for the entire
             # trajectory at each point.
             # In other words: Q(s_t, a_t) = sum_{t'=0}^T gamma^t' r_{t'}
             # TODO: use the helper function self._discounted_return to calculate the Q-values
-            q_values = self._discounted_return(rewards)
+            q_values = self._discounted_return(rewards, dones)
         else:
             # Case 2: in reward-to-go PG, we only use the rewards after timestep t to estimate the Q-value for (s_t, a_t).
             # In other words: Q(s_t, a_t) = sum_{t'=t}^T gamma^(t'-t) * r_{t'}
             # TODO: use the helper function self._discounted_reward_to_go to calculate the Q-values
-            q_values = self._discounted_reward_to_go(rewards)
+            q_values = self._discounted_reward_to_go(rewards, dones)
 
         return q_values
 
@@ -144,71 +149,30 @@ class PGAgent(nn.Module):
                 advantages = q_values - values
             else:
                 # TODO: implement GAE
-                batch_size = obs.shape[0]
-
-                # HINT: append a dummy T+1 value for simpler recursive calculation
-                values = np.append(values, [0])
-                advantages = np.zeros(batch_size + 1)
-                # print('terminals',[x for x in terminals])
-                # deltas = rewards + self.gamma * values[1:]*(1-terminals) - values[:-1]
-                # for i in reversed(range(batch_size)):
-                #     # TODO: recursively compute advantage estimates starting from timestep T.
-                #     # HINT: use terminals to handle edge cases. terminals[i] is 1 if the state is the last in its
-                    # # trajectory, and 0 otherwise.
-                    # advantages[i]=(advantages[i+1]*(self.gae_lambda*self.gamma))*(1-terminals[i])+deltas[i]
-                indices = [i+1 for (i,x) in enumerate(terminals) if x>0.9] # don't off by one!!!
-                indices = [0]+indices+[batch_size]
-                l = []
-                for i,begin_point in enumerate(indices[:-1]):
-                    stop_point = indices[i+1]
-                    leng = stop_point-begin_point
-                    slice_value = values[begin_point:stop_point+1]
-                    slice_value[-1]=0
-                    slice_r = rewards[begin_point:stop_point]
-                    delta = slice_r + self.gamma * slice_value[1:] - slice_value[:-1]
-                    if abs(self.gae_lambda)>1e-4:
-                        reverse_a = np.cumsum(((self.gae_lambda*self.gamma)**(-np.arange(0,leng)))*delta[::-1])
-                        a = (reverse_a*((self.gae_lambda*self.gamma)**(np.arange(0,leng))))[::-1]
-                        l.append(a)
-                    else:
-                        l.append(delta)
-                # remove dummy advantage
-                advantages = np.concatenate(l,axis=0)
-                # advantages = advantages[:-1]
+                # terminals[i] is 1 if the state is the last in its trajectory, and 0 otherwise; the value after the
+                # last state is taken to be 0.
+                advantages = discounting.generalized_advantage_estimate(
+                    rewards, values, terminals, self.gamma, self.gae_lambda
+                )
 
         # TODO: normalize the advantages to have a mean of zero and a standard deviation of one within the batch
         if self.normalize_advantages:
             advantages = (advantages - advantages.mean())/advantages.std()
         return advantages
 
-    def _discounted_return(self, rewards: Sequence[float]) -> Sequence[float]:
+    def _discounted_return(self, rewards: np.ndarray, dones: np.ndarray) -> np.ndarray:
         """
-        Helper function which takes a list of rewards {r_0, r_1, ..., r_t', ... r_T} and returns
-        a list where each index t contains sum_{t'=0}^T gamma^t' r_{t'}
+        Helper function which takes the flat rewards {r_0, r_1, ..., r_t', ... r_T} of a batch of trajectories and
+        returns an array where each index t contains sum_{t'=0}^T gamma^t' r_{t'} over t's trajectory.
 
-        Note that all entries of the output list should be the exact same because each sum is from 0 to T (and doesn't
+        Note that all entries of a trajectory should be the exact same because each sum is from 0 to T (and doesn't
         involve t)!
         """
-        l = []
-        for reward in rewards:
-            T = len(reward)-1
-            gam = self.gamma ** np.arange(0,T+1)
-            l.append(np.ones_like(reward)*np.sum(gam*reward))
-        return np.concatenate(l,axis=0)
-        # return torch.einsum('t,b->bt',np.ones([T+1]),torch.einsum('t,bt->b',gam,rewards)) # batched
-
+        return discounting.discounted_return(rewards, dones, self.gamma)
 
-    def _discounted_reward_to_go(self, rewards: Sequence[float]) -> Sequence[float]:
+    def _discounted_reward_to_go(self, rewards: np.ndarray, dones: np.ndarray) -> np.ndarray:
         """
-        Helper function which takes a list of rewards {r_0, r_1, ..., r_t', ... r_T} and returns a list where the entry
-        in each index t is sum_{t'=t}^T gamma^(t'-t) * r_{t'}.
+        Helper function which takes the flat rewards {r_0, r_1, ..., r_t', ... r_T} of a batch of trajectories and
+        returns an array where the entry in each index t is sum_{t'=t}^T gamma^(t'-t) * r_{t'}.
         """
-        l = []
-        for reward in rewards:
-            T = len(reward)-1
-            gam = self.gamma ** np.arange(0,T+1)
-            mask = (np.arange(0,T+1).reshape(-1,1)>=np.arange(0,T+1).reshape(1,-1)).astype(np.float32) # mask[i,j]=1 iff i>=j
-            ans = np.einsum('pt,t,p->t',mask,gam**-1,gam*reward)
-            l.append(ans)
-        # ans = np.einsum('pt,t,p,bp->bt',mask,gam**-1,gam,rewards) # batched
-        return np.concatenate(l,axis=0)
+        return discounting.discounted_reward_to_go(rewards, dones, self.gamma)
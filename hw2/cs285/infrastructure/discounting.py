@@ -0,0 +1,94 @@
+"""
+Discounted sums over a flat batch of concatenated trajectories.
+
+Everything here works on 1D arrays of length N (the total number of steps in
+the batch) together with a `dones` array that is 1 at the last step of each
+trajectory, and runs in O(N) without ever forming per-trajectory matrices or
+negative powers of the discount.
+"""
+import numpy as np
+
+
+def dones_from_lengths(lengths) -> np.ndarray:
+    """Episode-end flags for trajectories of the given lengths laid end to end."""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    dones = np.zeros(int(lengths.sum()), dtype=np.float64)
+    dones[np.cumsum(lengths) - 1] = 1
+    return dones
+
+
+def reverse_scan(x: np.ndarray, coefs: np.ndarray) -> np.ndarray:
+    """
+    Computes y[t] = x[t] + coefs[t] * y[t + 1], with y[N] = 0.
+
+    Setting coefs[t] = 0 at the end of each trajectory makes this a segmented
+    scan. The array is split into ~sqrt(N) blocks: each block is scanned
+    locally (all blocks in parallel), then the carries are propagated between
+    blocks, so the work is O(N) in O(sqrt(N)) vectorized steps.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    coefs = np.asarray(coefs, dtype=np.float64)
+    assert x.shape == coefs.shape and x.ndim == 1
+    n = x.shape[0]
+    if n == 0:
+        return x.copy()
+
+    block_size = int(np.ceil(np.sqrt(n)))
+    num_blocks = int(np.ceil(n / block_size))
+    pad = num_blocks * block_size - n
+    x = np.concatenate([x, np.zeros(pad)]).reshape(num_blocks, block_size)
+    coefs = np.concatenate([coefs, np.zeros(pad)]).reshape(num_blocks, block_size)
+
+    # scan each block assuming nothing flows in from the next block, and keep
+    # track of how much of that inflow would reach each position
+    y = np.empty_like(x)
+    inflow_coefs = np.empty_like(coefs)
+    y[:, -1] = x[:, -1]
+    inflow_coefs[:, -1] = coefs[:, -1]
+    for j in range(block_size - 2, -1, -1):
+        y[:, j] = x[:, j] + coefs[:, j] * y[:, j + 1]
+        inflow_coefs[:, j] = coefs[:, j] * inflow_coefs[:, j + 1]
+
+    # inflow[b] is the final value of y at the start of block b + 1
+    inflow = np.zeros(num_blocks)
+    for b in range(num_blocks - 2, -1, -1):
+        inflow[b] = y[b + 1, 0] + inflow_coefs[b + 1, 0] * inflow[b + 1]
+
+    y += inflow_coefs * inflow[:, None]
+    return y.reshape(-1)[:n]
+
+
+def discounted_reward_to_go(
+    rewards: np.ndarray, dones: np.ndarray, gamma: float
+) -> np.ndarray:
+    """Entry t is sum_{t'=t}^{T} gamma^(t'-t) r_{t'} within t's trajectory."""
+    return reverse_scan(rewards, gamma * (1 - np.asarray(dones, dtype=np.float64)))
+
+
+def discounted_return(rewards: np.ndarray, dones: np.ndarray, gamma: float) -> np.ndarray:
+    """Entry t is sum_{t'=0}^{T} gamma^t' r_{t'} of t's whole trajectory."""
+    dones = np.asarray(dones, dtype=np.float64)
+    reward_to_go = discounted_reward_to_go(rewards, dones, gamma)
+
+    # index of the first step of the trajectory each step belongs to
+    is_start = np.concatenate([[True], dones[:-1] > 0])
+    starts = np.maximum.accumulate(np.where(is_start, np.arange(len(dones)), 0))
+    return reward_to_go[starts]
+
+
+def generalized_advantage_estimate(
+    rewards: np.ndarray,
+    values: np.ndarray,
+    dones: np.ndarray,
+    gamma: float,
+    gae_lambda: float,
+) -> np.ndarray:
+    """
+    GAE over a flat batch. The value after the last step of each trajectory
+    is taken to be 0.
+    """
+    dones = np.asarray(dones, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    next_values = np.append(values[1:], 0) * (1 - dones)
+    deltas = rewards + gamma * next_values - values
+    return reverse_scan(deltas, gamma * gae_lambda * (1 - dones))
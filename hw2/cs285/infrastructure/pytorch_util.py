@@ -1,4 +1,4 @@
-from typing import Union
+from typing import Optional, Sequence, Union
 
 import torch
 from torch import nn
@@ -62,6 +62,76 @@ def build_mlp(
     return mlp
 
 
+class StackedMLP(nn.Module):
+    """
+    `num_models` independent MLPs with the architecture of `build_mlp`, whose
+    weights are stacked along a leading dimension so that all of them are
+    evaluated with one batched matmul per layer.
+
+    Input (num_models, batch_size, input_size) -> (num_models, batch_size, output_size).
+
+    If `generators` (one torch.Generator per model) is given, model k is
+    initialized from generators[k] only, so its weights don't depend on the
+    other models.
+    """
+
+    def __init__(
+            self,
+            num_models: int,
+            input_size: int,
+            output_size: int,
+            n_layers: int,
+            size: int,
+            activation: Activation = 'tanh',
+            output_activation: Activation = 'identity',
+            generators: Optional[Sequence[torch.Generator]] = None,
+    ):
+        super().__init__()
+        assert generators is None or len(generators) == num_models
+        if isinstance(activation, str):
+            activation = _str_to_activation[activation]
+        if isinstance(output_activation, str):
+            output_activation = _str_to_activation[output_activation]
+        self.activation = activation
+        self.output_activation = output_activation
+
+        self.weights = nn.ParameterList()
+        self.biases = nn.ParameterList()
+        sizes = [input_size] + [size] * n_layers + [output_size]
+        for in_size, out_size in zip(sizes[:-1], sizes[1:]):
+            # same distribution as nn.Linear's default initialization
+            bound = 1 / in_size ** 0.5
+            self.weights.append(
+                nn.Parameter(self._uniform((num_models, in_size, out_size), bound, generators))
+            )
+            self.biases.append(
+                nn.Parameter(self._uniform((num_models, 1, out_size), bound, generators))
+            )
+
+    @staticmethod
+    def _uniform(shape, bound, generators):
+        tensor = torch.empty(shape)
+        if generators is None:
+            return tensor.uniform_(-bound, bound)
+        for k, generator in enumerate(generators):
+            tensor[k].uniform_(-bound, bound, generator=generator)
+        return tensor
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        num_layers = len(self.weights)
+        for i, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            x = torch.baddbmm(bias, x, weight)
+            x = self.activation(x) if i < num_layers - 1 else self.output_activation(x)
+        return x
+
+
+def build_stacked_mlp(num_models: int, *args, **kwargs):
+    """Builds `num_models` independent copies of `build_mlp(*args, **kwargs)` as one StackedMLP."""
+    mlp = StackedMLP(num_models, *args, **kwargs)
+    mlp.to(device)
+    return mlp
+
+
 def init_gpu(use_gpu=True, gpu_id=0):
     global device
     if torch.cuda.is_available() and use_gpu:
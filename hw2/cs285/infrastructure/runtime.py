@@ -0,0 +1,138 @@
+import argparse
+import os
+from typing import List, Optional, Sequence
+
+import torch
+
+
+_thread_env_vars = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+def add_runtime_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--num_threads", type=int, default=None)
+    parser.add_argument("--num_interop_threads", type=int, default=None)
+    parser.add_argument(
+        "--cpu_affinity", type=str, default=None
+    )  # e.g. "0-3,8,9"; overrides the automatic per-job split
+    parser.add_argument(
+        "--job_index", type=int, default=None
+    )  # with --num_jobs: take the job_index-th equal share of this process's cores
+    parser.add_argument("--num_jobs", type=int, default=None)
+
+
+def parse_cpu_list(cpus: str) -> List[int]:
+    """Parse a list like "0-3,8,9" into [0, 1, 2, 3, 8, 9]."""
+    result = []
+    for part in cpus.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-")
+            result.extend(range(int(lo), int(hi) + 1))
+        else:
+            result.append(int(part))
+    return result
+
+
+def available_cpus() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def job_cpus(job_index: int, num_jobs: int, cpus: Optional[Sequence[int]] = None) -> List[int]:
+    """
+    The job_index-th of num_jobs contiguous, equal shares of `cpus`. If there
+    are more jobs than cores, jobs share cores round-robin.
+    """
+    cpus = list(cpus if cpus is not None else available_cpus())
+    assert 0 <= job_index < num_jobs, f"job_index {job_index} out of range for {num_jobs} jobs"
+    per_job = len(cpus) // num_jobs
+    if per_job == 0:
+        return [cpus[job_index % len(cpus)]]
+    return cpus[job_index * per_job : (job_index + 1) * per_job]
+
+
+def configure_runtime(
+    num_threads: Optional[int] = None,
+    num_interop_threads: Optional[int] = None,
+    cpu_affinity: Optional[Sequence[int]] = None,
+    job_index: Optional[int] = None,
+    num_jobs: Optional[int] = None,
+) -> dict:
+    """
+    Pin this process to a set of cores and size the PyTorch / OpenMP / MKL
+    thread pools to match, so that many runs side by side don't oversubscribe
+    the machine.
+
+    job_index / num_jobs fall back to the CS285_JOB_INDEX / CS285_NUM_JOBS
+    environment variables (set by the sweep runner). With nothing specified,
+    this is a no-op.
+    """
+    if job_index is None and "CS285_JOB_INDEX" in os.environ:
+        job_index = int(os.environ["CS285_JOB_INDEX"])
+    if num_jobs is None and "CS285_NUM_JOBS" in os.environ:
+        num_jobs = int(os.environ["CS285_NUM_JOBS"])
+
+    if cpu_affinity is None and job_index is not None and num_jobs is not None:
+        cpu_affinity = job_cpus(job_index, num_jobs)
+
+    if cpu_affinity is not None:
+        cpu_affinity = list(cpu_affinity)
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cpu_affinity)
+        else:
+            print("[WARN] CPU affinity is not supported on this platform")
+        if num_threads is None:
+            num_threads = len(cpu_affinity)
+
+    if num_threads is not None:
+        # the env vars only reach libraries that haven't started their thread
+        # pools yet (and child processes); torch and threadpoolctl cover the rest
+        for var in _thread_env_vars:
+            os.environ[var] = str(num_threads)
+        torch.set_num_threads(num_threads)
+        try:
+            import threadpoolctl
+
+            threadpoolctl.threadpool_limits(num_threads)
+        except ImportError:
+            pass
+
+    if num_interop_threads is None and num_threads is not None:
+        num_interop_threads = 1
+    if num_interop_threads is not None:
+        try:
+            torch.set_num_interop_threads(num_interop_threads)
+        except RuntimeError:
+            # can only be set before any inter-op parallel work has started
+            print("[WARN] too late to set the number of inter-op threads")
+
+    info = {
+        "num_threads": torch.get_num_threads(),
+        "num_interop_threads": torch.get_num_interop_threads(),
+        "cpu_affinity": cpu_affinity if cpu_affinity is not None else available_cpus(),
+    }
+    if num_threads is not None or cpu_affinity is not None:
+        print(
+            "Using {} intra-op / {} inter-op threads on cpus {}".format(
+                info["num_threads"], info["num_interop_threads"], info["cpu_affinity"]
+            )
+        )
+    return info
+
+
+def configure_runtime_from_args(args: argparse.Namespace) -> dict:
+    return configure_runtime(
+        num_threads=args.num_threads,
+        num_interop_threads=args.num_interop_threads,
+        cpu_affinity=parse_cpu_list(args.cpu_affinity) if args.cpu_affinity else None,
+        job_index=args.job_index,
+        num_jobs=args.num_jobs,
+    )
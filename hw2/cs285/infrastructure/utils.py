@@ -5,6 +5,7 @@ from cs285.networks.policies import MLPPolicy
 import gym
 import cv2
 from cs285.infrastructure import pytorch_util as ptu
+from cs285.infrastructure import timers
 from typing import Dict, Tuple, List
 
 ############################################
@@ -34,7 +35,8 @@ def sample_trajectory(
             raise NotADirectoryError(NotImplementedError())
         ac: np.ndarray = policy.get_action(ob)
         # TODO: use that action to take a step in the environment
-        next_ob, rew, done, _ = env.step(ac)
+        with timers.phase("env_step"):
+            next_ob, rew, done, _ = env.step(ac)
 
         # TODO rollout can end due to done, or due to max_length
         steps += 1
@@ -83,6 +85,68 @@ def sample_trajectories(
     return trajs, timesteps_this_batch
 
 
+def sample_trajectories_multi_seed(
+    envs: List[gym.Env],
+    policy,
+    min_timesteps_per_batch: int,
+    max_length: int,
+) -> Tuple[List[List[Dict[str, np.ndarray]]], List[int]]:
+    """
+    sample_trajectories for several seeds at once: env k is driven by seed k of
+    a policy whose get_action maps (num_seeds, ob_dim) -> one action per seed.
+    All envs step in lockstep so each policy forward serves every seed; env k
+    stops once its own batch has min_timesteps_per_batch steps.
+    """
+    num_seeds = len(envs)
+    trajs = [[] for _ in range(num_seeds)]
+    timesteps_this_batch = [0] * num_seeds
+    current = [None] * num_seeds
+    obs = [None] * num_seeds
+
+    def reset(k):
+        obs[k] = envs[k].reset()
+        current[k] = {"observation": [], "action": [], "reward": [], "next_observation": [], "terminal": []}
+
+    for k in range(num_seeds):
+        reset(k)
+    active = [True] * num_seeds
+
+    while any(active):
+        acs = policy.get_action(np.stack(obs))
+        for k in range(num_seeds):
+            if not active[k]:
+                continue
+            with timers.phase("env_step"):
+                next_ob, rew, done, _ = envs[k].step(acs[k])
+            traj = current[k]
+            rollout_done: bool = done or (len(traj["reward"]) + 1 > max_length)
+
+            traj["observation"].append(obs[k])
+            traj["action"].append(acs[k])
+            traj["reward"].append(rew)
+            traj["next_observation"].append(next_ob)
+            traj["terminal"].append(rollout_done)
+            obs[k] = next_ob
+
+            if rollout_done:
+                trajs[k].append(
+                    {
+                        "observation": np.array(traj["observation"], dtype=np.float32),
+                        "image_obs": np.array([], dtype=np.uint8),
+                        "reward": np.array(traj["reward"], dtype=np.float32),
+                        "action": np.array(traj["action"], dtype=np.float32),
+                        "next_observation": np.array(traj["next_observation"], dtype=np.float32),
+                        "terminal": np.array(traj["terminal"], dtype=np.float32),
+                    }
+                )
+                timesteps_this_batch[k] += get_traj_length(trajs[k][-1])
+                if timesteps_this_batch[k] >= min_timesteps_per_batch:
+                    active[k] = False
+                else:
+                    reset(k)
+    return trajs, timesteps_this_batch
+
+
 def sample_n_trajectories(
     env: gym.Env, policy: MLPPolicy, ntraj: int, max_length: int, render: bool = False
 ):
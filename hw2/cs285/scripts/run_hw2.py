@@ -3,6 +3,7 @@ from tqdm import tqdm
 import time
 
 from cs285.agents.pg_agent import PGAgent
+from cs285.agents.multi_seed_pg_agent import MultiSeedPGAgent
 
 import os
 import time
@@ -15,6 +16,8 @@ from cs285.infrastructure import pytorch_util as ptu
 from cs285.infrastructure import utils
 from cs285.infrastructure.logger import Logger
 from cs285.infrastructure.action_noise_wrapper import ActionNoiseWrapper
+from cs285.infrastructure import runtime
+from cs285.infrastructure import timers
 
 MAX_NVIDEO = 2
 
@@ -71,7 +74,9 @@ def run_training_loop(args):
         print(f"\n********** Iteration {itr} ************")
         # TODO: sample `args.batch_size` transitions using utils.sample_trajectories
         # make sure to use `max_ep_len`
-        trajs, envsteps_this_batch = utils.sample_trajectories(env,agent.actor,args.batch_size,max_ep_len)
+        with timers.phase("collect"):
+            trajs, envsteps_this_batch = utils.sample_trajectories(env,agent.actor,args.batch_size,max_ep_len)
+        timers.count("env_steps", envsteps_this_batch)
         total_envsteps += envsteps_this_batch
 
         # trajs should be a list of dictionaries of NumPy arrays, where each dictionary corresponds to a trajectory.
@@ -79,19 +84,22 @@ def run_training_loop(args):
         trajs_dict = {k: [traj[k] for traj in trajs] for k in trajs[0]}
 
         # TODO: train the agent using the sampled trajectories and the agent's update function
-        train_info: dict = agent.update(
-            obs=trajs_dict['observation'],
-            actions=trajs_dict['action'],
-            rewards=trajs_dict['reward'],
-            terminals=trajs_dict['terminal']
-        )
+        with timers.phase("update"):
+            train_info: dict = agent.update(
+                obs=trajs_dict['observation'],
+                actions=trajs_dict['action'],
+                rewards=trajs_dict['reward'],
+                terminals=trajs_dict['terminal']
+            )
+        timers.count("updates")
 
         if itr % args.scalar_log_freq == 0:
             # save eval metrics
             print("\nCollecting data for eval...")
-            eval_trajs, eval_envsteps_this_batch = utils.sample_trajectories(
-                env, agent.actor, args.eval_batch_size, max_ep_len
-            )
+            with timers.phase("eval"):
+                eval_trajs, eval_envsteps_this_batch = utils.sample_trajectories(
+                    env, agent.actor, args.eval_batch_size, max_ep_len
+                )
 
             logs = utils.compute_metrics(trajs, eval_trajs)
             # compute additional metrics
@@ -107,6 +115,7 @@ def run_training_loop(args):
             for key, value in logs.items():
                 print("{} : {}".format(key, value))
                 logger.log_scalar(value, key, itr)
+            timers.log(logger, itr)
             print("Done logging...\n\n")
 
             logger.flush()
@@ -126,6 +135,106 @@ def run_training_loop(args):
             )
 
 
+def run_multi_seed_training_loop(args):
+    """run_training_loop for args.num_seeds seeds (args.seed, args.seed + 1, ...) in one process."""
+    seeds = [args.seed + k for k in range(args.num_seeds)]
+    loggers = [Logger(logdir) for logdir in args.logdirs]
+
+    np.random.seed(args.seed)
+    torch.manual_seed(args.seed)
+    ptu.init_gpu(use_gpu=not args.no_gpu, gpu_id=args.which_gpu)
+
+    # one env per seed
+    envs = [gym.make(args.env_name, render_mode=None) for _ in seeds]
+    discrete = isinstance(envs[0].action_space, gym.spaces.Discrete)
+
+    if args.action_noise_std > 0:
+        assert not discrete, f"Cannot use --action_noise_std for discrete environment {args.env_name}"
+        envs = [ActionNoiseWrapper(env, seed, args.action_noise_std) for env, seed in zip(envs, seeds)]
+
+    # seed k's env, network initialization and action sampling only use seed k,
+    # so its run doesn't depend on the other seeds trained alongside it
+    for env, seed in zip(envs, seeds):
+        env.reset(seed=seed)
+
+    if args.video_log_freq != -1:
+        print("[WARN] video logging is not supported with --num_seeds > 1")
+
+    max_ep_len = args.ep_len or envs[0].spec.max_episode_steps
+
+    ob_dim = envs[0].observation_space.shape[0]
+    ac_dim = envs[0].action_space.n if discrete else envs[0].action_space.shape[0]
+
+    agent = MultiSeedPGAgent(
+        len(seeds),
+        ob_dim,
+        ac_dim,
+        discrete,
+        n_layers=args.n_layers,
+        layer_size=args.layer_size,
+        gamma=args.discount,
+        learning_rate=args.learning_rate,
+        use_baseline=args.use_baseline,
+        use_reward_to_go=args.use_reward_to_go,
+        normalize_advantages=args.normalize_advantages,
+        baseline_learning_rate=args.baseline_learning_rate,
+        baseline_gradient_steps=args.baseline_gradient_steps,
+        gae_lambda=args.gae_lambda,
+        seeds=seeds,
+    )
+
+    total_envsteps = [0] * len(seeds)
+    start_time = time.time()
+
+    for itr in tqdm(range(args.n_iter)):
+        print(f"\n********** Iteration {itr} ************")
+        with timers.phase("collect"):
+            trajs, envsteps_this_batch = utils.sample_trajectories_multi_seed(
+                envs, agent, args.batch_size, max_ep_len
+            )
+        timers.count("env_steps", sum(envsteps_this_batch))
+        total_envsteps = [t + e for t, e in zip(total_envsteps, envsteps_this_batch)]
+
+        trajs_dicts = [{k: [traj[k] for traj in seed_trajs] for k in seed_trajs[0]} for seed_trajs in trajs]
+        with timers.phase("update"):
+            train_infos = agent.update(
+                obs=[d['observation'] for d in trajs_dicts],
+                actions=[d['action'] for d in trajs_dicts],
+                rewards=[d['reward'] for d in trajs_dicts],
+                terminals=[d['terminal'] for d in trajs_dicts],
+            )
+        timers.count("updates")
+
+        if itr % args.scalar_log_freq == 0:
+            # save eval metrics
+            print("\nCollecting data for eval...")
+            with timers.phase("eval"):
+                eval_trajs, _ = utils.sample_trajectories_multi_seed(
+                    envs, agent, args.eval_batch_size, max_ep_len
+                )
+
+            # the timings are shared by all seeds, so they are logged to the first seed's run
+            timers.log(loggers[0], itr)
+
+            for k, seed in enumerate(seeds):
+                logs = utils.compute_metrics(trajs[k], eval_trajs[k])
+                logs.update(train_infos[k])
+                logs["Train_EnvstepsSoFar"] = total_envsteps[k]
+                logs["TimeSinceStart"] = time.time() - start_time
+                if itr == 0:
+                    logs["Initial_DataCollection_AverageReturn"] = logs[
+                        "Train_AverageReturn"
+                    ]
+
+                # perform the logging
+                print(f"---------- seed {seed} ----------")
+                for key, value in logs.items():
+                    print("{} : {}".format(key, value))
+                    loggers[k].log_scalar(value, key, itr)
+                loggers[k].flush()
+            print("Done logging...\n\n")
+
+
 def main():
     import argparse
 
@@ -160,10 +269,22 @@ def main():
     parser.add_argument("--which_gpu", "-gpu_id", default=0)
     parser.add_argument("--video_log_freq", type=int, default=-1)
     parser.add_argument("--scalar_log_freq", type=int, default=1)
+    parser.add_argument(
+        "--time_phases", action="store_true"
+    )  # log per-phase timings and env-steps/updates per second at scalar_log_freq
 
     parser.add_argument("--action_noise_std", type=float, default=0)
+    parser.add_argument(
+        "--num_seeds", type=int, default=1
+    )  # train seeds seed, seed+1, ... in one process, logging each to its own "_s<seed>" directory.
+    # Each seed has its own env seed and RNG streams, so it is reproducible and independent of
+    # --num_seeds, but not bit-identical to a single-seed run with the same --seed.
+    runtime.add_runtime_args(parser)
 
     args = parser.parse_args()
+    runtime.configure_runtime_from_args(args)
+    if args.time_phases:
+        timers.enable()
 
     # create directory for logging
     logdir_prefix = "q2_pg_"  # keep for autograder
@@ -173,20 +294,31 @@ def main():
     if not (os.path.exists(data_path)):
         os.makedirs(data_path)
 
-    logdir = (
-        logdir_prefix
-        + args.exp_name
-        + "_"
-        + args.env_name
-        + "_"
-        + time.strftime("%d-%m-%Y_%H-%M-%S")
-    )
-    logdir = os.path.join(data_path, logdir)
-    args.logdir = logdir
-    if not (os.path.exists(logdir)):
-        os.makedirs(logdir)
-
-    run_training_loop(args)
+    if args.num_seeds > 1:
+        exp_names = [f"{args.exp_name}_s{args.seed + k}" for k in range(args.num_seeds)]
+    else:
+        exp_names = [args.exp_name]
+
+    args.logdirs = []
+    for exp_name in exp_names:
+        logdir = (
+            logdir_prefix
+            + exp_name
+            + "_"
+            + args.env_name
+            + "_"
+            + time.strftime("%d-%m-%Y_%H-%M-%S")
+        )
+        logdir = os.path.join(data_path, logdir)
+        args.logdirs.append(logdir)
+        if not (os.path.exists(logdir)):
+            os.makedirs(logdir)
+    args.logdir = args.logdirs[0]
+
+    if args.num_seeds > 1:
+        run_multi_seed_training_loop(args)
+    else:
+        run_training_loop(args)
 
 
 if __name__ == "__main__":
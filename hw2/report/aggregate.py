@@ -0,0 +1,104 @@
+import os,json,hashlib
+import numpy as np
+
+# Aggregates a curve (x, y) over the runs (seeds) of a group:
+#  - every run is resampled onto one common x grid with np.interp (NaN outside
+#    the run's own x range), so seeds don't need identical step lists;
+#  - mean / std / confidence interval over seeds are computed on the stacked
+#    (num_runs, num_points) array, ignoring NaNs;
+#  - each run's curve and each group's aggregate are cached in cache_dir, keyed by
+#    the size/mtime of the runs' source files, so only runs with new events are
+#    re-read and only groups with a changed run are recomputed.
+#
+# A loader turns (source file, tag) into (x, y) arrays, see parse_log_loader. Its
+# `x_axis` attribute (if any) is part of the cache keys, so curves loaded against
+# a different x axis are not mixed up.
+
+def fingerprint(path:str):
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime]
+
+def _key(*parts):
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()[:32]
+
+def make_grid(xs, num_points=None):
+    """The runs' own x values if they all agree (and num_points is None), else num_points evenly spaced points.
+
+    Empty runs are ignored; if every run is empty the grid is empty too."""
+    xs = [x for x in xs if len(x)]
+    if not xs:
+        return np.zeros(0)
+    if num_points is None and all(np.array_equal(x, xs[0]) for x in xs):
+        return np.asarray(xs[0], dtype=np.float64)
+    lo = min(x.min() for x in xs)
+    hi = max(x.max() for x in xs)
+    return np.linspace(lo, hi, num_points or 100)
+
+def resample(x, y, grid):
+    """y(grid) by linear interpolation, NaN outside the run's x range (everywhere for an empty run)."""
+    if len(x) == 0:
+        return np.full(len(grid), np.nan)
+    order = np.argsort(x, kind='stable')
+    return np.interp(grid, np.asarray(x, dtype=np.float64)[order], np.asarray(y, dtype=np.float64)[order], left=np.nan, right=np.nan)
+
+def aggregate_curves(xs, ys, num_points=None, z=1.96):
+    """{'x', 'mean', 'std', 'ci_low', 'ci_high', 'n'} over the runs' curves (xs[i], ys[i])."""
+    grid = make_grid(xs, num_points)
+    stacked = np.stack([resample(x, y, grid) for x, y in zip(xs, ys)], axis=0)
+    n = np.sum(~np.isnan(stacked), axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nansum(stacked, axis=0) / n
+        std = np.sqrt(np.nansum((stacked - mean) ** 2, axis=0) / n)
+        half_width = z * std / np.sqrt(n)
+    return {'x': grid, 'mean': mean, 'std': std, 'ci_low': mean - half_width, 'ci_high': mean + half_width, 'n': n}
+
+class Aggregator:
+    def __init__(self, loader, cache_dir='.aggregate_cache'):
+        self.loader = loader
+        self.x_axis = getattr(loader, 'x_axis', None)
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def run_curve(self, source:str, tag:str):
+        """(x, y) of one run, re-read only if its source changed."""
+        path = os.path.join(self.cache_dir, 'run_' + _key(fingerprint(source), tag, self.x_axis) + '.npz')
+        if os.path.exists(path):
+            with np.load(path) as data:
+                return data['x'], data['y']
+        x, y = self.loader(source, tag)
+        np.savez(path, x=np.asarray(x), y=np.asarray(y))
+        return np.asarray(x), np.asarray(y)
+
+    def group(self, sources, tag:str, num_points=None, z=1.96):
+        """aggregate_curves over the runs in `sources`, recomputed only if one of them changed."""
+        path = os.path.join(self.cache_dir, 'group_' + _key([fingerprint(s) for s in sources], tag, self.x_axis, num_points, z) + '.npz')
+        if os.path.exists(path):
+            with np.load(path) as data:
+                return {k: data[k] for k in data.files}
+        curves = [self.run_curve(source, tag) for source in sources]
+        result = aggregate_curves([c[0] for c in curves], [c[1] for c in curves], num_points, z)
+        np.savez(path, **result)
+        return result
+
+def parse_log_loader(x_key='Train_EnvstepsSoFar'):
+    """Loader for run_hw2.py stdout logs (<name>.log): x and y are both printed metrics."""
+    from parse_log import load
+    def loader(source, tag):
+        logname = source[:-len('.log')]
+        load(logname)
+        dic = json.load(open(f'{logname}.json'))
+        if x_key not in dic or tag not in dic:
+            # not printed (yet) in this run: an empty curve, counted as missing
+            return np.zeros(0), np.zeros(0)
+        return np.array(dic[x_key]), np.array(dic[tag])
+    loader.x_axis = x_key
+    return loader
+
+def plot_group(ax, result, label, band='ci'):
+    """Plots the mean with a shaded band ('ci', 'std' or None)."""
+    line, = ax.plot(result['x'], result['mean'], label=label)
+    if band == 'ci':
+        ax.fill_between(result['x'], result['ci_low'], result['ci_high'], color=line.get_color(), alpha=0.2)
+    elif band == 'std':
+        ax.fill_between(result['x'], result['mean'] - result['std'], result['mean'] + result['std'], color=line.get_color(), alpha=0.2)
+    return line
@@ -1,4 +1,4 @@
-from parse_log import load
+from aggregate import Aggregator,parse_log_loader,plot_group
 import matplotlib.pyplot as plt
 import numpy as np
 import json
@@ -6,15 +6,10 @@ names = {
     'log_pendulum_default':'default',
     'log_pendulum_discount0.99_smallbatch_gae0.98':'my'
 }
+aggregator = Aggregator(parse_log_loader('Train_EnvstepsSoFar'))
 for name in names:
-    rewards = []
-    steps = []
-    for i in range(1,6):
-        dic = json.load(open(f'{name}_s{i}.json'))
-        rewards.append(dic['Eval_AverageReturn'])
-        steps.append(dic['Train_EnvstepsSoFar'])
-    rewards = np.mean(np.stack(rewards,axis=-1),axis=-1)
-    steps = np.mean(np.stack(steps,axis=-1),axis=-1)
-    plt.plot(steps,rewards,label=name)
+    # seeds are resampled onto a common Train_EnvstepsSoFar grid; logs are only re-parsed when they change
+    agg = aggregator.group([f'{name}_s{i}.log' for i in range(1,6)],'Eval_AverageReturn')
+    plot_group(plt.gca(),agg,name,band=None)
 plt.legend()
-plt.savefig(f'./E4_all.png')
\ No newline at end of file
+plt.savefig(f'./E4_all.png')
@@ -1,23 +1,15 @@
-from parse_log import load
+from aggregate import Aggregator,parse_log_loader,plot_group
 import matplotlib.pyplot as plt
 import numpy as np
 import json
 import argparse
 parser = argparse.ArgumentParser()
 parser.add_argument('--name',type=str,default='default')
+parser.add_argument('--band',type=str,default=None) # 'ci' or 'std'
 args = parser.parse_args()
 N = f'log_pendulum_{args.name}'
-names = [f'{N}_s{i}' for i in range(1,6)]
-for name in names:
-    load(name)
-rewards = []
-steps = []
-for i in range(1,6):
-    dic = json.load(open(f'{N}_s{i}.json'))
-    rewards.append(dic['Eval_AverageReturn'])
-    steps.append(dic['Train_EnvstepsSoFar'])
-rewards = np.mean(np.stack(rewards,axis=-1),axis=-1)
-steps = np.mean(np.stack(steps,axis=-1),axis=-1)
-plt.plot(steps,rewards,label=N)
+aggregator = Aggregator(parse_log_loader('Train_EnvstepsSoFar'))
+agg = aggregator.group([f'{N}_s{i}.log' for i in range(1,6)],'Eval_AverageReturn')
+plot_group(plt.gca(),agg,N,band=args.band)
 plt.legend()
-plt.savefig(f'./E4_{N}.png')
\ No newline at end of file
+plt.savefig(f'./E4_{N}.png')
@@ -6,6 +6,7 @@ from torch import nn
 import numpy as np
 
 import cs285.infrastructure.pytorch_util as ptu
+from cs285.infrastructure import timers
 
 
 class DQNAgent(nn.Module):
@@ -22,6 +23,7 @@ class DQNAgent(nn.Module):
         target_update_period: int,
         use_double_q: bool = False,
         clip_grad_norm: Optional[float] = None,
+        compile_mode: str = "none",
     ):
         super().__init__()
 
@@ -41,6 +43,8 @@ class DQNAgent(nn.Module):
 
         self.update_target_critic()
 
+        self.update_critic = ptu.compile_fn(self.update_critic, compile_mode, state=self)
+
         print('Agent details:')
         print(self.__dict__)
 
@@ -109,10 +113,10 @@ class DQNAgent(nn.Module):
         self.lr_scheduler.step()
 
         return {
-            "critic_loss": loss.item(),
-            "q_values": q_values.mean().item(),
-            "target_values": target_values.mean().item(),
-            "grad_norm": grad_norm.item(),
+            "critic_loss": loss.detach(),
+            "q_values": q_values.detach().mean(),
+            "target_values": target_values.mean(),
+            "grad_norm": grad_norm.detach(),
         }
 
     def update_target_critic(self):
@@ -131,14 +135,16 @@ class DQNAgent(nn.Module):
         Update the DQN agent, including both the critic and target.
         """
         # TODO(student): update the critic, and the target if needed
-        critic_stats = self.update_critic(
-            obs=obs,
-            action=action,
-            reward=reward,
-            next_obs=next_obs,
-            done=done
-        )
+        with timers.phase("critic_update"):
+            critic_stats = self.update_critic(
+                obs=obs,
+                action=action,
+                reward=reward,
+                next_obs=next_obs,
+                done=done
+            )
         if step%(self.target_update_period)==0:
-            self.update_target_critic()
+            with timers.phase("target_update"):
+                self.update_target_critic()
 
         return critic_stats
@@ -6,6 +6,7 @@ from torch import nn
 import numpy as np
 
 import cs285.infrastructure.pytorch_util as ptu
+from cs285.infrastructure import timers
 def full_print(var,name):
     print(name,var)
     print(name+'.shape',var.shape)
@@ -41,6 +42,7 @@ class SoftActorCritic(nn.Module):
         use_entropy_bonus: bool = False,
         temperature: float = 0.0,
         backup_entropy: bool = True,
+        compile_mode: str = "none",
     ):
         super().__init__()
 
@@ -99,6 +101,9 @@ class SoftActorCritic(nn.Module):
 
         self.update_target_critic()
 
+        self.update_critic = ptu.compile_fn(self.update_critic, compile_mode, state=self)
+        self.update_actor = ptu.compile_fn(self.update_actor, compile_mode, state=self)
+
         print('agent info:')
         print(self.__dict__)
 
@@ -244,9 +249,9 @@ class SoftActorCritic(nn.Module):
         self.critic_optimizer.step()
 
         return {
-            "critic_loss": loss.item(),
-            "q_values": q_values.mean().item(),
-            "target_values": target_values.mean().item(),
+            "critic_loss": loss.detach(),
+            "q_values": q_values.detach().mean(),
+            "target_values": target_values.detach().mean(),
         }
 
     def entropy(self, action_distribution: torch.distributions.Distribution):
@@ -336,7 +341,7 @@ class SoftActorCritic(nn.Module):
         loss.backward()
         self.actor_optimizer.step()
 
-        return {"actor_loss": loss.item(), "entropy": entropy.item()}
+        return {"actor_loss": loss.detach(), "entropy": entropy.detach()}
 
     def update_target_critic(self):
         self.soft_update_target_critic(1.0)
@@ -369,11 +374,13 @@ class SoftActorCritic(nn.Module):
         # full_print(dones,'dones') # [128]
         critic_infos = []
         # TODO(student): Update the critic for num_critic_upates steps, and add the output stats to critic_infos
-        for _ in range(self.num_critic_updates):
-            critic_infos.append(self.update_critic(observations,actions,rewards,next_observations,done=dones))
+        with timers.phase("critic_update"):
+            for _ in range(self.num_critic_updates):
+                critic_infos.append(self.update_critic(observations,actions,rewards,next_observations,done=dones))
 
         # TODO(student): Update the actor
-        actor_info = self.update_actor(observations)
+        with timers.phase("actor_update"):
+            actor_info = self.update_actor(observations)
 
         # TODO(student): Perform either hard or soft target updates.
         # Relevant variables:
@@ -381,17 +388,18 @@ class SoftActorCritic(nn.Module):
         #  - self.target_update_period (None when using soft updates)
         #  - self.soft_target_update_rate (None when using hard updates)
 
-        if self.target_update_period is None:
-            # soft update
-            self.soft_update_target_critic(self.soft_target_update_rate)
-        else:
-            # hard update
-            if step%self.target_update_period==0:
-                self.update_target_critic()
+        with timers.phase("target_update"):
+            if self.target_update_period is None:
+                # soft update
+                self.soft_update_target_critic(self.soft_target_update_rate)
+            else:
+                # hard update
+                if step%self.target_update_period==0:
+                    self.update_target_critic()
 
-        # Average the critic info over all of the steps
+        # Average the critic info over all of the steps (on device; see ptu.to_scalars)
         critic_info = {
-            k: np.mean([info[k] for info in critic_infos]) for k in critic_infos[0]
+            k: torch.stack([info[k] for info in critic_infos]).mean() for k in critic_infos[0]
         }
 
         # Deal with LR scheduling
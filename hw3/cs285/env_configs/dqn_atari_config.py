@@ -14,6 +14,7 @@ from cs285.env_configs.schedule import (
 )
 from cs285.infrastructure.atari_wrappers import wrap_deepmind
 import cs285.infrastructure.pytorch_util as ptu
+from cs285.networks.atari_q_network import AtariQNetwork, select_atari_cpu_config
 
 
 class PreprocessAtari(nn.Module):
@@ -37,8 +38,15 @@ def atari_dqn_config(
     use_double_q: bool = False,
     learning_starts: int = 20000,
     batch_size: int = 32,
+    compile_mode: str = "none",  # One of "none", "compile" (torch.compile), or "script" (TorchScript)
+    # Benchmark channels_last / bf16 variants of the critic at startup and use the fastest (CPU only)
+    cpu_perf_mode: bool = False,
+    cpu_allow_bf16: bool = True,
     **kwargs,
 ):
+    # the critic and target critic share the benchmarked configuration
+    cpu_config = {}
+
     def make_critic(observation_shape: Tuple[int, ...], num_actions: int) -> nn.Module:
         assert observation_shape == (
             4,
@@ -46,19 +54,36 @@ def atari_dqn_config(
             84,
         ), f"Observation shape: {observation_shape}"
 
-        return nn.Sequential(
-            PreprocessAtari(),
-            nn.Conv2d(in_channels=4, out_channels=32, kernel_size=8, stride=4),
-            nn.ReLU(),
-            nn.Conv2d(in_channels=32, out_channels=64, kernel_size=4, stride=2),
-            nn.ReLU(),
-            nn.Conv2d(in_channels=64, out_channels=64, kernel_size=3, stride=1),
-            nn.ReLU(),
-            nn.Flatten(),
-            nn.Linear(3136, 512),  # 3136 hard-coded based on img size + CNN layers
-            nn.ReLU(),
-            nn.Linear(512, num_actions),
-        ).to(ptu.device)
+        if cpu_perf_mode:
+            if not cpu_config:
+                cpu_config.update(
+                    select_atari_cpu_config(
+                        num_actions, batch_size=batch_size, allow_bf16=cpu_allow_bf16
+                    )
+                )
+            critic = AtariQNetwork(num_actions, **cpu_config).to(ptu.device)
+        else:
+            critic = nn.Sequential(
+                PreprocessAtari(),
+                nn.Conv2d(in_channels=4, out_channels=32, kernel_size=8, stride=4),
+                nn.ReLU(),
+                nn.Conv2d(in_channels=32, out_channels=64, kernel_size=4, stride=2),
+                nn.ReLU(),
+                nn.Conv2d(in_channels=64, out_channels=64, kernel_size=3, stride=1),
+                nn.ReLU(),
+                nn.Flatten(),
+                nn.Linear(3136, 512),  # 3136 hard-coded based on img size + CNN layers
+                nn.ReLU(),
+                nn.Linear(512, num_actions),
+            ).to(ptu.device)
+
+        return ptu.compile_module(
+            critic,
+            compile_mode,
+            example_inputs=(
+                torch.zeros((2, *observation_shape), dtype=torch.uint8, device=ptu.device),
+            ),
+        )
 
     def make_optimizer(params: torch.nn.ParameterList) -> torch.optim.Optimizer:
         return torch.optim.Adam(params, lr=learning_rate, eps=adam_eps)
@@ -115,6 +140,7 @@ def atari_dqn_config(
             "target_update_period": target_update_period,
             "clip_grad_norm": clip_grad_norm,
             "use_double_q": use_double_q,
+            "compile_mode": compile_mode,
         },
         "log_name": log_string,
         "exploration_schedule": exploration_schedule,
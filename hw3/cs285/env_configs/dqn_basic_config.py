@@ -27,18 +27,24 @@ def basic_dqn_config(
     use_double_q: bool = False,
     learning_starts: int = 20000,
     batch_size: int = 128,
+    compile_mode: str = "none",  # One of "none", "compile" (torch.compile), or "script" (TorchScript)
     **kwargs
 ):
-    learning_rate = ptu.addition_args['learning rate']
+    if ptu.addition_args and ptu.addition_args.get('learning rate') is not None:
+        # --change_learning_rate overrides the config file
+        learning_rate = ptu.addition_args['learning rate']
     print('-'*20)
     print('setting learning rate to',learning_rate)
     print('-'*20)
     def make_critic(observation_shape: Tuple[int, ...], num_actions: int) -> nn.Module:
-        return ptu.build_mlp(
-            input_size=np.prod(observation_shape),
-            output_size=num_actions,
-            n_layers=num_layers,
-            size=hidden_size,
+        return ptu.compile_mlps(
+            ptu.build_mlp(
+                input_size=np.prod(observation_shape),
+                output_size=num_actions,
+                n_layers=num_layers,
+                size=hidden_size,
+            ),
+            compile_mode,
         )
 
     def make_optimizer(params: torch.nn.ParameterList) -> torch.optim.Optimizer:
@@ -80,6 +86,7 @@ def basic_dqn_config(
             "target_update_period": target_update_period,
             "clip_grad_norm": clip_grad_norm,
             "use_double_q": use_double_q,
+            "compile_mode": compile_mode,
         },
         "exploration_schedule": exploration_schedule,
         "log_name": log_string,
@@ -45,19 +45,23 @@ def sac_config(
     temperature: float = 0.1,
     actor_fixed_std: Optional[float] = None,
     use_tanh: bool = True,
+    compile_mode: str = "none",  # One of "none", "compile" (torch.compile), or "script" (TorchScript)
 ):
     def make_critic(observation_shape: Tuple[int, ...], action_dim: int) -> nn.Module:
-        return StateActionCritic(
-            ob_dim=np.prod(observation_shape),
-            ac_dim=action_dim,
-            n_layers=num_layers,
-            size=hidden_size,
+        return ptu.compile_mlps(
+            StateActionCritic(
+                ob_dim=np.prod(observation_shape),
+                ac_dim=action_dim,
+                n_layers=num_layers,
+                size=hidden_size,
+            ),
+            compile_mode,
         )
 
     def make_actor(observation_shape: Tuple[int, ...], action_dim: int) -> nn.Module:
         assert len(observation_shape) == 1
         if actor_fixed_std is not None:
-            return MLPPolicy(
+            actor = MLPPolicy(
                 ac_dim=action_dim,
                 ob_dim=np.prod(observation_shape),
                 discrete=False,
@@ -68,7 +72,7 @@ def sac_config(
                 fixed_std=actor_fixed_std,
             )
         else:
-            return MLPPolicy(
+            actor = MLPPolicy(
                 ac_dim=action_dim,
                 ob_dim=np.prod(observation_shape),
                 discrete=False,
@@ -77,6 +81,7 @@ def sac_config(
                 use_tanh=use_tanh,
                 state_dependent_std=True,
             )
+        return ptu.compile_mlps(actor, compile_mode)
 
     def make_actor_optimizer(params: torch.nn.ParameterList) -> torch.optim.Optimizer:
         return torch.optim.Adam(params, lr=actor_learning_rate)
@@ -149,6 +154,7 @@ def sac_config(
             "soft_target_update_rate": soft_target_update_rate
             if use_soft_target_update
             else None,
+            "compile_mode": compile_mode,
         },
         "replay_buffer_capacity": replay_buffer_capacity,
         "log_name": log_string,
@@ -0,0 +1,138 @@
+import argparse
+import contextlib
+import os
+import sqlite3
+from typing import List, Optional
+
+import numpy as np
+
+
+def add_early_stopping_args(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--sweep_id", type=str, default=None
+    )  # runs with the same sweep_id (and db) are compared against each other
+    parser.add_argument("--early_stop_db", type=str, default=None)
+    parser.add_argument(
+        "--early_stop_min_frac", type=float, default=0.1
+    )  # first rung, as a fraction of total_steps
+    parser.add_argument("--early_stop_eta", type=float, default=3)
+
+
+class SuccessiveHalving:
+    """
+    Asynchronous successive halving (ASHA) over the runs of a sweep.
+
+    Rung k is at min_steps * eta^k steps. The first time a run is evaluated at
+    or past a rung, its eval_return is recorded in a SQLite file shared by all
+    runs of the sweep, and the run is stopped unless it is in the top 1/eta of
+    the returns recorded at that rung so far. Runs are never paused or
+    resumed, so early runs are only compared against whoever got there first.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        sweep_id: str,
+        run_id: str,
+        total_steps: int,
+        min_frac: float = 0.1,
+        eta: float = 3,
+    ):
+        assert eta > 1, "eta must be > 1"
+        self.db_path = db_path
+        self.sweep_id = sweep_id
+        self.run_id = run_id
+        self.eta = eta
+
+        min_steps = max(int(total_steps * min_frac), 1)
+        self.rungs = []
+        while min_steps * eta ** len(self.rungs) < total_steps:
+            self.rungs.append(int(min_steps * eta ** len(self.rungs)))
+        self.next_rung = 0
+
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS rungs "
+                "(sweep_id TEXT, run_id TEXT, rung INTEGER, step INTEGER, value REAL, "
+                "PRIMARY KEY (sweep_id, run_id, rung))"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS stopped "
+                "(sweep_id TEXT, run_id TEXT, step INTEGER, PRIMARY KEY (sweep_id, run_id))"
+            )
+
+    def _connect(self):
+        return _connect(self.db_path)
+
+    def should_stop(self, step: int, eval_return: float) -> bool:
+        """Call at every eval point. Returns True if this run should stop now."""
+        rung = None
+        while self.next_rung < len(self.rungs) and step >= self.rungs[self.next_rung]:
+            rung = self.next_rung
+            self.next_rung += 1
+        if rung is None:
+            return False
+
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO rungs VALUES (?, ?, ?, ?, ?)",
+                (self.sweep_id, self.run_id, rung, step, float(eval_return)),
+            )
+            values = [
+                v
+                for (v,) in db.execute(
+                    "SELECT value FROM rungs WHERE sweep_id = ? AND rung = ?",
+                    (self.sweep_id, rung),
+                )
+            ]
+            cutoff = np.percentile(values, 100 * (1 - 1 / self.eta))
+            stop = eval_return < cutoff
+            if stop:
+                db.execute(
+                    "INSERT OR REPLACE INTO stopped VALUES (?, ?, ?)",
+                    (self.sweep_id, self.run_id, step),
+                )
+
+        print(
+            f"[INFO] rung {rung} ({self.rungs[rung]} steps): eval_return {eval_return:.2f}, "
+            f"cutoff {cutoff:.2f} over {len(values)} runs -> {'stop' if stop else 'continue'}"
+        )
+        return stop
+
+
+def make_early_stopper(
+    args: argparse.Namespace, total_steps: int, run_id: str
+) -> Optional[SuccessiveHalving]:
+    """A SuccessiveHalving for this run if --sweep_id and --early_stop_db are set, else None."""
+    if args.sweep_id is None or args.early_stop_db is None:
+        return None
+    return SuccessiveHalving(
+        args.early_stop_db,
+        args.sweep_id,
+        run_id,
+        total_steps,
+        min_frac=args.early_stop_min_frac,
+        eta=args.early_stop_eta,
+    )
+
+
+@contextlib.contextmanager
+def _connect(db_path: str):
+    """A connection that commits (or rolls back) and is closed at the end of the with block."""
+    # a generous timeout, since every run of the sweep writes to the same file
+    with contextlib.closing(sqlite3.connect(db_path, timeout=60)) as db, db:
+        yield db
+
+
+def stopped_runs(db_path: str, sweep_id: str) -> List[str]:
+    """run_ids of the sweep that were stopped early."""
+    if not os.path.exists(db_path):
+        return []
+    with _connect(db_path) as db:
+        try:
+            rows = db.execute(
+                "SELECT run_id FROM stopped WHERE sweep_id = ?", (sweep_id,)
+            ).fetchall()
+        except sqlite3.OperationalError:
+            return []
+    return [run_id for (run_id,) in rows]
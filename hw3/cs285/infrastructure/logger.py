@@ -1,18 +1,31 @@
 import os
+import atexit
 from tensorboardX import SummaryWriter
 import numpy as np
+from cs285.infrastructure.metrics_store import MetricsWriter
 
 class Logger:
-    def __init__(self, log_dir, n_logged_samples=10, summary_writer=None):
+    def __init__(self, log_dir, n_logged_samples=10, summary_writer=None, metrics_store=True):
+        """
+        With metrics_store=True, scalars are also written to <log_dir>/metrics
+        (see cs285.infrastructure.metrics_store), which the report scripts can
+        query without parsing event files or stdout logs.
+        """
         self._log_dir = log_dir
         print('########################')
         print('logging outputs to ', log_dir)
         print('########################')
         self._n_logged_samples = n_logged_samples
         self._summ_writer = SummaryWriter(log_dir, flush_secs=1, max_queue=1)
+        self._metrics = None
+        if metrics_store:
+            self._metrics = MetricsWriter(os.path.join(log_dir, 'metrics'))
+            atexit.register(self._metrics.close)
 
     def log_scalar(self, scalar, name, step_):
         self._summ_writer.add_scalar('{}'.format(name), scalar, step_)
+        if self._metrics is not None:
+            self._metrics.add(name, scalar, step_)
 
     def log_scalars(self, scalar_dict, group_name, step, phase):
         """Will log all scalars in the same plot."""
@@ -68,6 +81,8 @@ class Logger:
 
     def flush(self):
         self._summ_writer.flush()
+        if self._metrics is not None:
+            self._metrics.flush()
 
 
 
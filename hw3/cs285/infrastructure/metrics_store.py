@@ -0,0 +1,157 @@
+"""
+Append-only columnar store for a run's scalar metrics.
+
+A run's metrics live in <logdir>/metrics/ as a sequence of chunk files
+(chunk_000000.npz, ...) plus index.json. Each chunk holds, for every tag
+logged while it was buffered, a step column and a value column; the index
+lists every chunk with its tags and step range, so a query only opens the
+chunks (and, inside them, only the columns) of the tags it asks for.
+"""
+import glob
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class MetricsWriter:
+    def __init__(self, metrics_dir: str, chunk_size: int = 10000, flush_secs: float = 60):
+        self.metrics_dir = metrics_dir
+        self.chunk_size = chunk_size
+        self.flush_secs = flush_secs
+        os.makedirs(metrics_dir, exist_ok=True)
+
+        self.index_path = os.path.join(metrics_dir, "index.json")
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                self.index = json.load(f)
+        else:
+            self.index = {"chunks": []}
+
+        self._steps: Dict[str, List[int]] = {}
+        self._values: Dict[str, List[float]] = {}
+        self._num_buffered = 0
+        self._last_write = time.time()
+
+    def add(self, tag: str, value: float, step: int):
+        if tag not in self._steps:
+            self._steps[tag] = []
+            self._values[tag] = []
+        self._steps[tag].append(int(step))
+        self._values[tag].append(float(value))
+        self._num_buffered += 1
+        if self._num_buffered >= self.chunk_size:
+            self.write_chunk()
+
+    def flush(self):
+        """Writes a chunk if enough time has passed since the last one."""
+        if self._num_buffered > 0 and time.time() - self._last_write >= self.flush_secs:
+            self.write_chunk()
+
+    def write_chunk(self):
+        self._last_write = time.time()
+        if self._num_buffered == 0:
+            return
+        tags = sorted(self._steps)
+        columns = {"tags": np.array(tags)}
+        for i, tag in enumerate(tags):
+            columns[f"step_{i}"] = np.array(self._steps[tag], dtype=np.int64)
+            columns[f"value_{i}"] = np.array(self._values[tag], dtype=np.float64)
+
+        file_name = "chunk_{:06d}.npz".format(len(self.index["chunks"]))
+        np.savez(os.path.join(self.metrics_dir, file_name), **columns)
+
+        all_steps = np.concatenate([columns[f"step_{i}"] for i in range(len(tags))])
+        self.index["chunks"].append(
+            {
+                "file": file_name,
+                "tags": tags,
+                "min_step": int(all_steps.min()),
+                "max_step": int(all_steps.max()),
+            }
+        )
+        # the chunk is only visible to readers once the index points at it
+        with open(self.index_path + ".tmp", "w") as f:
+            json.dump(self.index, f)
+        os.replace(self.index_path + ".tmp", self.index_path)
+
+        self._steps, self._values = {}, {}
+        self._num_buffered = 0
+
+    def close(self):
+        self.write_chunk()
+
+
+def load_run(
+    run_dir: str,
+    tags: Iterable[str],
+    min_step: Optional[int] = None,
+    max_step: Optional[int] = None,
+) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    {tag: (steps, values)} for the requested tags of one run (its logdir or
+    its metrics/ dir), sorted by step. Tags the run never logged are left out.
+    """
+    metrics_dir = run_dir if os.path.exists(os.path.join(run_dir, "index.json")) else os.path.join(run_dir, "metrics")
+    with open(os.path.join(metrics_dir, "index.json"), "r") as f:
+        index = json.load(f)
+
+    tags = list(tags)
+    steps = {tag: [] for tag in tags}
+    values = {tag: [] for tag in tags}
+    for chunk in index["chunks"]:
+        wanted = [tag for tag in tags if tag in chunk["tags"]]
+        if not wanted:
+            continue
+        if min_step is not None and chunk["max_step"] < min_step:
+            continue
+        if max_step is not None and chunk["min_step"] > max_step:
+            continue
+        with np.load(os.path.join(metrics_dir, chunk["file"])) as data:
+            for tag in wanted:
+                i = chunk["tags"].index(tag)
+                steps[tag].append(data[f"step_{i}"])
+                values[tag].append(data[f"value_{i}"])
+
+    result = {}
+    for tag in tags:
+        if not steps[tag]:
+            continue
+        s = np.concatenate(steps[tag])
+        v = np.concatenate(values[tag])
+        mask = np.ones(len(s), dtype=bool)
+        if min_step is not None:
+            mask &= s >= min_step
+        if max_step is not None:
+            mask &= s <= max_step
+        order = np.argsort(s[mask], kind="stable")
+        result[tag] = (s[mask][order], v[mask][order])
+    return result
+
+
+def load_runs(
+    run_dirs: Iterable[str],
+    tags: Iterable[str],
+    min_step: Optional[int] = None,
+    max_step: Optional[int] = None,
+) -> Dict[str, Dict[str, Tuple[np.ndarray, np.ndarray]]]:
+    """{run_dir: load_run(run_dir, tags)} for every run that has a metrics store."""
+    tags = list(tags)
+    return {
+        run_dir: load_run(run_dir, tags, min_step, max_step)
+        for run_dir in run_dirs
+        if has_metrics(run_dir)
+    }
+
+
+def has_metrics(run_dir: str) -> bool:
+    return os.path.exists(os.path.join(run_dir, "metrics", "index.json")) or os.path.exists(
+        os.path.join(run_dir, "index.json")
+    )
+
+
+def find_runs(root: str, pattern: str = "*") -> List[str]:
+    """Run directories under `root` matching `pattern` that have a metrics store."""
+    return sorted(d for d in glob.glob(os.path.join(root, pattern)) if has_metrics(d))
@@ -1,4 +1,5 @@
 from typing import Union
+import copy
 
 import torch
 from torch import nn
@@ -98,3 +99,159 @@ def to_numpy(tensor: Union[torch.Tensor, dict]):
         return {k: to_numpy(v) for k, v in tensor.items()}
     else:
         return tensor.to("cpu").detach().numpy()
+
+
+def to_scalars(metrics: dict) -> dict:
+    """
+    Turns the detached 0-d tensors in a dict of metrics (as returned by the
+    agents' update functions) into floats, with a single device sync.
+    """
+    tensor_keys = [k for k, v in metrics.items() if isinstance(v, torch.Tensor)]
+    if not tensor_keys:
+        return dict(metrics)
+    values = torch.stack([metrics[k].detach().float() for k in tensor_keys]).tolist()
+    return {**metrics, **dict(zip(tensor_keys, values))}
+
+
+compile_modes = ("none", "compile", "script")
+
+
+# the schedulers' base class (torch < 2.0 only has the private name)
+_LRScheduler = getattr(torch.optim.lr_scheduler, "LRScheduler", torch.optim.lr_scheduler._LRScheduler)
+
+
+def _snapshot(module: nn.Module) -> dict:
+    """Copies of everything a training step changes: parameters, buffers, gradients,
+    the optimizers and LR schedulers held as attributes of `module`, and the RNG."""
+    stateful = {
+        name: obj
+        for name, obj in vars(module).items()
+        if isinstance(obj, (torch.optim.Optimizer, _LRScheduler))
+    }
+    return {
+        "module": {k: v.detach().clone() for k, v in module.state_dict().items()},
+        "grads": [None if p.grad is None else p.grad.detach().clone() for p in module.parameters()],
+        "stateful": {name: copy.deepcopy(obj.state_dict()) for name, obj in stateful.items()},
+        "rng": torch.get_rng_state(),
+        "cuda_rng": torch.cuda.get_rng_state_all() if torch.cuda.is_available() else None,
+    }
+
+
+def _restore(module: nn.Module, snapshot: dict):
+    module.load_state_dict(snapshot["module"])
+    for p, grad in zip(module.parameters(), snapshot["grads"]):
+        p.grad = grad
+    # optimizers before schedulers: a scheduler's step also changes its optimizer's lr
+    for schedulers in (False, True):
+        for name, state_dict in snapshot["stateful"].items():
+            obj = getattr(module, name)
+            if isinstance(obj, _LRScheduler) == schedulers:
+                obj.load_state_dict(state_dict)
+    torch.set_rng_state(snapshot["rng"])
+    if snapshot["cuda_rng"] is not None:
+        torch.cuda.set_rng_state_all(snapshot["cuda_rng"])
+
+
+class _EagerFallback:
+    """
+    Calls `compiled`, switching to `eager` for good if the *first* call raises.
+    Errors on later calls are real errors and are raised.
+
+    torch.compile can fail part-way through a call (the graphs before a graph
+    break have already run, e.g. an optimizer step), so for functions with side
+    effects pass the module they update as `state`: the first call is then a
+    dry run, after which the module (parameters, gradients, optimizers, LR
+    schedulers) and the RNG are restored and the call is repeated for real.
+    """
+
+    def __init__(self, compiled, eager, name: str, state: nn.Module = None):
+        self.compiled = compiled
+        self.eager = eager
+        self.name = name
+        self.state = state
+        self.checked = False
+        self.failed = False
+
+    def __call__(self, *args, **kwargs):
+        if self.checked:
+            return (self.eager if self.failed else self.compiled)(*args, **kwargs)
+
+        self.checked = True
+        snapshot = _snapshot(self.state) if self.state is not None else None
+        try:
+            result = self.compiled(*args, **kwargs)
+        except Exception as e:
+            print(f"[WARN] compiled {self.name} failed ({type(e).__name__}: {e}), falling back to eager")
+            self.failed = True
+            if snapshot is not None:
+                _restore(self.state, snapshot)
+            return self.eager(*args, **kwargs)
+
+        if snapshot is None:
+            return result
+        _restore(self.state, snapshot)
+        return self.compiled(*args, **kwargs)
+
+
+def compile_fn(fn, mode: str = "none", name: str = None, state: nn.Module = None):
+    """
+    Wraps `fn` (e.g. an agent's bound `update_critic`) with torch.compile, falling
+    back to eager if the first call fails. If `fn` has side effects, pass the
+    module it updates as `state`, so the first call is validated as a dry run on
+    it (see _EagerFallback). TorchScript can't handle the dicts and optimizer
+    calls in update functions, so "script" leaves `fn` unchanged.
+    """
+    assert mode in compile_modes, f"'{mode}' is not a valid compile mode"
+    if mode != "compile" or not hasattr(torch, "compile"):
+        return fn
+    return _EagerFallback(torch.compile(fn), fn, name or getattr(fn, "__name__", "function"), state)
+
+
+def compile_module(module: nn.Module, mode: str = "none", example_inputs: tuple = None) -> nn.Module:
+    """
+    Compiles `module.forward` in place, so parameters, state_dict keys and
+    references to `module` held elsewhere are unaffected.
+
+    "compile" uses torch.compile, "script" uses TorchScript. If
+    `example_inputs` is given, the compiled forward is run on them once and
+    checked against eager; on any error or mismatch the module stays eager.
+    """
+    assert mode in compile_modes, f"'{mode}' is not a valid compile mode"
+    if mode == "none":
+        return module
+
+    name = type(module).__name__
+    eager_forward = module.forward
+    try:
+        if mode == "compile":
+            compiled_forward = torch.compile(eager_forward)
+        else:
+            compiled_forward = torch.jit.script(module).forward
+
+        if example_inputs is not None:
+            with torch.no_grad():
+                expected = eager_forward(*example_inputs)
+                actual = compiled_forward(*example_inputs)
+            assert torch.allclose(expected, actual, rtol=1e-4, atol=1e-5), "outputs differ from eager"
+    except Exception as e:
+        print(f"[WARN] could not {mode} {name} ({type(e).__name__}: {e}), using eager")
+        return module
+
+    module.forward = _EagerFallback(compiled_forward, eager_forward, name)
+    return module
+
+
+def compile_mlps(module: nn.Module, mode: str = "none") -> nn.Module:
+    """
+    Compiles every MLP made by `build_mlp` inside `module` (or `module` itself),
+    verifying each one on a dummy batch.
+    """
+    if mode == "none":
+        return module
+    for submodule in list(module.modules()):
+        if isinstance(submodule, nn.Sequential) and isinstance(submodule[0], nn.Linear):
+            example_input = torch.zeros(
+                2, submodule[0].in_features, device=submodule[0].weight.device
+            )
+            compile_module(submodule, mode, example_inputs=(example_input,))
+    return module
@@ -0,0 +1,153 @@
+"""
+Content-addressed cache of completed runs.
+
+A run is identified by the hash of its resolved config (the config file's
+kwargs with the defaults of its env_configs function filled in), its seed,
+the command-line arguments that affect training, and the source of the cs285
+package. Completed runs are recorded under data/run_cache/<key>.json, pointing
+at their log directory.
+"""
+import argparse
+import glob
+import hashlib
+import inspect
+import json
+import os
+import time
+from typing import Dict, Optional
+
+import yaml
+
+
+default_cache_dir = os.path.realpath(
+    os.path.join(os.path.dirname(__file__), "../../data/run_cache")
+)
+
+# arguments that don't change what a run computes
+_ignored_args = {
+    "config_file",
+    "logdir",
+    "force_rerun",
+    "time_phases",
+    "profile_steps",
+    "profiler",
+    "no_gpu",
+    "which_gpu",
+    "num_threads",
+    "num_interop_threads",
+    "cpu_affinity",
+    "job_index",
+    "num_jobs",
+    "sweep_id",
+    "early_stop_db",
+    "early_stop_min_frac",
+    "early_stop_eta",
+}
+
+_source_hash = None
+
+
+def _hash(obj) -> str:
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def source_hash() -> str:
+    """Hash of every .py file in the cs285 package."""
+    global _source_hash
+    if _source_hash is None:
+        package_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+        h = hashlib.sha256()
+        for path in sorted(glob.glob(os.path.join(package_dir, "**", "*.py"), recursive=True)):
+            h.update(os.path.relpath(path, package_dir).encode())
+            with open(path, "rb") as f:
+                h.update(f.read())
+        _source_hash = h.hexdigest()
+    return _source_hash
+
+
+def resolve_config(config_file: str) -> dict:
+    """The config file's kwargs, plus the defaults of its env_configs function."""
+    import cs285.env_configs
+
+    with open(config_file, "r") as f:
+        config_kwargs = yaml.load(f, Loader=yaml.SafeLoader)
+
+    config_fn = cs285.env_configs.configs[config_kwargs["base_config"]]
+    resolved = {
+        name: param.default
+        for name, param in inspect.signature(config_fn).parameters.items()
+        if param.default is not inspect.Parameter.empty
+    }
+    resolved.update(config_kwargs)
+    return resolved
+
+
+def config_hash(config_file: str) -> str:
+    return _hash(resolve_config(config_file))
+
+
+def run_key(script: str, config_file: str, args: argparse.Namespace) -> dict:
+    """Everything that identifies a run, and its hash under "key"."""
+    run = {
+        "script": script,
+        "config_hash": config_hash(config_file),
+        "seed": args.seed,
+        "args": {k: v for k, v in vars(args).items() if k not in _ignored_args},
+        "source_hash": source_hash(),
+    }
+    run["key"] = _hash(run)
+    return run
+
+
+def lookup(run: dict, cache_dir: str = default_cache_dir) -> Optional[dict]:
+    """The cache entry of a completed run identical to `run`, if its log directory still exists."""
+    path = os.path.join(cache_dir, run["key"] + ".json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        entry = json.load(f)
+    return entry if os.path.isdir(entry["logdir"]) else None
+
+
+def record(run: dict, logdir: str, config_file: str, cache_dir: str = default_cache_dir):
+    """Marks `run` as completed, with its logs in `logdir`."""
+    os.makedirs(cache_dir, exist_ok=True)
+    entry = dict(
+        run,
+        logdir=os.path.realpath(logdir),
+        config_file=config_file,
+        config=resolve_config(config_file),
+        completed=time.strftime("%d-%m-%Y_%H-%M-%S"),
+    )
+    path = os.path.join(cache_dir, run["key"] + ".json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(entry, f, indent=2, default=str)
+    os.replace(path + ".tmp", path)
+
+
+def resolve_runs(
+    config_file: str,
+    script: Optional[str] = None,
+    current_source_only: bool = False,
+    cache_dir: str = default_cache_dir,
+) -> Dict[int, str]:
+    """
+    For plotting: the log directory of the latest completed run of
+    `config_file` for each seed, instead of globbing timestamped directories.
+    By default, runs made with older versions of the code count too.
+    """
+    target_hash = config_hash(config_file)
+    latest = {}
+    for path in glob.glob(os.path.join(cache_dir, "*.json")):
+        with open(path, "r") as f:
+            entry = json.load(f)
+        if entry["config_hash"] != target_hash or not os.path.isdir(entry["logdir"]):
+            continue
+        if script is not None and entry["script"] != script:
+            continue
+        if current_source_only and entry["source_hash"] != source_hash():
+            continue
+        completed = time.strptime(entry["completed"], "%d-%m-%Y_%H-%M-%S")
+        if entry["seed"] not in latest or completed > latest[entry["seed"]][0]:
+            latest[entry["seed"]] = (completed, entry["logdir"])
+    return {seed: logdir for seed, (_, logdir) in sorted(latest.items())}
@@ -0,0 +1,120 @@
+import time
+from typing import Optional
+
+import torch
+from torch import nn
+import torch.nn.functional as F
+
+import cs285.infrastructure.pytorch_util as ptu
+
+
+class AtariQNetwork(nn.Module):
+    """
+    Same network as the nn.Sequential in `atari_dqn_config` (3 conv layers +
+    3136 -> 512 -> num_actions), with options for running fast on CPU:
+
+     - channels_last: keep activations and conv weights in NHWC, which is the
+       layout oneDNN's convolution kernels are fastest on.
+     - use_bf16: run forward (and so backward) under bfloat16 autocast. The
+       output is always float32.
+
+    The uint8 -> [0, 1] scaling is folded into the first convolution's weights
+    rather than done as a separate pass over the input batch.
+    """
+
+    def __init__(self, num_actions: int, channels_last: bool = False, use_bf16: bool = False):
+        super().__init__()
+        self.channels_last = channels_last
+        self.use_bf16 = use_bf16
+
+        self.conv1 = nn.Conv2d(in_channels=4, out_channels=32, kernel_size=8, stride=4)
+        self.conv2 = nn.Conv2d(in_channels=32, out_channels=64, kernel_size=4, stride=2)
+        self.conv3 = nn.Conv2d(in_channels=64, out_channels=64, kernel_size=3, stride=1)
+        self.fc1 = nn.Linear(3136, 512)  # 3136 hard-coded based on img size + CNN layers
+        self.fc2 = nn.Linear(512, num_actions)
+
+        if channels_last:
+            self.to(memory_format=torch.channels_last)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        assert x.ndim in [3, 4], f"Bad observation shape: {x.shape}"
+        assert x.shape[-3:] == (4, 84, 84), f"Bad observation shape: {x.shape}"
+        assert x.dtype == torch.uint8
+
+        unbatched = x.ndim == 3
+        if unbatched:
+            x = x[None]
+
+        memory_format = torch.channels_last if self.channels_last else torch.contiguous_format
+        x = x.to(dtype=torch.float32, memory_format=memory_format)
+
+        with torch.autocast("cpu", dtype=torch.bfloat16, enabled=self.use_bf16):
+            x = F.relu(
+                F.conv2d(x, self.conv1.weight / 255.0, self.conv1.bias, stride=self.conv1.stride)
+            )
+            x = F.relu(self.conv2(x))
+            x = F.relu(self.conv3(x))
+            x = F.relu(self.fc1(torch.flatten(x, 1)))
+            x = self.fc2(x)
+
+        x = x.float()
+        return x[0] if unbatched else x
+
+
+def bf16_supported() -> bool:
+    """Whether this CPU has native bfloat16 support in oneDNN."""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def benchmark_atari_q_network(
+    critic: AtariQNetwork, batch_size: int = 32, num_iters: int = 20, num_warmup: int = 3
+) -> float:
+    """Average seconds per forward + backward on a random uint8 batch."""
+    device = next(critic.parameters()).device
+    obs = torch.randint(0, 256, (batch_size, 4, 84, 84), dtype=torch.uint8, device=device)
+
+    def step():
+        critic.zero_grad(set_to_none=True)
+        critic(obs).max(dim=-1).values.mean().backward()
+
+    for _ in range(num_warmup):
+        step()
+    start = time.perf_counter()
+    for _ in range(num_iters):
+        step()
+    elapsed = (time.perf_counter() - start) / num_iters
+    critic.zero_grad(set_to_none=True)
+    return elapsed
+
+
+def select_atari_cpu_config(
+    num_actions: int, batch_size: int = 32, allow_bf16: bool = True, num_iters: int = 20
+) -> dict:
+    """
+    Times every supported (channels_last, use_bf16) combination at the training
+    batch size and returns the kwargs of the fastest as an AtariQNetwork config.
+    """
+    if ptu.device is not None and ptu.device.type != "cpu":
+        return {"channels_last": False, "use_bf16": False}
+
+    candidates = [
+        {"channels_last": channels_last, "use_bf16": use_bf16}
+        for channels_last in (False, True)
+        for use_bf16 in (False, True)
+        if not use_bf16 or (allow_bf16 and bf16_supported())
+    ]
+
+    best_config: Optional[dict] = None
+    best_time = float("inf")
+    print("Benchmarking Atari Q-network configurations:")
+    for config in candidates:
+        critic = AtariQNetwork(num_actions, **config).to(ptu.device)
+        seconds = benchmark_atari_q_network(critic, batch_size, num_iters=num_iters)
+        print(f"    {config}: {seconds * 1000:.2f} ms / update")
+        if seconds < best_time:
+            best_config, best_time = config, seconds
+    print(f"Using {best_config}")
+    return best_config
@@ -16,9 +16,13 @@ import tqdm
 
 from cs285.infrastructure import utils
 from cs285.infrastructure.logger import Logger
+from cs285.infrastructure import runtime
+from cs285.infrastructure import early_stopping
+from cs285.infrastructure import timers
+from cs285.infrastructure import signal_hooks
 from cs285.infrastructure.replay_buffer import MemoryEfficientReplayBuffer, ReplayBuffer
 
-from scripting_utils import make_logger, make_config
+from scripting_utils import make_logger, make_config, find_cached_run, record_run
 
 MAX_NVIDEO = 2
 
@@ -29,6 +33,12 @@ def run_training_loop(config: dict, logger: Logger, args: argparse.Namespace):
     torch.manual_seed(args.seed)
     ptu.init_gpu(use_gpu=not args.no_gpu, gpu_id=args.which_gpu)
 
+    early_stopper = early_stopping.make_early_stopper(
+        args,
+        config["total_steps"],
+        run_id=os.path.basename(args.logdir) if args.logdir else f"{config['log_name']}_s{args.seed}",
+    )
+
     # make the gym environment
     env:gym.Env = config["make_env"]()
     eval_env = config["make_env"]()
@@ -87,14 +97,22 @@ def run_training_loop(config: dict, logger: Logger, args: argparse.Namespace):
 
     reset_env_training()
 
+    hook = signal_hooks.install(
+        logger._log_dir, {"replay_buffer": replay_buffer}, args.profile_steps, args.profiler
+    )
+
     for step in tqdm.trange(config["total_steps"], dynamic_ncols=True):
+        hook.step(step)
         epsilon = exploration_schedule.value(step)
         
         # TODO(student): Compute action
-        action = agent.get_action(observation,epsilon=epsilon)
+        with timers.phase("action"):
+            action = agent.get_action(observation,epsilon=epsilon)
 
         # TODO(student): Step the environment
-        next_observation,reward,done,info = env.step(action)
+        with timers.phase("env_step"):
+            next_observation,reward,done,info = env.step(action)
+        timers.count("env_steps")
 
         next_observation = np.asarray(next_observation)
         truncated = info.get("TimeLimit.truncated", False)
@@ -107,25 +125,25 @@ def run_training_loop(config: dict, logger: Logger, args: argparse.Namespace):
         
 
         # TODO(student): Add the data to the replay buffer
-        if isinstance(replay_buffer, MemoryEfficientReplayBuffer):
-            # We're using the memory-efficient replay buffer,
-            # so we only insert next_observation (not observation)
-            replay_buffer.insert(
-                None,
-                action=action,
-                reward=reward,
-                next_observation=next_observation,
-                done=done,
-            )
-        else:
-            # We're using the regular replay buffer
-            replay_buffer.insert(
-                observation=observation,
-                action=action,
-                reward=reward,
-                next_observation=next_observation,
-                done=done
-            )
+        with timers.phase("insert"):
+            if isinstance(replay_buffer, MemoryEfficientReplayBuffer):
+                # We're using the memory-efficient replay buffer,
+                # so we only insert next_observation (not observation)
+                replay_buffer.insert(
+                    action=action,
+                    reward=reward,
+                    next_observation=next_observation[-1],
+                    done=done,
+                )
+            else:
+                # We're using the regular replay buffer
+                replay_buffer.insert(
+                    observation=observation,
+                    action=action,
+                    reward=reward,
+                    next_observation=next_observation,
+                    done=done
+                )
 
         # Handle episode termination
         if done:
@@ -139,39 +157,47 @@ def run_training_loop(config: dict, logger: Logger, args: argparse.Namespace):
         # Main DQN training loop
         if step >= config["learning_starts"]:
             # TODO(student): Sample config["batch_size"] samples from the replay buffer
-            batch = replay_buffer.sample(config["batch_size"])
+            with timers.phase("sample"):
+                batch = replay_buffer.sample(config["batch_size"])
 
             # Convert to PyTorch tensors
-            batch = ptu.from_numpy(batch)
+            with timers.phase("h2d"):
+                batch = ptu.from_numpy(batch)
 
             # TODO(student): Train the agent. `batch` is a dictionary of numpy arrays,
             
-            update_info = agent.update(
-                obs=batch['observations'],
-                action=batch['actions'],
-                next_obs=batch['next_observations'],
-                done=batch['dones'],
-                step=step,
-                reward=batch['rewards']
-            )
+            with timers.phase("update"):
+                update_info = agent.update(
+                    obs=batch['observations'],
+                    action=batch['actions'],
+                    next_obs=batch['next_observations'],
+                    done=batch['dones'],
+                    step=step,
+                    reward=batch['rewards']
+                )
+            timers.count("updates")
 
             # Logging code
             update_info["epsilon"] = epsilon
             update_info["lr"] = agent.lr_scheduler.get_last_lr()[0]
 
             if step % args.log_interval == 0:
-                for k, v in update_info.items():
-                    logger.log_scalar(v, k, step)
-                logger.flush()
+                with timers.phase("logging"):
+                    update_info = ptu.to_scalars(update_info)
+                    for k, v in update_info.items():
+                        logger.log_scalar(v, k, step)
+                    timers.log(logger, step)
+                    logger.flush()
 
         if step % args.eval_interval == 0:
             # Evaluate
-            trajectories = utils.sample_n_trajectories(
-                eval_env,
-                agent,
-                args.num_eval_trajectories,
-                ep_len,
-            )
+            with timers.phase("eval"):
+                trajectories = utils.sample_n_trajectories(
+                    eval_env,
+                    agent,
+                    args.num_eval_trajectories,
+                    ep_len,
+                )
             returns = [t["episode_statistics"]["r"] for t in trajectories]
             ep_lens = [t["episode_statistics"]["l"] for t in trajectories]
 
@@ -214,6 +240,13 @@ def run_training_loop(config: dict, logger: Logger, args: argparse.Namespace):
                     video_title="eval_rollouts",
                 )
 
+            if early_stopper is not None and early_stopper.should_stop(step, np.mean(returns)):
+                print(f"[INFO] stopped early at step {step} by successive halving in sweep {args.sweep_id}")
+                logger.flush()
+                return False
+
+    return True
+
 
 def main():
     parser = argparse.ArgumentParser()
@@ -227,10 +260,25 @@ def main():
     parser.add_argument("--no_gpu", "-ngpu", action="store_true")
     parser.add_argument("--which_gpu", "-gpu_id", default=0)
     parser.add_argument("--log_interval", type=int, default=1000)
-
-    parser.add_argument('--change_learning_rate',type=float,default=1e-3)
+    parser.add_argument(
+        "--time_phases", action="store_true"
+    )  # log per-phase timings and env-steps/updates per second at log_interval
+    signal_hooks.add_signal_args(parser)
+    parser.add_argument(
+        "--logdir", type=str, default=None
+    )  # log here instead of data/<prefix><log_name>_<time>
+    parser.add_argument(
+        "--force_rerun", action="store_true"
+    )  # train even if an identical run (config, seed, args, code) already completed
+
+    parser.add_argument('--change_learning_rate',type=float,default=None)  # overrides the config file's learning_rate
+    runtime.add_runtime_args(parser)
+    early_stopping.add_early_stopping_args(parser)
 
     args = parser.parse_args()
+    runtime.configure_runtime_from_args(args)
+    if args.time_phases:
+        timers.enable()
 
     ptu.set_additional_args(args={
         'learning rate':args.change_learning_rate
@@ -239,10 +287,15 @@ def main():
     # create directory for logging
     logdir_prefix = "hw3_dqn_"  # keep for autograder
 
+    run, cached_logdir = find_cached_run(logdir_prefix, args)
+    if cached_logdir is not None:
+        return
+
     config = make_config(args.config_file)
-    logger = make_logger(logdir_prefix, config)
+    logger = make_logger(logdir_prefix, config, args.logdir)
 
-    run_training_loop(config, logger, args)
+    if run_training_loop(config, logger, args):
+        record_run(run, logger, args)
 
 
 if __name__ == "__main__":
@@ -18,8 +18,12 @@ import tqdm
 
 from cs285.infrastructure import utils
 from cs285.infrastructure.logger import Logger
+from cs285.infrastructure import runtime
+from cs285.infrastructure import early_stopping
+from cs285.infrastructure import timers
+from cs285.infrastructure import signal_hooks
 
-from scripting_utils import make_logger, make_config
+from scripting_utils import make_logger, make_config, find_cached_run, record_run
 
 import argparse
 
@@ -31,6 +35,12 @@ def run_training_loop(config: dict, logger: Logger, args: argparse.Namespace):
     torch.manual_seed(args.seed)
     ptu.init_gpu(use_gpu=not args.no_gpu, gpu_id=args.which_gpu)
 
+    early_stopper = early_stopping.make_early_stopper(
+        args,
+        config["total_steps"],
+        run_id=os.path.basename(args.logdir) if args.logdir else f"{config['log_name']}_s{args.seed}",
+    )
+
     # make the gym environment
     env = config["make_env"]()
     eval_env = config["make_env"]()
@@ -64,22 +74,31 @@ def run_training_loop(config: dict, logger: Logger, args: argparse.Namespace):
 
     observation = env.reset()
 
+    hook = signal_hooks.install(
+        logger._log_dir, {"replay_buffer": replay_buffer}, args.profile_steps, args.profiler
+    )
+
     for step in tqdm.trange(config["total_steps"], dynamic_ncols=True):
-        if step < config["random_steps"]:
-            action = env.action_space.sample()
-        else:
-            # TODO(student): Select an action
-            action = agent.get_action(observation)
+        hook.step(step)
+        with timers.phase("action"):
+            if step < config["random_steps"]:
+                action = env.action_space.sample()
+            else:
+                # TODO(student): Select an action
+                action = agent.get_action(observation)
 
         # Step the environment and add the data to the replay buffer
-        next_observation, reward, done, info = env.step(action)
-        replay_buffer.insert(
-            observation=observation,
-            action=action,
-            reward=reward,
-            next_observation=next_observation,
-            done=done and not info.get("TimeLimit.truncated", False),
-        )
+        with timers.phase("env_step"):
+            next_observation, reward, done, info = env.step(action)
+        timers.count("env_steps")
+        with timers.phase("insert"):
+            replay_buffer.insert(
+                observation=observation,
+                action=action,
+                reward=reward,
+                next_observation=next_observation,
+                done=done and not info.get("TimeLimit.truncated", False),
+            )
 
         if done:
             logger.log_scalar(info["episode"]["r"], "train_return", step)
@@ -91,36 +110,44 @@ def run_training_loop(config: dict, logger: Logger, args: argparse.Namespace):
         # Train the agent
         if step >= config["training_starts"]:
             # TODO(student): Sample a batch of config["batch_size"] transitions from the replay buffer
-            batch = replay_buffer.sample(config['batch_size'])
-            for k in batch:
-                batch[k]=ptu.from_numpy(batch[k])
-            update_info = agent.update(
-                observations=batch['observations'],
-                actions=batch['actions'],
-                rewards=batch['rewards'],
-                next_observations=batch['next_observations'],
-                dones=batch['dones'],
-                step=step
-            )
+            with timers.phase("sample"):
+                batch = replay_buffer.sample(config['batch_size'])
+            with timers.phase("h2d"):
+                for k in batch:
+                    batch[k]=ptu.from_numpy(batch[k])
+            with timers.phase("update"):
+                update_info = agent.update(
+                    observations=batch['observations'],
+                    actions=batch['actions'],
+                    rewards=batch['rewards'],
+                    next_observations=batch['next_observations'],
+                    dones=batch['dones'],
+                    step=step
+                )
+            timers.count("updates")
 
             # Logging
             update_info["actor_lr"] = agent.actor_lr_scheduler.get_last_lr()[0]
             update_info["critic_lr"] = agent.critic_lr_scheduler.get_last_lr()[0]
 
             if step % args.log_interval == 0:
-                for k, v in update_info.items():
-                    logger.log_scalar(v, k, step)
-                    logger.log_scalars
-                logger.flush()
+                with timers.phase("logging"):
+                    update_info = ptu.to_scalars(update_info)
+                    for k, v in update_info.items():
+                        logger.log_scalar(v, k, step)
+                        logger.log_scalars
+                    timers.log(logger, step)
+                    logger.flush()
 
         # Run evaluation
         if step % args.eval_interval == 0:
-            trajectories = utils.sample_n_trajectories(
-                eval_env,
-                policy=agent,
-                ntraj=args.num_eval_trajectories,
-                max_length=ep_len,
-            )
+            with timers.phase("eval"):
+                trajectories = utils.sample_n_trajectories(
+                    eval_env,
+                    policy=agent,
+                    ntraj=args.num_eval_trajectories,
+                    max_length=ep_len,
+                )
             returns = [t["episode_statistics"]["r"] for t in trajectories]
             ep_lens = [t["episode_statistics"]["l"] for t in trajectories]
 
@@ -157,6 +184,13 @@ def run_training_loop(config: dict, logger: Logger, args: argparse.Namespace):
                     video_title="eval_rollouts",
                 )
 
+            if early_stopper is not None and early_stopper.should_stop(step, np.mean(returns)):
+                print(f"[INFO] stopped early at step {step} by successive halving in sweep {args.sweep_id}")
+                logger.flush()
+                return False
+
+    return True
+
 
 def main():
     parser = argparse.ArgumentParser()
@@ -170,11 +204,26 @@ def main():
     parser.add_argument("--no_gpu", "-ngpu", action="store_true")
     parser.add_argument("--which_gpu", "-g", default=0)
     parser.add_argument("--log_interval", type=int, default=1000)
+    parser.add_argument(
+        "--time_phases", action="store_true"
+    )  # log per-phase timings and env-steps/updates per second at log_interval
+    signal_hooks.add_signal_args(parser)
+    parser.add_argument(
+        "--logdir", type=str, default=None
+    )  # log here instead of data/<prefix><log_name>_<time>
+    parser.add_argument(
+        "--force_rerun", action="store_true"
+    )  # train even if an identical run (config, seed, args, code) already completed
 
     parser.add_argument('--change_learning_rate',type=float,default=1e-3)
+    runtime.add_runtime_args(parser)
+    early_stopping.add_early_stopping_args(parser)
     parser.add_argument('--bird_method',type=int,default=0)
 
     args = parser.parse_args()
+    runtime.configure_runtime_from_args(args)
+    if args.time_phases:
+        timers.enable()
 
     ptu.set_additional_args(args={
         # 'learning rate':args.change_learning_rate,
@@ -184,15 +233,17 @@ def main():
     # create directory for logging
     logdir_prefix = "hw3_sac_"  # keep for autograder
 
+    run, cached_logdir = find_cached_run(logdir_prefix, args)
+    if cached_logdir is not None:
+        return
+
     config = make_config(args.config_file)
-    logger = make_logger(logdir_prefix, config)
+    logger = make_logger(logdir_prefix, config, args.logdir)
 
-    run_training_loop(config, logger, args)
+    if run_training_loop(config, logger, args):
+        record_run(run, logger, args)
 
 
 if __name__ == "__main__":
-    def signal_handeler(signum,frame):
-        sys.stderr.write('[INFO] sighup handled')
-    signal.signal(signal.SIGHUP,signal_handeler)
-    signal.signal(signal.SIGINT,signal_handeler)
+    signal_hooks.ignore(signal.SIGHUP, signal.SIGINT)
     main()
@@ -0,0 +1,263 @@
+"""
+Runs a grid of hw3 experiments side by side on this machine.
+
+A sweep file looks like
+
+    script: dqn                                # dqn or sac
+    config_file: experiments/dqn/lunarlander.yaml
+    grid:                                      # env_configs parameters
+      learning_rate: [1e-3, 3e-4]              # (don't also pass --change_learning_rate)
+      target_update_period: [1000, 2000]
+    seeds: [1, 2, 3]
+    args:                                      # extra run_hw3_<script>.py flags
+      eval_interval: 10000
+    memory_per_job_gb: 2
+    max_retries: 1
+    early_stopping:                            # optional, see early_stopping.py
+      min_frac: 0.1
+      eta: 3
+
+Every (grid point, seed) is one job. Jobs run on a pool of slots sized by the
+number of cores and the available memory; slot i of n is pinned to the i-th
+share of the cores through CS285_JOB_INDEX / CS285_NUM_JOBS (see
+cs285.infrastructure.runtime). A failed job is retried up to `max_retries`
+times. data/sweeps/<name>_<time>/manifest.json records each job's config,
+seed, status and log directory, and is rewritten whenever a job changes state.
+
+With `early_stopping`, the runs share an ASHA controller through
+data/sweeps/<name>_<time>/early_stopping.sqlite and stop themselves once they
+fall out of the top 1/eta at a rung; those jobs end with status "stopped".
+"""
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+import yaml
+
+from cs285.infrastructure.early_stopping import stopped_runs
+
+
+scripts = {
+    "dqn": ("run_hw3_dqn.py", "hw3_dqn_"),
+    "sac": ("run_hw3_sac.py", "hw3_sac_"),
+}
+
+
+def available_memory_gb() -> Optional[float]:
+    try:
+        import psutil
+
+        return psutil.virtual_memory().available / 2**30
+    except ImportError:
+        pass
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 2**20
+    except OSError:
+        pass
+    return None
+
+
+def num_slots(
+    threads_per_job: int = 1,
+    memory_per_job_gb: Optional[float] = None,
+    max_parallel: Optional[int] = None,
+) -> int:
+    """How many jobs fit at once without oversubscribing cores or memory."""
+    from cs285.infrastructure.runtime import available_cpus
+
+    slots = max(len(available_cpus()) // threads_per_job, 1)
+    if memory_per_job_gb:
+        memory = available_memory_gb()
+        if memory is not None:
+            slots = min(slots, max(int(memory // memory_per_job_gb), 1))
+    if max_parallel:
+        slots = min(slots, max_parallel)
+    return slots
+
+
+def expand_grid(grid: dict) -> List[dict]:
+    """{"a": [1, 2], "b": 3} -> [{"a": 1, "b": 3}, {"a": 2, "b": 3}]"""
+    keys = list(grid.keys())
+    values = [v if isinstance(v, list) else [v] for v in grid.values()]
+    return [dict(zip(keys, combination)) for combination in itertools.product(*values)]
+
+
+def make_jobs(sweep: dict, sweep_dir: str, data_path: str) -> List[dict]:
+    script, logdir_prefix = scripts[sweep.get("script", "dqn")]
+    args = dict(sweep.get("args", {}))
+    if "early_stopping" in sweep:
+        args["sweep_id"] = sweep["name"]
+        args["early_stop_db"] = os.path.join(sweep_dir, "early_stopping.sqlite")
+        args["early_stop_min_frac"] = sweep["early_stopping"].get("min_frac", 0.1)
+        args["early_stop_eta"] = sweep["early_stopping"].get("eta", 3)
+
+    if "learning_rate" in sweep.get("grid", {}) and "change_learning_rate" in args:
+        # the flag would override the grid value in every job
+        raise ValueError("learning_rate is swept, remove change_learning_rate from args")
+
+    base_config = {}
+    if "config_file" in sweep:
+        with open(sweep["config_file"], "r") as f:
+            base_config = yaml.load(f, Loader=yaml.SafeLoader)
+
+    jobs = []
+    for overrides in expand_grid(sweep.get("grid", {})):
+        for seed in sweep.get("seeds", [1]):
+            job_id = f"job{len(jobs):03d}"
+            config = {**base_config, **overrides}
+            config_file = os.path.join(sweep_dir, "configs", f"{job_id}.yaml")
+            with open(config_file, "w") as f:
+                yaml.dump(config, f)
+
+            logdir = os.path.join(
+                data_path, f"{logdir_prefix}{sweep['name']}_{job_id}_s{seed}"
+            )
+            command = [sys.executable, os.path.join(os.path.dirname(__file__), script)]
+            command += ["-cfg", config_file, "--seed", str(seed), "--logdir", logdir]
+            for k, v in args.items():
+                if isinstance(v, bool):
+                    command += [f"--{k}"] if v else []  # store_true flags
+                else:
+                    command += [f"--{k}", str(v)]
+
+            jobs.append(
+                {
+                    "job_id": job_id,
+                    "overrides": overrides,
+                    "config": config,
+                    "seed": seed,
+                    "config_file": config_file,
+                    "logdir": logdir,
+                    "stdout": os.path.join(sweep_dir, "logs", f"{job_id}.log"),
+                    "command": command,
+                    "status": "pending",
+                    "attempts": 0,
+                    "returncode": None,
+                }
+            )
+    return jobs
+
+
+def write_manifest(path: str, sweep: dict, jobs: List[dict]):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"sweep": sweep, "jobs": jobs}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_jobs(
+    jobs: List[dict],
+    slots: int,
+    max_retries: int,
+    manifest_path: str,
+    sweep: dict,
+    poll_interval: float = 1.0,
+):
+    pending = [job for job in jobs if job["status"] not in ("done", "stopped")]
+    running = {}  # slot -> (job, process, stdout file)
+    free_slots = list(range(slots))
+
+    def launch(job, slot):
+        job["attempts"] += 1
+        job["status"] = "running"
+        job["slot"] = slot
+        env = dict(os.environ, CS285_JOB_INDEX=str(slot), CS285_NUM_JOBS=str(slots))
+        stdout = open(job["stdout"], "a")
+        stdout.write(f"==== attempt {job['attempts']}: {' '.join(job['command'])}\n")
+        stdout.flush()
+        process = subprocess.Popen(
+            job["command"], stdout=stdout, stderr=subprocess.STDOUT, env=env
+        )
+        running[slot] = (job, process, stdout)
+        print(f"[{job['job_id']}] started on slot {slot} (attempt {job['attempts']})")
+
+    try:
+        while pending or running:
+            while pending and free_slots:
+                launch(pending.pop(0), free_slots.pop(0))
+                write_manifest(manifest_path, sweep, jobs)
+
+            time.sleep(poll_interval)
+            for slot, (job, process, stdout) in list(running.items()):
+                returncode = process.poll()
+                if returncode is None:
+                    continue
+                stdout.close()
+                del running[slot]
+                free_slots.append(slot)
+                job["returncode"] = returncode
+                if returncode == 0:
+                    job["status"] = "done"
+                    if "early_stopping" in sweep and os.path.basename(job["logdir"]) in stopped_runs(
+                        os.path.join(os.path.dirname(manifest_path), "early_stopping.sqlite"), sweep["name"]
+                    ):
+                        job["status"] = "stopped"
+                    print(f"[{job['job_id']}] {job['status']}")
+                elif job["attempts"] <= max_retries:
+                    job["status"] = "pending"
+                    pending.append(job)
+                    print(f"[{job['job_id']}] failed with code {returncode}, retrying")
+                else:
+                    job["status"] = "failed"
+                    print(f"[{job['job_id']}] failed with code {returncode}, see {job['stdout']}")
+                write_manifest(manifest_path, sweep, jobs)
+    finally:
+        # on Ctrl-C (or any error here), stop the children and record where we got to
+        for job, process, stdout in running.values():
+            process.terminate()
+            process.wait()
+            stdout.close()
+            job["status"] = "killed"
+        write_manifest(manifest_path, sweep, jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sweep_file", "-sweep", type=str, required=True)
+    parser.add_argument("--max_parallel", type=int, default=None)
+    parser.add_argument("--threads_per_job", type=int, default=None)
+    parser.add_argument("--dry_run", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.sweep_file, "r") as f:
+        sweep = yaml.load(f, Loader=yaml.SafeLoader)
+    sweep.setdefault("name", os.path.splitext(os.path.basename(args.sweep_file))[0])
+    sweep["name"] = sweep["name"] + "_" + time.strftime("%d-%m-%Y_%H-%M-%S")
+
+    data_path = os.path.realpath(os.path.join(os.path.dirname(__file__), "../../data"))
+    sweep_dir = os.path.join(data_path, "sweeps", sweep["name"])
+    os.makedirs(os.path.join(sweep_dir, "configs"), exist_ok=True)
+    os.makedirs(os.path.join(sweep_dir, "logs"), exist_ok=True)
+
+    slots = num_slots(
+        threads_per_job=args.threads_per_job or sweep.get("threads_per_job", 1),
+        memory_per_job_gb=sweep.get("memory_per_job_gb"),
+        max_parallel=args.max_parallel or sweep.get("max_parallel"),
+    )
+    jobs = make_jobs(sweep, sweep_dir, data_path)
+    manifest_path = os.path.join(sweep_dir, "manifest.json")
+    write_manifest(manifest_path, sweep, jobs)
+    print(f"{len(jobs)} jobs on {slots} slots, manifest at {manifest_path}")
+
+    if args.dry_run:
+        for job in jobs:
+            print(" ".join(job["command"]))
+        return
+
+    run_jobs(jobs, slots, sweep.get("max_retries", 1), manifest_path, sweep)
+    failed = [job["job_id"] for job in jobs if job["status"] not in ("done", "stopped")]
+    if failed:
+        print(f"{len(failed)} jobs did not finish: {failed}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import os
 import time
 
 import cs285.env_configs
+from cs285.infrastructure import run_cache
 from cs285.infrastructure.logger import Logger
 
 def make_config(config_file: str) -> dict:
@@ -13,17 +14,39 @@ def make_config(config_file: str) -> dict:
     base_config_name = config_kwargs.pop("base_config")
     return cs285.env_configs.configs[base_config_name](**config_kwargs)
 
-def make_logger(logdir_prefix: str, config: dict) -> Logger:
+def make_logger(logdir_prefix: str, config: dict, logdir: str = None) -> Logger:
+    """Logs to data/<prefix><log_name>_<time>, or to `logdir` if given (e.g. by the sweep runner)."""
     data_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../data")
 
     if not (os.path.exists(data_path)):
         os.makedirs(data_path)
     
-    logdir = (
-        logdir_prefix + config["log_name"] + "_" + time.strftime("%d-%m-%Y_%H-%M-%S")
-    )
-    logdir = os.path.join(data_path, logdir)
+    if logdir is None:
+        logdir = (
+            logdir_prefix + config["log_name"] + "_" + time.strftime("%d-%m-%Y_%H-%M-%S")
+        )
+        logdir = os.path.join(data_path, logdir)
     if not (os.path.exists(logdir)):
         os.makedirs(logdir)
 
     return Logger(logdir)
+
+def find_cached_run(logdir_prefix: str, args) -> tuple:
+    """
+    Returns (run, cached_logdir): the run_cache key of this run, and the log
+    directory of an identical completed run (None if there is none, or if
+    --force_rerun is set).
+    """
+    run = run_cache.run_key(logdir_prefix, args.config_file, args)
+    entry = None if args.force_rerun else run_cache.lookup(run)
+    if entry is None:
+        return run, None
+
+    print(f"[INFO] identical run already completed, logs in {entry['logdir']} (--force_rerun to train again)")
+    if args.logdir is not None and not os.path.exists(args.logdir):
+        # so that whoever asked for args.logdir (e.g. the sweep runner) finds the logs there
+        os.symlink(entry["logdir"], args.logdir)
+    return run, entry["logdir"]
+
+def record_run(run: dict, logger: Logger, args):
+    run_cache.record(run, logger._log_dir, args.config_file)
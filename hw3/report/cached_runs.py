@@ -0,0 +1,20 @@
+import argparse
+from cs285.infrastructure.run_cache import resolve_runs
+
+# Log directories of completed runs, looked up in the run cache by config
+# instead of by timestamped directory name, e.g.
+#   logdirs = cached_logdirs('experiments/dqn/lunarlander.yaml')  # {seed: logdir}
+
+def cached_logdirs(config_file:str, script:str=None, current_source_only:bool=False):
+    return resolve_runs(config_file, script=script, current_source_only=current_source_only)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('config_files', nargs='+')
+    parser.add_argument('--script', type=str, default=None)  # e.g. hw3_dqn_
+    parser.add_argument('--current_source_only', action='store_true')
+    args = parser.parse_args()
+    for config_file in args.config_files:
+        print(config_file)
+        for seed, logdir in cached_logdirs(config_file, args.script, args.current_source_only).items():
+            print(f'    seed {seed}: {logdir}')
@@ -44,11 +44,12 @@ Done logging...
             name = l[:i]
             names.append(name)
     out = {n:[] for n in names}
+    # one pass with one regex: match "<name> : <value>" and look the name up
+    pattern = re.compile(r'^(.+?) : (.+)$')
     for l in s:
-        for n in names:
-            find_al = re.findall(f'^{n} \: (.+)$',l)
-            if len(find_al)>0:
-                out[n].append(convert(find_al[0]))
+        m = pattern.match(l.rstrip('\n'))
+        if m is not None and m.group(1) in out:
+            out[m.group(1)].append(convert(m.group(2)))
     json.dump(out,
     open(f'{logname}.json','w'),indent=4
     )
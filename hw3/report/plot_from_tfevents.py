@@ -1,4 +1,5 @@
-from read import read_tfevents_file
+from read import find_event_file
+from aggregate import Aggregator,tfevents_loader,plot_group
 from find_tfevent_by_logs import get_tfevents_file_folder
 import matplotlib.pyplot as plt
 import os
@@ -70,6 +71,7 @@ y_label = 'return'
 plot_title = None
 plot_name = 'P3-1-4-2.png'
 do_smooth = False
+band = None # 'ci' or 'std' to shade the spread across seeds
 
 # CONFIG END
 
@@ -95,41 +97,18 @@ do_smooth = False
 "eval/ep_len_min"
 # KEYS END
 
-def parse_tf_json(tf_path:str):
-    x_values = [[].copy() for _ in range(len(y_axises))]
-    y_values = [[].copy() for _ in range(len(y_axises))]
-    l = read_tfevents_file(tf_path)
-    for dic in l:
-        for i,y_axis in enumerate(y_axises):
-            if x_axis in dic and y_axis in dic:
-                x_values[i].append(dic[x_axis])
-                y_values[i].append(dic[y_axis])
-    return [np.array(x_values[i]) for i in range(len(y_axises))],\
-        [np.array(y_values[i]) for i in range(len(y_axises))]
-
+aggregator = Aggregator(tfevents_loader(x_axis))
 for label,files in labels.items():
-    x_s = [[].copy() for _ in range(len(y_axises))]
-    y_s = [[].copy() for _ in range(len(y_axises))]
-    for file in files:
-        print('finish file',file)
-        tf_folder = get_tfevents_file_folder(file+'.log')
-        tf_file_path = os.listdir(tf_folder)[0]
-        tf_file_path = os.path.join(tf_folder,tf_file_path)
-        x,y = parse_tf_json(tf_file_path)
-        for i,y_axis in enumerate(y_axises):
-            print(f'{i}(for {y_axis}) append x: {x[i].shape}')
-            x_s[i].append(x[i]);y_s[i].append(y[i])
-    for i,y_axis in enumerate(y_axises):
-        m_len1 = min([len(c) for c in x_s[i]])
-        m_len2 = min([len(c) for c in y_s[i]])
-        m_len = min(m_len1,m_len2)
-        x_s[i] = np.stack([c[:m_len] for c in x_s[i]],axis=0).mean(axis=0)
-        y_s[i] = np.stack([c[:m_len] for c in y_s[i]],axis=0).mean(axis=0)
-        print(f'ploting label <{label} {y_axis}>...')
+    sources = [find_event_file(get_tfevents_file_folder(file+'.log')) for file in files]
+    for y_axis in y_axises:
+        # seeds are resampled onto a common step grid; cached until a run gets new events
+        agg = aggregator.group(sources,y_axis)
+        print(f'ploting label <{label} {y_axis}> over {len(sources)} runs...')
         if 'train' in y_axis or do_smooth:
-            plt.plot(x_s[i],smooth(y_s[i]),label=label+' '+y_axis)
-        else:
-            plt.plot(x_s[i],y_s[i],label=label+' '+y_axis)
+            # smooth the band with the mean (smooth is linear), so it stays centred on the line
+            for k in ('mean','std','ci_low','ci_high'):
+                agg[k] = smooth(agg[k])
+        plot_group(plt.gca(),agg,label+' '+y_axis,band=band)
 
 plt.xlabel(x_axis)
 plt.ylabel(y_label)
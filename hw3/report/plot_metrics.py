@@ -0,0 +1,31 @@
+import argparse,os
+import numpy as np
+import matplotlib.pyplot as plt
+from cs285.infrastructure.metrics_store import find_runs,load_runs
+
+# Plots tags of many runs straight from their metrics stores, e.g.
+#   python report/plot_metrics.py 'hw3_dqn_*LunarLander*' --tags eval_return --out lunar.png
+
+def plot_runs(run_dirs,tags,out,min_step=None,max_step=None):
+    runs = load_runs(run_dirs,tags,min_step,max_step)
+    for tag in tags:
+        for run_dir,metrics in runs.items():
+            if tag in metrics:
+                steps,values = metrics[tag]
+                plt.plot(steps,values,label=os.path.basename(run_dir)+' '+tag)
+    plt.xlabel('step')
+    plt.legend(fontsize='xx-small')
+    plt.savefig(out)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('patterns',nargs='+')  # glob patterns of run directories under --root
+    parser.add_argument('--root',type=str,default='data')
+    parser.add_argument('--tags',nargs='+',default=['eval_return'])
+    parser.add_argument('--min_step',type=int,default=None)
+    parser.add_argument('--max_step',type=int,default=None)
+    parser.add_argument('--out',type=str,default='metrics.png')
+    args = parser.parse_args()
+    run_dirs = sorted(set(d for p in args.patterns for d in find_runs(args.root,p)))
+    print(f'{len(run_dirs)} runs')
+    plot_runs(run_dirs,args.tags,args.out,args.min_step,args.max_step)
@@ -4,6 +4,8 @@ import torch.nn as nn
 import torch
 import gym
 from cs285.infrastructure import pytorch_util as ptu
+from cs285.infrastructure.running_stats import RunningMeanStd
+from cs285.agents.planners import make_planner
 
 
 class ModelBasedAgent(nn.Module):
@@ -19,6 +21,11 @@ class ModelBasedAgent(nn.Module):
         cem_num_iters: Optional[int] = None,
         cem_num_elites: Optional[int] = None,
         cem_alpha: Optional[float] = None,
+        mppi_temperature: float = 1.0,
+        mppi_noise_std: float = 0.5,
+        mppi_noise_beta: float = 2.0,
+        mppi_num_iters: int = 1,
+        compile_mode: str = "none",
     ):
         super().__init__()
         self.env = env
@@ -32,6 +39,7 @@ class ModelBasedAgent(nn.Module):
         assert mpc_strategy in (
             "random",
             "cem",
+            "mppi",
         ), f"'{mpc_strategy}' is not a valid MPC strategy"
 
         # ensure the environment is state-based
@@ -41,6 +49,21 @@ class ModelBasedAgent(nn.Module):
         self.ob_dim = env.observation_space.shape[0]
         self.ac_dim = env.action_space.shape[0]
 
+        self.planner = make_planner(
+            mpc_strategy,
+            env.action_space.low,
+            env.action_space.high,
+            horizon=mpc_horizon,
+            num_action_sequences=mpc_num_action_sequences,
+            cem_num_iters=cem_num_iters,
+            cem_num_elites=cem_num_elites,
+            cem_alpha=cem_alpha,
+            mppi_temperature=mppi_temperature,
+            mppi_noise_std=mppi_noise_std,
+            mppi_noise_beta=mppi_noise_beta,
+            mppi_num_iters=mppi_num_iters,
+        )
+
         self.ensemble_size = ensemble_size
         self.dynamics_models = nn.ModuleList(
             [
@@ -54,6 +77,10 @@ class ModelBasedAgent(nn.Module):
         self.optimizer = make_optimizer(self.dynamics_models.parameters())
         self.loss_fn = nn.MSELoss()
 
+        # compile the vmapped call as a whole; the members themselves must stay
+        # eager, so functional_call can swap in each member's parameters
+        self.ensemble_forward = ptu.compile_fn(self.ensemble_forward, compile_mode)
+
         # keep track of statistics for both the model input (obs & act) and
         # output (obs delta)
         self.register_buffer(
@@ -68,6 +95,17 @@ class ModelBasedAgent(nn.Module):
         self.register_buffer(
             "obs_delta_std", torch.ones(self.ob_dim, device=ptu.device)
         )
+        # streaming versions of the same statistics, see update_statistics_incremental
+        self.obs_acs_stats = RunningMeanStd(self.ob_dim + self.ac_dim)
+        self.obs_delta_stats = RunningMeanStd(self.ob_dim)
+
+    def reset(self):
+        """
+        Clear the planner's state (e.g. MPPI's warm-started nominal action
+        sequence). Call at the start of every episode and after the dynamics
+        models are refit.
+        """
+        self.planner.reset()
 
     def update(self, i: int, obs: np.ndarray, acs: np.ndarray, next_obs: np.ndarray):
         """
@@ -105,6 +143,67 @@ class ModelBasedAgent(nn.Module):
 
         return ptu.to_numpy(loss)
 
+    def ensemble_forward(self, inputs: torch.Tensor) -> torch.Tensor:
+        """
+        Run slice i of `inputs` through self.dynamics_models[i], for all members
+        in a single vectorized call over their stacked weights. The stacked
+        weights are built from the live parameters, so gradients flow back to
+        each member.
+
+        Args:
+            inputs: (ensemble_size, batch_size, ob_dim + ac_dim)
+        Returns: (ensemble_size, batch_size, ob_dim)
+        """
+        if not hasattr(torch, "func"):
+            # torch < 2.0: fall back to one call per member
+            return torch.stack(
+                [model(x) for model, x in zip(self.dynamics_models, inputs)], dim=0
+            )
+
+        member_params = [dict(model.named_parameters()) for model in self.dynamics_models]
+        stacked_params = {
+            name: torch.stack([params[name] for params in member_params], dim=0)
+            for name in member_params[0]
+        }
+        base_model = self.dynamics_models[0]
+
+        def call_member(params, x):
+            return torch.func.functional_call(base_model, params, (x,))
+
+        return torch.func.vmap(call_member)(stacked_params, inputs)
+
+    def update_ensemble(self, obs: np.ndarray, acs: np.ndarray, next_obs: np.ndarray):
+        """
+        Update all dynamics models at once: member i is trained on batch i, with
+        one forward/backward pass and a single optimizer step.
+
+        Args:
+            obs: (ensemble_size, batch_size, ob_dim)
+            acs: (ensemble_size, batch_size, ac_dim)
+            next_obs: (ensemble_size, batch_size, ob_dim)
+        Returns:
+            losses: (ensemble_size,) loss of each member
+        """
+        obs = ptu.from_numpy(obs)
+        acs = ptu.from_numpy(acs)
+        next_obs = ptu.from_numpy(next_obs)
+        assert obs.shape[0] == self.ensemble_size
+
+        delta = next_obs - obs
+        delta = (delta - self.obs_delta_mean) / (self.obs_delta_std + 1e-8)
+        cat = torch.cat((obs, acs), dim=-1)
+        cat = (cat - self.obs_acs_mean) / (self.obs_acs_std + 1e-8)
+
+        losses = ((self.ensemble_forward(cat) - delta) ** 2).mean(dim=(1, 2))
+
+        # the members share no parameters, so the gradient of the sum w.r.t.
+        # each member is that member's own loss gradient
+        self.optimizer.zero_grad()
+        losses.sum().backward()
+        self.optimizer.step()
+
+        return ptu.to_numpy(losses)
+
     @torch.no_grad()
     def update_statistics(self, obs: np.ndarray, acs: np.ndarray, next_obs: np.ndarray):
         """
@@ -127,6 +226,29 @@ class ModelBasedAgent(nn.Module):
         self.obs_delta_mean = torch.mean(deltas,dim=0)
         self.obs_delta_std = torch.std(deltas,dim=0)
 
+    @torch.no_grad()
+    def update_statistics_incremental(
+        self, obs: np.ndarray, acs: np.ndarray, next_obs: np.ndarray
+    ):
+        """
+        Same as `update_statistics`, but takes only the transitions added since
+        the previous call and merges them into running statistics, so the cost
+        doesn't grow with the replay buffer. Matches `update_statistics` over
+        every transition passed in so far (up to float rounding).
+
+        Args:
+            obs: (n, ob_dim)
+            acs: (n, ac_dim)
+            next_obs: (n, ob_dim)
+        """
+        self.obs_acs_stats.update(np.concatenate((obs, acs), axis=-1))
+        self.obs_delta_stats.update(next_obs - obs)
+
+        self.obs_acs_mean = ptu.from_numpy(self.obs_acs_stats.mean)
+        self.obs_acs_std = ptu.from_numpy(self.obs_acs_stats.std)
+        self.obs_delta_mean = ptu.from_numpy(self.obs_delta_stats.mean)
+        self.obs_delta_std = ptu.from_numpy(self.obs_delta_stats.std)
+
     @torch.no_grad()
     def get_dynamics_predictions(
         self, i: int, obs: np.ndarray, acs: np.ndarray
@@ -157,79 +279,102 @@ class ModelBasedAgent(nn.Module):
 
         return ptu.to_numpy(pred_next_obs)
 
-    def evaluate_action_sequences(self, obs: np.ndarray, action_sequences: np.ndarray):
+    @torch.no_grad()
+    def get_dynamics_predictions_per_member(
+        self, model_indices: np.ndarray, obs: np.ndarray, acs: np.ndarray
+    ) -> np.ndarray:
         """
-        Evaluate a batch of action sequences using the ensemble of dynamics models.
+        Like `get_dynamics_predictions`, but row j is predicted by
+        self.dynamics_models[model_indices[j]]. Each member runs one forward
+        pass over the rows assigned to it.
 
         Args:
-            obs: starting observation, shape (ob_dim,)
-            action_sequences: shape (mpc_num_action_sequences, horizon, ac_dim)
-        Returns:
-            sum_of_rewards: shape (mpc_num_action_sequences,)
+            model_indices: (batch_size,) integers in [0, ensemble_size)
+            obs: (batch_size, ob_dim)
+            acs: (batch_size, ac_dim)
+        Returns: (batch_size, ob_dim)
         """
-        # We are going to predict (ensemble_size * mpc_num_action_sequences)
-        # distinct rollouts, and then average over the ensemble dimension to get
-        # the reward for each action sequence.
+        obs = ptu.from_numpy(obs)
+        acs = ptu.from_numpy(acs)
+        model_indices = ptu.from_numpy(np.asarray(model_indices, dtype=np.int64))
 
-        # We start by initializing an array to keep track of the reward for each
-        # of these rollouts.
-        sum_of_rewards = np.zeros(
-            (self.ensemble_size, self.mpc_num_action_sequences), dtype=np.float32
-        )
-        # We need to repeat our starting obs for each of the rollouts.
-        obs = np.tile(obs, (self.ensemble_size, self.mpc_num_action_sequences, 1))
+        cat = torch.cat((obs, acs), dim=-1)
+        cat = (cat - self.obs_acs_mean) / (self.obs_acs_std + 1e-8)
+
+        deltas = torch.empty_like(obs)
+        for i in range(self.ensemble_size):
+            mask = model_indices == i
+            if mask.any():
+                deltas[mask] = self.dynamics_models[i](cat[mask])
 
-        # TODO(student): for each batch of actions in in the horizon...
+        pred_next_obs = obs + deltas * self.obs_delta_std + self.obs_delta_mean
+        return ptu.to_numpy(pred_next_obs)
 
+    @torch.no_grad()
+    def predict_next_obs(self, obs: torch.Tensor, acs: torch.Tensor) -> torch.Tensor:
         """
-        'mpc_horizon': 10,
-        'mpc_strategy': 'random',
-        'mpc_num_action_sequences': 1000,
-        'cem_num_iters': None,
-        'cem_num_elites': None,
-        'cem_alpha': None,
-        'ob_dim': 4, 
-        'ac_dim': 2, 
-        'ensemble_size': 3
+        Batched, on-device counterpart of `get_dynamics_predictions`: slice i
+        of the leading dimension is stepped through self.dynamics_models[i].
+
+        Args:
+            obs: (ensemble_size, batch_size, ob_dim)
+            acs: (ensemble_size, batch_size, ac_dim) or (batch_size, ac_dim)
+        Returns: (ensemble_size, batch_size, ob_dim)
         """
-        # action_sequences.shape: (self.mpc_num_action_sequences (Horizon H) , self.mpc_horizon, self.ac_dim)
-        for t,acs in enumerate(action_sequences.transpose(1,0,2)):
-            assert acs.shape == (self.mpc_num_action_sequences, self.ac_dim)
-            assert obs.shape == (
-                self.ensemble_size,
-                self.mpc_num_action_sequences,
-                self.ob_dim,
+        if acs.ndim == 2:
+            acs = acs[None].expand(self.ensemble_size, *acs.shape)
+
+        cat = torch.cat((obs, acs), dim=-1)
+        cat = (cat - self.obs_acs_mean) / (self.obs_acs_std + 1e-8)
+
+        if not ptu.strategy:
+            deltas = self.ensemble_forward(cat)
+        else:
+            deltas = torch.stack(
+                [
+                    self.dynamics_models[
+                        torch.randint(0, self.ensemble_size - 1, (1,)).item()
+                    ](cat[i])
+                    for i in range(self.ensemble_size)
+                ],
+                dim=0,
             )
 
-            # TODO(student): predict the next_obs for each rollout
-            # HINT: use self.get_dynamics_predictions
+        return obs + deltas * self.obs_delta_std + self.obs_delta_mean
 
-            next_obs = []
-            for i in range(self.ensemble_size):
-                next_obs.append(self.get_dynamics_predictions(
-                    i if not ptu.strategy else torch.randint(0,self.ensemble_size-1,(1,)).item()
-                    ,obs[i],acs))
-            next_obs = np.stack(next_obs,axis=0)
+    @torch.no_grad()
+    def evaluate_action_sequences(self, obs: np.ndarray, action_sequences: np.ndarray):
+        """
+        Evaluate a batch of action sequences using the ensemble of dynamics models.
 
-            assert next_obs.shape == (
-                self.ensemble_size,
-                self.mpc_num_action_sequences,
-                self.ob_dim,
-            )
+        Args:
+            obs: starting observation, shape (ob_dim,)
+            action_sequences: shape (num_action_sequences, horizon, ac_dim)
+        Returns:
+            sum_of_rewards: shape (num_action_sequences,)
+        """
+        # We are going to predict (ensemble_size * num_action_sequences)
+        # distinct rollouts, and then average over the ensemble dimension to get
+        # the reward for each action sequence. The rollouts stay on the device;
+        # only the predicted observations come back to compute rewards.
+        num_sequences, horizon, _ = action_sequences.shape
+        sum_of_rewards = np.zeros(
+            (self.ensemble_size, num_sequences), dtype=np.float32
+        )
+        obs = ptu.from_numpy(
+            np.tile(obs, (self.ensemble_size, num_sequences, 1))
+        )
+        device_action_sequences = ptu.from_numpy(action_sequences)
 
-            # TODO(student): get the reward for the current step in each rollout
-            # HINT: use `self.env.get_reward`. `get_reward` takes 2 arguments:
-            # `next_obs` and `acs` with shape (n, ob_dim) and (n, ac_dim),
-            # respectively, and returns a tuple of `(rewards, dones)`. You can 
-            # ignore `dones`. You might want to do some reshaping to make
-            # `next_obs` and `acs` 2-dimensional.
-            rewards,_ = self.env.get_reward(
-                next_obs.reshape(-1,self.ob_dim),acs.reshape(-1,self.ac_dim)
-            )
-            rewards = rewards.reshape(self.ensemble_size,self.mpc_num_action_sequences)
-            assert rewards.shape == (self.ensemble_size, self.mpc_num_action_sequences)
+        for t in range(horizon):
+            next_obs = self.predict_next_obs(obs, device_action_sequences[:, t])
+            assert next_obs.shape == (self.ensemble_size, num_sequences, self.ob_dim)
 
-            sum_of_rewards += rewards
+            rewards, _ = self.env.get_reward(
+                ptu.to_numpy(next_obs).reshape(-1, self.ob_dim),
+                np.tile(action_sequences[:, t], (self.ensemble_size, 1)),
+            )
+            sum_of_rewards += rewards.reshape(self.ensemble_size, num_sequences)
 
             obs = next_obs
 
@@ -243,42 +388,4 @@ class ModelBasedAgent(nn.Module):
         Args:
             obs: (ob_dim,)
         """
-        # always start with uniformly random actions
-        action_sequences = np.random.uniform(
-            self.env.action_space.low,
-            self.env.action_space.high,
-            size=(self.mpc_num_action_sequences, self.mpc_horizon, self.ac_dim),
-        )
-
-        if self.mpc_strategy == "random":
-            # evaluate each action sequence and return the best one
-            rewards = self.evaluate_action_sequences(obs, action_sequences)
-            assert rewards.shape == (self.mpc_num_action_sequences,)
-            best_index = np.argmax(rewards)
-            return action_sequences[best_index][0]
-        elif self.mpc_strategy == "cem":
-            elite_mean, elite_std = None, None
-            for i in range(self.cem_num_iters):
-                # TODO(student): implement the CEM algorithm
-                # HINT: you need a special case for i == 0 to initialize
-                # the elite mean and std
-                rewards:np.ndarray = self.evaluate_action_sequences(obs,action_sequences)
-                top_ind = rewards.argpartition(-self.cem_num_elites)[-self.cem_num_elites:]
-                elites = action_sequences[top_ind]
-                if elite_mean is None:
-                    elite_mean = np.mean(elites,axis=0)
-                    elite_std = np.std(elites,axis=0) 
-                else:
-                    elite_mean = np.mean(elites,axis=0)*self.cem_alpha+elite_mean*(1-self.cem_alpha)
-                    elite_std = np.std(elites,axis=0)*self.cem_alpha+elite_std*(1-self.cem_alpha)
-                # sample from gaussian
-                if i != self.cem_num_iters-1:
-                    action_sequences = np.random.normal(
-                        elite_mean,
-                        elite_std,
-                        size=(self.mpc_num_action_sequences, self.mpc_horizon, self.ac_dim),
-                    )
-                else:
-                    return elites[-1,0,:]
-        else:
-            raise ValueError(f"Invalid MPC strategy '{self.mpc_strategy}'")
+        return self.planner.plan(obs, self.evaluate_action_sequences)
@@ -0,0 +1,250 @@
+from typing import Callable, Optional
+import numpy as np
+
+
+# evaluate_fn(obs, action_sequences) -> sum_of_rewards
+# obs: (ob_dim,), action_sequences: (num_sequences, horizon, ac_dim)
+# sum_of_rewards: (num_sequences,)
+EvaluateFn = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+def colored_noise(beta: float, num_samples: int, horizon: int, ac_dim: int) -> np.ndarray:
+    """
+    Sample Gaussian noise with a 1/f^beta power spectrum along the horizon axis.
+
+    beta = 0 is white noise, beta = 1 pink, beta = 2 red/brownian; larger
+    exponents give smoother (more temporally correlated) action sequences.
+    Each (sample, action dimension) pair is an independent series with unit
+    variance.
+
+    Returns: (num_samples, horizon, ac_dim)
+    """
+    if beta == 0 or horizon < 2:
+        return np.random.standard_normal((num_samples, horizon, ac_dim))
+
+    freqs = np.fft.rfftfreq(horizon)
+    # the lowest frequency we can represent is 1 / horizon; the DC component
+    # gets the same scale so that it doesn't blow up
+    scale = freqs.copy()
+    scale[0] = scale[1]
+    scale = scale ** (-beta / 2.0)
+
+    # normalize to unit variance
+    w = scale[1:].copy()
+    w[-1] *= (1 + (horizon % 2)) / 2.0
+    sigma = 2 * np.sqrt(np.sum(w**2)) / horizon
+
+    size = (num_samples, ac_dim, len(freqs))
+    real = np.random.normal(scale=scale, size=size)
+    imag = np.random.normal(scale=scale, size=size)
+    # DC (and Nyquist, for even horizons) components must be real
+    if horizon % 2 == 0:
+        imag[..., -1] = 0
+        real[..., -1] *= np.sqrt(2)
+    imag[..., 0] = 0
+    real[..., 0] *= np.sqrt(2)
+
+    noise = np.fft.irfft(real + 1j * imag, n=horizon, axis=-1) / sigma
+    return noise.transpose(0, 2, 1)
+
+
+class Planner:
+    """
+    Sampling-based MPC planner. Given the current observation, proposes action
+    sequences, scores them with `evaluate_fn` (which rolls them out through the
+    learned dynamics model) and returns the first action to execute.
+    """
+
+    def __init__(
+        self,
+        ac_low: np.ndarray,
+        ac_high: np.ndarray,
+        horizon: int,
+        num_action_sequences: int,
+    ):
+        self.ac_low = ac_low
+        self.ac_high = ac_high
+        self.ac_dim = ac_low.shape[0]
+        self.horizon = horizon
+        self.num_action_sequences = num_action_sequences
+
+    def sample_uniform(self) -> np.ndarray:
+        return np.random.uniform(
+            self.ac_low,
+            self.ac_high,
+            size=(self.num_action_sequences, self.horizon, self.ac_dim),
+        )
+
+    def reset(self):
+        """Clear any state carried over between calls (e.g. at episode start)."""
+        pass
+
+    def plan(self, obs: np.ndarray, evaluate_fn: EvaluateFn) -> np.ndarray:
+        """
+        Args:
+            obs: (ob_dim,)
+            evaluate_fn: scores a batch of action sequences from `obs`
+        Returns: (ac_dim,)
+        """
+        raise NotImplementedError
+
+
+class RandomShootingPlanner(Planner):
+    def plan(self, obs: np.ndarray, evaluate_fn: EvaluateFn) -> np.ndarray:
+        # evaluate uniformly random action sequences and return the best one
+        action_sequences = self.sample_uniform()
+        rewards = evaluate_fn(obs, action_sequences)
+        assert rewards.shape == (self.num_action_sequences,)
+        best_index = np.argmax(rewards)
+        return action_sequences[best_index][0]
+
+
+class CEMPlanner(Planner):
+    def __init__(
+        self,
+        ac_low: np.ndarray,
+        ac_high: np.ndarray,
+        horizon: int,
+        num_action_sequences: int,
+        num_iters: int,
+        num_elites: int,
+        alpha: float,
+    ):
+        super().__init__(ac_low, ac_high, horizon, num_action_sequences)
+        assert num_iters is not None and num_iters > 0
+        assert num_elites is not None and 0 < num_elites <= num_action_sequences
+        assert alpha is not None
+        self.num_iters = num_iters
+        self.num_elites = num_elites
+        self.alpha = alpha
+
+    def plan(self, obs: np.ndarray, evaluate_fn: EvaluateFn) -> np.ndarray:
+        # always start with uniformly random actions
+        action_sequences = self.sample_uniform()
+        elite_mean, elite_std = None, None
+        for i in range(self.num_iters):
+            rewards = evaluate_fn(obs, action_sequences)
+            top_ind = rewards.argpartition(-self.num_elites)[-self.num_elites :]
+            elites = action_sequences[top_ind]
+            if elite_mean is None:
+                elite_mean = np.mean(elites, axis=0)
+                elite_std = np.std(elites, axis=0)
+            else:
+                elite_mean = (
+                    np.mean(elites, axis=0) * self.alpha
+                    + elite_mean * (1 - self.alpha)
+                )
+                elite_std = (
+                    np.std(elites, axis=0) * self.alpha + elite_std * (1 - self.alpha)
+                )
+
+            # sample from gaussian
+            if i != self.num_iters - 1:
+                action_sequences = np.random.normal(
+                    elite_mean,
+                    elite_std,
+                    size=(self.num_action_sequences, self.horizon, self.ac_dim),
+                )
+            else:
+                return elites[-1, 0, :]
+
+
+class MPPIPlanner(Planner):
+    """
+    Model predictive path integral control: perturb a nominal action sequence
+    with temporally correlated (colored) noise and move it towards the
+    exponentially-weighted average of the perturbed sequences. The nominal
+    sequence is shifted by one step and reused on the next call, so a few
+    hundred samples are usually enough where random shooting needs thousands.
+    """
+
+    def __init__(
+        self,
+        ac_low: np.ndarray,
+        ac_high: np.ndarray,
+        horizon: int,
+        num_action_sequences: int,
+        temperature: float = 1.0,
+        noise_std: float = 0.5,
+        noise_beta: float = 2.0,
+        num_iters: int = 1,
+    ):
+        super().__init__(ac_low, ac_high, horizon, num_action_sequences)
+        assert temperature > 0
+        assert num_iters > 0
+        self.temperature = temperature
+        # noise_std is relative to half the width of the action space
+        self.noise_scale = noise_std * (ac_high - ac_low) / 2.0
+        self.noise_beta = noise_beta
+        self.num_iters = num_iters
+        self.nominal: Optional[np.ndarray] = None
+
+    def reset(self):
+        self.nominal = None
+
+    def plan(self, obs: np.ndarray, evaluate_fn: EvaluateFn) -> np.ndarray:
+        if self.nominal is None:
+            self.nominal = np.tile(
+                (self.ac_low + self.ac_high) / 2.0, (self.horizon, 1)
+            )
+
+        for _ in range(self.num_iters):
+            noise = self.noise_scale * colored_noise(
+                self.noise_beta, self.num_action_sequences, self.horizon, self.ac_dim
+            )
+            action_sequences = np.clip(
+                self.nominal[None] + noise, self.ac_low, self.ac_high
+            )
+            rewards = evaluate_fn(obs, action_sequences)
+            assert rewards.shape == (self.num_action_sequences,)
+
+            # softmax weights; subtract the max for numerical stability
+            weights = np.exp((rewards - np.max(rewards)) / self.temperature)
+            weights /= np.sum(weights)
+            self.nominal = np.einsum("n,nhd->hd", weights, action_sequences)
+
+        action = self.nominal[0].copy()
+        # warm-start the next call with the remainder of the plan
+        self.nominal = np.concatenate([self.nominal[1:], self.nominal[-1:]], axis=0)
+        return action
+
+
+def make_planner(
+    mpc_strategy: str,
+    ac_low: np.ndarray,
+    ac_high: np.ndarray,
+    horizon: int,
+    num_action_sequences: int,
+    cem_num_iters: Optional[int] = None,
+    cem_num_elites: Optional[int] = None,
+    cem_alpha: Optional[float] = None,
+    mppi_temperature: float = 1.0,
+    mppi_noise_std: float = 0.5,
+    mppi_noise_beta: float = 2.0,
+    mppi_num_iters: int = 1,
+) -> Planner:
+    if mpc_strategy == "random":
+        return RandomShootingPlanner(ac_low, ac_high, horizon, num_action_sequences)
+    elif mpc_strategy == "cem":
+        return CEMPlanner(
+            ac_low,
+            ac_high,
+            horizon,
+            num_action_sequences,
+            num_iters=cem_num_iters,
+            num_elites=cem_num_elites,
+            alpha=cem_alpha,
+        )
+    elif mpc_strategy == "mppi":
+        return MPPIPlanner(
+            ac_low,
+            ac_high,
+            horizon,
+            num_action_sequences,
+            temperature=mppi_temperature,
+            noise_std=mppi_noise_std,
+            noise_beta=mppi_noise_beta,
+            num_iters=mppi_num_iters,
+        )
+    else:
+        raise ValueError(f"Invalid MPC strategy '{mpc_strategy}'")
@@ -6,6 +6,7 @@ from torch import nn
 import numpy as np
 
 import cs285.infrastructure.pytorch_util as ptu
+from cs285.infrastructure import timers
 def full_print(var,name):
     print(name,var)
     print(name+'.shape',var.shape)
@@ -41,6 +42,7 @@ class SoftActorCritic(nn.Module):
         use_entropy_bonus: bool = False,
         temperature: float = 0.0,
         backup_entropy: bool = True,
+        compile_mode: str = "none",
     ):
         super().__init__()
 
@@ -99,20 +101,29 @@ class SoftActorCritic(nn.Module):
 
         self.update_target_critic()
 
+        self.update_critic = ptu.compile_fn(self.update_critic, compile_mode, state=self)
+        self.update_actor = ptu.compile_fn(self.update_actor, compile_mode, state=self)
+
         print('agent info:')
         print(self.__dict__)
 
     def get_action(self, observation: np.ndarray) -> np.ndarray:
         """
-        Compute the action for a given observation.
+        Compute the action for a given observation, or for a batch of
+        observations of shape (batch_size, *observation_shape).
         """
         with torch.no_grad():
-            observation = ptu.from_numpy(observation)[None]
+            observation = ptu.from_numpy(observation)
+            batched = observation.ndim > len(self.observation_shape)
+            if not batched:
+                observation = observation[None]
 
             action_distribution: torch.distributions.Distribution = self.actor(observation)
             action: torch.Tensor = action_distribution.sample()
 
-            assert action.shape == (1, self.action_dim), action.shape
+            assert action.shape == (observation.shape[0], self.action_dim), action.shape
+            if batched:
+                return ptu.to_numpy(action)
             return ptu.to_numpy(action).squeeze(0)
 
     def critic(self, obs: torch.Tensor, action: torch.Tensor) -> torch.Tensor:
@@ -381,11 +392,13 @@ class SoftActorCritic(nn.Module):
         # full_print(dones,'dones') # [128]
         critic_infos = []
         # TODO(student): Update the critic for num_critic_upates steps, and add the output stats to critic_infos
-        for _ in range(self.num_critic_updates):
-            critic_infos.append(self.update_critic(observations,actions,rewards,next_observations,done=dones))
+        with timers.phase("critic_update"):
+            for _ in range(self.num_critic_updates):
+                critic_infos.append(self.update_critic(observations,actions,rewards,next_observations,done=dones))
 
         # TODO(student): Update the actor
-        actor_info = self.update_actor(observations)
+        with timers.phase("actor_update"):
+            actor_info = self.update_actor(observations)
 
         # TODO(student): Perform either hard or soft target updates.
         # Relevant variables:
@@ -393,13 +406,14 @@ class SoftActorCritic(nn.Module):
         #  - self.target_update_period (None when using soft updates)
         #  - self.soft_target_update_rate (None when using hard updates)
 
-        if self.target_update_period is None:
-            # soft update
-            self.soft_update_target_critic(self.soft_target_update_rate)
-        else:
-            # hard update
-            if step%self.target_update_period==0:
-                self.update_target_critic()
+        with timers.phase("target_update"):
+            if self.target_update_period is None:
+                # soft update
+                self.soft_update_target_critic(self.soft_target_update_rate)
+            else:
+                # hard update
+                if step%self.target_update_period==0:
+                    self.update_target_critic()
 
         # Average the critic info over all of the steps
         critic_info = {
@@ -19,14 +19,36 @@ def mpc_config(
     cem_num_iters: Optional[int] = None,
     cem_num_elites: Optional[int] = None,
     cem_alpha: Optional[float] = None,
+    mppi_temperature: float = 1.0,
+    mppi_noise_std: float = 0.5,
+    mppi_noise_beta: float = 2.0,  # 0 = white noise, 2 = smooth (brownian) noise
+    mppi_num_iters: int = 1,
     initial_batch_size: int = 20000,  # number of transitions to collect with random policy at the start
     batch_size: int = 8000,  # number of transitions to collect per per iteration thereafter
     train_batch_size: int = 512,  # number of transitions to train each dynamics model per iteration
     num_iters: int = 20,
     replay_buffer_capacity: int = 1000000,
     num_agent_train_steps_per_iter: int = 20,
+    batched_ensemble_update: bool = True,  # train all ensemble members in one step
+    # "incremental": running statistics over new data only; "exact": recompute
+    # over the whole replay buffer; "validate": do both and log the difference
+    statistics_mode: str = "incremental",
     num_eval_trajectories: int = 10,
+    compile_mode: str = "none",  # One of "none", "compile" (torch.compile), or "script" (TorchScript)
 ):
+    # ModelBasedAgent.ensemble_forward calls the members through
+    # torch.func.functional_call under vmap, which swaps in each member's
+    # parameters; a TorchScript forward would ignore them and every member would
+    # predict with (and train) member 0's weights
+    assert compile_mode != "script" or not hasattr(torch, "func"), (
+        "compile_mode 'script' is not supported by the vmapped dynamics ensemble, use 'compile'"
+    )
+    assert statistics_mode in (
+        "incremental",
+        "exact",
+        "validate",
+    ), f"'{statistics_mode}' is not a valid statistics mode"
+
     # hardcoded for this assignment
     if env_name == "reacher-cs285-v0":
         ep_len = 200
@@ -36,12 +58,17 @@ def mpc_config(
         ep_len = 100
 
     def make_dynamics_model(ob_dim: int, ac_dim: int) -> nn.Module:
-        return ptu.build_mlp(
+        model = ptu.build_mlp(
             input_size=ob_dim + ac_dim,
             output_size=ob_dim,
             n_layers=num_layers,
             size=hidden_size,
         )
+        if not hasattr(torch, "func"):
+            # no vmap: the members are called one by one, so compile each of them
+            # (otherwise the agent compiles ensemble_forward instead)
+            model = ptu.compile_mlps(model, compile_mode)
+        return model
 
     def make_optimizer(params: nn.ParameterList):
         return torch.optim.Adam(params, lr=learning_rate)
@@ -54,6 +81,8 @@ def mpc_config(
     log_string = f"{env_name}_{exp_name}_l{num_layers}_h{hidden_size}_mpc{mpc_strategy}_horizon{mpc_horizon}_actionseq{mpc_num_action_sequences}"
     if mpc_strategy == "cem":
         log_string += f"_cem_iters{cem_num_iters}"
+    if mpc_strategy == "mppi":
+        log_string += f"_mppi_temp{mppi_temperature}_beta{mppi_noise_beta}"
 
     return {
         "agent_kwargs": {
@@ -66,6 +95,11 @@ def mpc_config(
             "cem_num_iters": cem_num_iters,
             "cem_num_elites": cem_num_elites,
             "cem_alpha": cem_alpha,
+            "mppi_temperature": mppi_temperature,
+            "mppi_noise_std": mppi_noise_std,
+            "mppi_noise_beta": mppi_noise_beta,
+            "mppi_num_iters": mppi_num_iters,
+            "compile_mode": compile_mode,
         },
         "make_env": make_env,
         "replay_buffer_capacity": replay_buffer_capacity,
@@ -76,5 +110,7 @@ def mpc_config(
         "initial_batch_size": initial_batch_size,
         "train_batch_size": train_batch_size,
         "num_agent_train_steps_per_iter": num_agent_train_steps_per_iter,
+        "batched_ensemble_update": batched_ensemble_update,
+        "statistics_mode": statistics_mode,
         "num_eval_trajectories": num_eval_trajectories,
     }
@@ -20,6 +20,10 @@ def sac_config(
     batch_size: int = 256,
     replay_buffer_capacity: int = 1000000,
     mbpo_rollout_length: int = 1,
+    # if > 0, branch this many model rollouts at once every mbpo_rollout_period
+    # SAC steps instead of one rollout per step
+    mbpo_rollout_batch_size: int = 0,
+    mbpo_rollout_period: int = 250,
     hidden_size: int = 128,
     num_layers: int = 3,
     actor_learning_rate: float = 3e-4,
@@ -41,19 +45,23 @@ def sac_config(
     temperature: float = 0.1,
     actor_fixed_std: Optional[float] = None,
     use_tanh: bool = True,
+    compile_mode: str = "none",  # One of "none", "compile" (torch.compile), or "script" (TorchScript)
 ):
     def make_critic(observation_shape: Tuple[int, ...], action_dim: int) -> nn.Module:
-        return StateActionCritic(
-            ob_dim=np.prod(observation_shape),
-            ac_dim=action_dim,
-            n_layers=num_layers,
-            size=hidden_size,
+        return ptu.compile_mlps(
+            StateActionCritic(
+                ob_dim=np.prod(observation_shape),
+                ac_dim=action_dim,
+                n_layers=num_layers,
+                size=hidden_size,
+            ),
+            compile_mode,
         )
 
     def make_actor(observation_shape: Tuple[int, ...], action_dim: int) -> nn.Module:
         assert len(observation_shape) == 1
         if actor_fixed_std is not None:
-            return MLPPolicy(
+            actor = MLPPolicy(
                 ac_dim=action_dim,
                 ob_dim=np.prod(observation_shape),
                 discrete=False,
@@ -64,7 +72,7 @@ def sac_config(
                 fixed_std=actor_fixed_std,
             )
         else:
-            return MLPPolicy(
+            actor = MLPPolicy(
                 ac_dim=action_dim,
                 ob_dim=np.prod(observation_shape),
                 discrete=False,
@@ -73,6 +81,7 @@ def sac_config(
                 use_tanh=use_tanh,
                 state_dependent_std=True,
             )
+        return ptu.compile_mlps(actor, compile_mode)
 
     def make_actor_optimizer(params: torch.nn.ParameterList) -> torch.optim.Optimizer:
         return torch.optim.Adam(params, lr=actor_learning_rate)
@@ -109,9 +118,12 @@ def sac_config(
             "soft_target_update_rate": soft_target_update_rate
             if use_soft_target_update
             else None,
+            "compile_mode": compile_mode,
         },
         "num_agent_train_steps_per_iter": num_agent_train_steps_per_iter,
         "batch_size": batch_size,
         "replay_buffer_capacity": replay_buffer_capacity,
         "mbpo_rollout_length": mbpo_rollout_length,
+        "mbpo_rollout_batch_size": mbpo_rollout_batch_size,
+        "mbpo_rollout_period": mbpo_rollout_period,
     }
@@ -0,0 +1,47 @@
+import numpy as np
+
+
+class RunningMeanStd:
+    """
+    Streaming per-feature mean and standard deviation.
+
+    Each call to `update` merges the moments of a new batch into the running
+    ones (Chan et al.'s parallel form of Welford's algorithm), so the cost is
+    proportional to the batch, not to everything seen so far. Moments are
+    accumulated in float64 to keep the merge numerically stable.
+    """
+
+    def __init__(self, shape):
+        self.count = 0
+        self.mean = np.zeros(shape, dtype=np.float64)
+        # sum of squared deviations from the mean
+        self.m2 = np.zeros(shape, dtype=np.float64)
+
+    def update(self, x: np.ndarray):
+        """
+        Args:
+            x: (n, *shape)
+        """
+        x = np.asarray(x, dtype=np.float64)
+        batch_count = x.shape[0]
+        if batch_count == 0:
+            return
+        batch_mean = x.mean(axis=0)
+        batch_m2 = ((x - batch_mean) ** 2).sum(axis=0)
+
+        total_count = self.count + batch_count
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * batch_count / total_count
+        self.m2 = self.m2 + batch_m2 + delta**2 * self.count * batch_count / total_count
+        self.count = total_count
+
+    @property
+    def var(self) -> np.ndarray:
+        # unbiased, to match torch.std
+        if self.count < 2:
+            return np.ones_like(self.m2)
+        return self.m2 / (self.count - 1)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.var)
@@ -0,0 +1,155 @@
+"""
+Per-phase wall-clock timers for the training loops.
+
+    from cs285.infrastructure import timers
+
+    timers.enable()
+    with timers.phase("env_step"):
+        env.step(action)
+    timers.count("env_steps")
+    ...
+    timers.log(logger, step)  # at log_interval
+
+Like ptu.device, the timers are module-level state, so agents and utils can
+time their own phases without having them passed in. Until enable() is
+called, phase() returns a shared no-op context manager and count() returns
+immediately.
+
+Phases can nest (e.g. "critic_update" inside "update"). Only top-level phases
+report a fraction of wall time (time/<name>_frac, which add up to at most 1);
+a nested phase reports its fraction of the enclosing phase instead
+(time/<name>_frac_of_<parent>).
+"""
+import collections
+import contextlib
+import time
+from typing import Dict, List, Optional
+
+
+enabled = False
+sync_cuda = False
+_window = 1000
+_phases: Dict[str, "_Phase"] = {}
+_active: List["_Phase"] = []  # the phases currently entered, outermost first
+_counters: Dict[str, int] = collections.defaultdict(int)
+_interval_start = time.perf_counter()
+
+_disabled_phase = contextlib.nullcontext()
+
+
+class _Phase:
+    """Times one phase; keeps the last `window` durations and the total since the last log."""
+
+    __slots__ = ("name", "parent", "durations", "interval_total", "interval_calls", "start")
+
+    def __init__(self, name: str, window: int):
+        self.name = name
+        self.parent = None  # the enclosing phase, if this one runs nested
+        self.durations = collections.deque(maxlen=window)
+        self.interval_total = 0.0
+        self.interval_calls = 0
+
+    def __enter__(self):
+        if sync_cuda:
+            _cuda_synchronize()
+        self.parent = _active[-1] if _active else None
+        _active.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if sync_cuda:
+            _cuda_synchronize()
+        _active.pop()
+        duration = time.perf_counter() - self.start
+        self.durations.append(duration)
+        self.interval_total += duration
+        self.interval_calls += 1
+        return False
+
+
+def _cuda_synchronize():
+    import torch
+
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+
+
+def _cuda_available() -> bool:
+    try:
+        import torch
+    except ImportError:
+        return False
+    return torch.cuda.is_available()
+
+
+def enable(window: int = 1000, synchronize_cuda: Optional[bool] = None):
+    """
+    Turns the timers on. With synchronize_cuda, every phase boundary waits for
+    the GPU, so GPU work is charged to the phase that launched it (at the cost
+    of some overlap); otherwise a phase only measures the kernel launches, and
+    the GPU time lands in whichever phase synchronizes next. By default it is
+    on whenever CUDA is available.
+    """
+    global enabled, sync_cuda, _window, _interval_start
+    enabled = True
+    sync_cuda = _cuda_available() if synchronize_cuda is None else synchronize_cuda
+    _window = window
+    _interval_start = time.perf_counter()
+
+
+def phase(name: str):
+    if not enabled:
+        return _disabled_phase
+    timer = _phases.get(name)
+    if timer is None:
+        timer = _phases[name] = _Phase(name, _window)
+    return timer
+
+
+def count(name: str, n: int = 1):
+    """Counts events (e.g. "env_steps", "updates") for the per-second rates."""
+    if enabled:
+        _counters[name] += n
+
+
+def summary(reset_interval: bool = True) -> dict:
+    """
+    For every phase: the mean and max duration (ms) over the rolling window,
+    and the fraction of wall time (or, for a nested phase, of its parent's
+    time) spent in it since the last summary; for every counter, its rate per
+    second since the last summary.
+    """
+    global _interval_start
+    now = time.perf_counter()
+    elapsed = max(now - _interval_start, 1e-9)
+
+    stats = {}
+    for name, timer in _phases.items():
+        if timer.durations:
+            stats[f"time/{name}_ms"] = 1000 * sum(timer.durations) / len(timer.durations)
+            stats[f"time/{name}_max_ms"] = 1000 * max(timer.durations)
+        if timer.parent is None:
+            stats[f"time/{name}_frac"] = timer.interval_total / elapsed
+        else:
+            stats[f"time/{name}_frac_of_{timer.parent.name}"] = timer.interval_total / max(
+                timer.parent.interval_total, 1e-9
+            )
+    for name, n in _counters.items():
+        stats[f"perf/{name}_per_sec"] = n / elapsed
+
+    if reset_interval:
+        for timer in _phases.values():
+            timer.interval_total = 0.0
+            timer.interval_calls = 0
+        _counters.clear()
+        _interval_start = now
+    return stats
+
+
+def log(logger, step: int):
+    """Logs summary() as scalars at `step`, if the timers are enabled."""
+    if not enabled:
+        return
+    for k, v in summary().items():
+        logger.log_scalar(v, k, step)
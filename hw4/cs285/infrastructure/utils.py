@@ -24,6 +24,9 @@ def sample_trajectory(
 ) -> Dict[str, np.ndarray]:
     """Sample a rollout in the environment from a policy."""
     ob = env.reset()
+    if hasattr(policy, "reset"):
+        # e.g. ModelBasedAgent: drop planner state from the previous episode
+        policy.reset()
     obs, acs, rewards, next_obs, dones, image_obs = [], [], [], [], [], []
     steps = 0
 
@@ -21,6 +21,8 @@ import tqdm
 
 from cs285.infrastructure import utils
 from cs285.infrastructure.logger import Logger
+from cs285.infrastructure import timers
+from cs285.infrastructure import signal_hooks
 
 from scripting_utils import make_logger, make_config
 
@@ -68,6 +70,44 @@ def collect_mbpo_rollout(
     }
 
 
+def collect_mbpo_rollouts_batched(
+    env: gym.Env,
+    mb_agent: ModelBasedAgent,
+    sac_agent: SoftActorCritic,
+    obs: np.ndarray,
+    rollout_len: int = 1,
+):
+    """
+    Branch one model rollout from each row of `obs` (num_rollouts, ob_dim) and
+    step all of them forward together. Every rollout sticks to one randomly
+    chosen ensemble member, as in `collect_mbpo_rollout`. The transitions are
+    returned flattened to (rollout_len * num_rollouts, ...) so they can be
+    inserted with a single `batched_insert`.
+    """
+    num_rollouts = obs.shape[0]
+    model_indices = np.random.randint(0, mb_agent.ensemble_size, size=(num_rollouts,))
+
+    all_obs, all_acs, all_rewards, all_next_obs = [], [], [], []
+    for _ in range(rollout_len):
+        acs = sac_agent.get_action(obs)
+        rewards, _ = env.get_reward(obs, acs)
+        next_obs = mb_agent.get_dynamics_predictions_per_member(model_indices, obs, acs)
+
+        all_obs.append(obs)
+        all_acs.append(acs)
+        all_rewards.append(rewards)
+        all_next_obs.append(next_obs)
+
+        obs = next_obs
+    return {
+        "observation": np.concatenate(all_obs, axis=0),
+        "action": np.concatenate(all_acs, axis=0),
+        "reward": np.concatenate(all_rewards, axis=0),
+        "next_observation": np.concatenate(all_next_obs, axis=0),
+        "done": np.zeros((rollout_len * num_rollouts,), dtype=bool),
+    }
+
+
 def run_training_loop(
     config: dict, logger: Logger, args: argparse.Namespace, sac_config: Optional[dict]
 ):
@@ -118,32 +158,42 @@ def run_training_loop(
         sac_replay_buffer = ReplayBuffer(sac_config["replay_buffer_capacity"])
         actor_agent = sac_agent
 
+    replay_buffers = {"replay_buffer": replay_buffer}
+    if sac_config is not None:
+        replay_buffers["sac_replay_buffer"] = sac_replay_buffer
+    hook = signal_hooks.install(
+        logger._log_dir, replay_buffers, args.profile_steps, args.profiler
+    )
+
     total_envsteps = 0
 
     for itr in range(config["num_iters"]):
         print(f"\n\n********** Iteration {itr} ************")
         # collect data
         print("Collecting data...")
-        if itr == 0:
-            # TODO(student): collect at least config["initial_batch_size"] transitions with a random policy
-            # HINT: Use `utils.RandomPolicy` and `utils.sample_trajectories`
-            trajs, envsteps_this_batch = utils.sample_trajectories(env,utils.RandomPolicy(env),config['initial_batch_size'],ep_len)
-        else:
-            # TODO(student): collect at least config["batch_size"] transitions with our `actor_agent`
-            trajs, envsteps_this_batch = utils.sample_trajectories(env,actor_agent,config['batch_size'],ep_len)
+        with timers.phase("collect"):
+            if itr == 0:
+                # TODO(student): collect at least config["initial_batch_size"] transitions with a random policy
+                # HINT: Use `utils.RandomPolicy` and `utils.sample_trajectories`
+                trajs, envsteps_this_batch = utils.sample_trajectories(env,utils.RandomPolicy(env),config['initial_batch_size'],ep_len)
+            else:
+                # TODO(student): collect at least config["batch_size"] transitions with our `actor_agent`
+                trajs, envsteps_this_batch = utils.sample_trajectories(env,actor_agent,config['batch_size'],ep_len)
+        timers.count("env_steps", envsteps_this_batch)
 
         total_envsteps += envsteps_this_batch
         logger.log_scalar(total_envsteps, "total_envsteps", itr)
 
         # insert newly collected data into replay buffer
-        for traj in trajs:
-            replay_buffer.batched_insert(
-                observations=traj["observation"],
-                actions=traj["action"],
-                rewards=traj["reward"],
-                next_observations=traj["next_observation"],
-                dones=traj["done"],
-            )
+        with timers.phase("insert"):
+            for traj in trajs:
+                replay_buffer.batched_insert(
+                    observations=traj["observation"],
+                    actions=traj["action"],
+                    rewards=traj["reward"],
+                    next_observations=traj["next_observation"],
+                    dones=traj["done"],
+                )
 
         # if doing MBPO, add the collected data to the SAC replay buffer as well
         if sac_config is not None:
@@ -157,12 +207,41 @@ def run_training_loop(
                     dones=traj["done"],
                 )
 
-        # update agent's statistics with the entire replay buffer
-        mb_agent.update_statistics(
-            obs=replay_buffer.observations[: len(replay_buffer)],
-            acs=replay_buffer.actions[: len(replay_buffer)],
-            next_obs=replay_buffer.next_observations[: len(replay_buffer)],
-        )
+        if config["statistics_mode"] in ("incremental", "validate"):
+            # update agent's statistics with only the newly collected data
+            mb_agent.update_statistics_incremental(
+                obs=np.concatenate([traj["observation"] for traj in trajs]),
+                acs=np.concatenate([traj["action"] for traj in trajs]),
+                next_obs=np.concatenate([traj["next_observation"] for traj in trajs]),
+            )
+            incremental_statistics = [
+                mb_agent.obs_acs_mean,
+                mb_agent.obs_acs_std,
+                mb_agent.obs_delta_mean,
+                mb_agent.obs_delta_std,
+            ]
+
+        if config["statistics_mode"] in ("exact", "validate"):
+            # update agent's statistics with the entire replay buffer
+            mb_agent.update_statistics(
+                obs=replay_buffer.observations[: len(replay_buffer)],
+                acs=replay_buffer.actions[: len(replay_buffer)],
+                next_obs=replay_buffer.next_observations[: len(replay_buffer)],
+            )
+
+        if config["statistics_mode"] == "validate":
+            exact_statistics = [
+                mb_agent.obs_acs_mean,
+                mb_agent.obs_acs_std,
+                mb_agent.obs_delta_mean,
+                mb_agent.obs_delta_std,
+            ]
+            statistics_error = max(
+                torch.max(torch.abs(a - b)).item()
+                for a, b in zip(incremental_statistics, exact_statistics)
+            )
+            logger.log_scalar(statistics_error, "statistics_max_abs_error", itr)
+            print(f"Incremental vs. exact statistics max abs error: {statistics_error}")
 
         # train agent
         print("Training agent...")
@@ -170,21 +249,41 @@ def run_training_loop(
         for _ in tqdm.trange(
             config["num_agent_train_steps_per_iter"], dynamic_ncols=True
         ):
+            hook.step()
             step_losses = []
             # TODO(student): train the dynamics models
             # HINT: train each dynamics model in the ensemble with a *different* batch of transitions!
             # Use `replay_buffer.sample` with config["train_batch_size"].
-            
-            for i in range(mb_agent.ensemble_size):
-                samples = replay_buffer.sample(config['train_batch_size'])
-                step_losses.append(
-                    mb_agent.update(
-                        i,samples['observations'],samples['actions'],samples['next_observations']
-                    ).reshape(-1)
-                )
-                # print(step_losses)
-            step_losses = np.concatenate(step_losses,axis=0)
+            if config["batched_ensemble_update"]:
+                # one independent batch per member, sampled and copied at once
+                with timers.phase("sample"):
+                    samples = replay_buffer.sample(
+                        mb_agent.ensemble_size * config["train_batch_size"]
+                    )
+                    samples = {
+                        k: v.reshape(mb_agent.ensemble_size, config["train_batch_size"], *v.shape[1:])
+                        for k, v in samples.items()
+                    }
+                with timers.phase("dynamics_update"):
+                    step_losses = mb_agent.update_ensemble(
+                        samples["observations"],
+                        samples["actions"],
+                        samples["next_observations"],
+                    )
+            else:
+                for i in range(mb_agent.ensemble_size):
+                    with timers.phase("sample"):
+                        samples = replay_buffer.sample(config['train_batch_size'])
+                    with timers.phase("dynamics_update"):
+                        step_losses.append(
+                            mb_agent.update(
+                                i,samples['observations'],samples['actions'],samples['next_observations']
+                            ).reshape(-1)
+                        )
+                    # print(step_losses)
+                step_losses = np.concatenate(step_losses,axis=0)
             all_losses.append(np.mean(step_losses))
+            timers.count("updates")
 
         # on iteration 0, plot the full learning curve
         if itr == 0:
@@ -197,6 +296,8 @@ def run_training_loop(
         # log the average loss
         loss = np.mean(all_losses)
         logger.log_scalar(loss, "dynamics_loss", itr)
+        # the planner's warm start was planned with the old models
+        mb_agent.reset()
 
         # for MBPO: now we need to train the SAC agent
         if sac_config is not None:
@@ -204,16 +305,42 @@ def run_training_loop(
             for i in tqdm.trange(
                 sac_config["num_agent_train_steps_per_iter"], dynamic_ncols=True
             ):
-                if sac_config["mbpo_rollout_length"] > 0:
+                hook.step()
+                if (
+                    sac_config["mbpo_rollout_length"] > 0
+                    and sac_config["mbpo_rollout_batch_size"] > 0
+                ):
+                    # every mbpo_rollout_period steps, branch a large batch of
+                    # rollouts from the "real" replay buffer at once
+                    if i % sac_config["mbpo_rollout_period"] == 0:
+                        with timers.phase("model_rollout"):
+                            rollout = collect_mbpo_rollouts_batched(
+                                env,
+                                mb_agent,
+                                sac_agent,
+                                replay_buffer.sample(sac_config["mbpo_rollout_batch_size"])[
+                                    "observations"
+                                ],
+                                sac_config["mbpo_rollout_length"],
+                            )
+                        sac_replay_buffer.batched_insert(
+                            observations=rollout["observation"],
+                            actions=rollout["action"],
+                            rewards=rollout["reward"],
+                            next_observations=rollout["next_observation"],
+                            dones=rollout["done"],
+                        )
+                elif sac_config["mbpo_rollout_length"] > 0:
                     # collect a rollout using the dynamics model
-                    rollout = collect_mbpo_rollout(
-                        env,
-                        mb_agent,
-                        sac_agent,
-                        # sample one observation from the "real" replay buffer
-                        replay_buffer.sample(1)["observations"][0],
-                        sac_config["mbpo_rollout_length"],
-                    )
+                    with timers.phase("model_rollout"):
+                        rollout = collect_mbpo_rollout(
+                            env,
+                            mb_agent,
+                            sac_agent,
+                            # sample one observation from the "real" replay buffer
+                            replay_buffer.sample(1)["observations"][0],
+                            sac_config["mbpo_rollout_length"],
+                        )
                     # insert it into the SAC replay buffer only
                     # print('type(rollout["action"])',type(rollout["action"]))
                     sac_replay_buffer.batched_insert(
@@ -224,26 +351,33 @@ def run_training_loop(
                         dones=rollout["done"],
                     )
                 # train SAC
-                batch = sac_replay_buffer.sample(sac_config["batch_size"])
-                sac_agent.update(
-                    batch["observations"],
-                    batch["actions"],
-                    batch["rewards"],
-                    batch["next_observations"],
-                    batch["dones"],
-                    i,
-                )
+                with timers.phase("sac_sample"):
+                    batch = sac_replay_buffer.sample(sac_config["batch_size"])
+                with timers.phase("sac_update"):
+                    sac_agent.update(
+                        batch["observations"],
+                        batch["actions"],
+                        batch["rewards"],
+                        batch["next_observations"],
+                        batch["dones"],
+                        i,
+                    )
+                timers.count("sac_updates")
+
+        # eval time is reported with the next iteration
+        timers.log(logger, itr)
 
         # Run evaluation
         if config["num_eval_trajectories"] == 0:
             continue
         print(f"Evaluating {config['num_eval_trajectories']} rollouts...")
-        trajs = utils.sample_n_trajectories(
-            eval_env,
-            policy=actor_agent,
-            ntraj=config["num_eval_trajectories"],
-            max_length=ep_len,
-        )
+        with timers.phase("eval"):
+            trajs = utils.sample_n_trajectories(
+                eval_env,
+                policy=actor_agent,
+                ntraj=config["num_eval_trajectories"],
+                max_length=ep_len,
+            )
         returns = [t["episode_statistics"]["r"] for t in trajs]
         ep_lens = [t["episode_statistics"]["l"] for t in trajs]
 
@@ -288,11 +422,17 @@ def main():
     parser.add_argument("--seed", type=int, default=1)
     parser.add_argument("--no_gpu", "-ngpu", action="store_true")
     parser.add_argument("--which_gpu", "-g", default=0)
+    parser.add_argument(
+        "--time_phases", action="store_true"
+    )  # log per-phase timings and env-steps/updates per second every iteration
+    signal_hooks.add_signal_args(parser)
 
     parser.add_argument('--my',action='store_true')
     parser.add_argument('--bird_method',type=int,default=0)
 
     args = parser.parse_args()
+    if args.time_phases:
+        timers.enable()
 
     ptu.set_additional_args(args={
         # 'learning rate':args.change_learning_rate,
@@ -311,8 +451,5 @@ def main():
 
 
 if __name__ == "__main__":
-    def signal_hander(x,y):
-        sys.stderr.write('[INFO] signal handeled')
-    signal.signal(signal.SIGINT,signal_hander)
-    signal.signal(signal.SIGHUP,signal_hander)
+    signal_hooks.ignore(signal.SIGINT, signal.SIGHUP)
     main()
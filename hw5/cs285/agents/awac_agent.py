@@ -58,9 +58,9 @@ class AWACAgent(DQNAgent):
         return (
             loss,
             {
-                "critic_loss": loss.item(),
-                "q_values": q_values.mean().item(),
-                "target_values": target_values.mean().item(),
+                "critic_loss": loss.detach(),
+                "q_values": q_values.detach().mean(),
+                "target_values": target_values.mean(),
             },
             {
                 "qa_values": qa_values,
@@ -108,7 +108,7 @@ class AWACAgent(DQNAgent):
         # if any([layer.weight.isnan().any() for layer in self.actor.logits_net if hasattr(layer,'weight')]):
         #     raise UnicodeTranslateError()
 
-        return loss.item()
+        return loss.detach()
 
     def update(self, observations: torch.Tensor, actions: torch.Tensor, rewards: torch.Tensor, next_observations: torch.Tensor, dones: torch.Tensor, step: int):
         metrics = super().update(observations, actions, rewards, next_observations, dones, step)
@@ -47,6 +47,6 @@ class CQLAgent(DQNAgent):
         # assert not (qa_values.isnan() | qa_values.isinf()).any(),qa_values
         additional_loss = torch.log(torch.sum(torch.exp(qa_values),dim=-1))-q_values
         second_term = self.cql_alpha * torch.mean(additional_loss,dim=0)
-        loss += second_term
+        loss = loss + second_term  # not in place: metrics["critic_loss"] is a view of loss
 
         return loss, metrics, variables
@@ -6,6 +6,7 @@ from torch import nn
 import numpy as np
 
 import cs285.infrastructure.pytorch_util as ptu
+from cs285.infrastructure import timers
 
 
 class DQNAgent(nn.Module):
@@ -92,9 +93,9 @@ class DQNAgent(nn.Module):
         return (
             loss,
             {
-                "critic_loss": loss.item(),
-                "q_values": q_values.mean().item(),
-                "target_values": target_values.mean().item(),
+                "critic_loss": loss.detach(),
+                "q_values": q_values.detach().mean(),
+                "target_values": target_values.mean(),
             },
             {
                 "qa_values": qa_values,
@@ -110,7 +111,7 @@ class DQNAgent(nn.Module):
         next_obs: torch.Tensor,
         done: torch.Tensor,
     ) -> dict:
-        """Update the DQN critic, and return stats for logging."""
+        """Update the DQN critic, and return stats for logging (as detached tensors, see ptu.to_scalars)."""
         loss, metrics, _ = self.compute_critic_loss(obs, action, reward, next_obs, done)
 
         self.critic_optimizer.zero_grad()
@@ -118,7 +119,7 @@ class DQNAgent(nn.Module):
         grad_norm = torch.nn.utils.clip_grad.clip_grad_norm_(
             self.critic.parameters(), self.clip_grad_norm or float("inf")
         )
-        metrics["grad_norm"] = grad_norm.item()
+        metrics["grad_norm"] = grad_norm.detach()
         self.critic_optimizer.step()
 
         self.lr_scheduler.step()
@@ -141,8 +142,10 @@ class DQNAgent(nn.Module):
         Update the DQN agent, including both the critic and target.
         """
         # TODO(student): paste in your code from HW3
-        critic_stats = self.update_critic(obs,action,reward,next_obs,done)
+        with timers.phase("critic_update"):
+            critic_stats = self.update_critic(obs,action,reward,next_obs,done)
         if step % self.target_update_period == 0:
-            self.update_target_critic()
+            with timers.phase("target_update"):
+                self.update_target_critic()
     
         return critic_stats
@@ -2,6 +2,7 @@ from typing import Optional
 import torch
 from torch import nn
 from cs285.agents.awac_agent import AWACAgent
+from cs285.infrastructure import timers
 
 from typing import Callable, Optional, Sequence, Tuple, List
 
@@ -68,10 +69,10 @@ class IQLAgent(AWACAgent):
         self.critic_optimizer.step()
 
         metrics = {
-            "q_loss": self.critic_loss(q_values, target_values).item(),
-            "q_values": q_values.mean().item(),
-            "target_values": target_values.mean().item(),
-            "q_grad_norm": grad_norm.item(),
+            "q_loss": loss.detach(),
+            "q_values": q_values.detach().mean(),
+            "target_values": target_values.mean(),
+            "q_grad_norm": grad_norm.detach(),
         }
 
         return metrics
@@ -114,11 +115,11 @@ class IQLAgent(AWACAgent):
         self.value_critic_optimizer.step()
 
         return {
-            "v_loss": loss.item(),
-            "vs_adv": (vs - target_values).mean().item(),
-            "vs": vs.mean().item(),
-            "target_values": target_values.mean().item(),
-            "v_grad_norm": grad_norm.item(),
+            "v_loss": loss.detach(),
+            "vs_adv": (vs.detach() - target_values).mean(),
+            "vs": vs.detach().mean(),
+            "target_values": target_values.mean(),
+            "v_grad_norm": grad_norm.detach(),
         }
 
     def update_critic(
@@ -147,12 +148,15 @@ class IQLAgent(AWACAgent):
         dones: torch.Tensor,
         step: int,
     ):
-        metrics = self.update_critic(observations, actions, rewards, next_observations, dones)
-        metrics["actor_loss"] = self.update_actor(observations, actions)
+        with timers.phase("critic_update"):
+            metrics = self.update_critic(observations, actions, rewards, next_observations, dones)
+        with timers.phase("actor_update"):
+            metrics["actor_loss"] = self.update_actor(observations, actions)
 
         if step % self.target_update_period == 0:
-            self.update_target_critic()
-            self.update_target_value_critic()
+            with timers.phase("target_update"):
+                self.update_target_critic()
+                self.update_target_value_critic()
         
         return metrics
 
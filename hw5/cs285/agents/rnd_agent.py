@@ -52,7 +52,7 @@ class RNDAgent(DQNAgent):
         loss.backward()
         self.rnd_optimizer.step()
 
-        return loss.item()
+        return loss.detach()
 
     def update(
         self,
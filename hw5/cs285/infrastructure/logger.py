@@ -1,19 +1,132 @@
 import os
+import atexit
+import signal
+import threading
 from tensorboardX import SummaryWriter
 import numpy as np
 
+class _ScalarAggregate:
+    """Running last/mean/min/max of one tag over a range of steps."""
+    __slots__ = ('first_step', 'last_step', 'last', 'total', 'min', 'max', 'count')
+
+    def __init__(self, scalar, step):
+        self.first_step = self.last_step = step
+        self.last = self.total = self.min = self.max = scalar
+        self.count = 1
+
+    def add(self, scalar, step):
+        self.last_step = step
+        self.last = scalar
+        self.total += scalar
+        self.min = min(self.min, scalar)
+        self.max = max(self.max, scalar)
+        self.count += 1
+
 class Logger:
-    def __init__(self, log_dir, n_logged_samples=10, summary_writer=None):
+    def __init__(self, log_dir, n_logged_samples=10, summary_writer=None, buffered=False,
+                 aggregate_steps=1000, write_secs=10):
+        """
+        With buffered=True, log_scalar only updates an in-memory aggregate per
+        tag and window of `aggregate_steps` steps (step // aggregate_steps); an
+        aggregate is queued when its window ends or the tag is logged in a later
+        window, and a background thread writes the queue every `write_secs`
+        seconds. Each aggregate is written at its last step as the tag itself
+        (the last value) and, if it covers several values, as <tag>/mean, /min
+        and /max.
+        flush() is then free to call every step; close() (also run at exit and
+        on SIGTERM) writes everything that's left.
+        """
         self._log_dir = log_dir
         print('########################')
         print('logging outputs to ', log_dir)
         print('########################')
         self._n_logged_samples = n_logged_samples
-        self._summ_writer = SummaryWriter(log_dir, flush_secs=1, max_queue=1)
+        self._buffered = buffered
+        if buffered:
+            self._summ_writer = SummaryWriter(log_dir, flush_secs=write_secs, max_queue=1000)
+            self._aggregate_steps = aggregate_steps
+            self._write_secs = write_secs
+            self._aggregates = {}
+            self._pending = []
+            self._lock = threading.Lock()
+            self._closed = threading.Event()
+            self._stop = threading.Event()  # tells the writer thread to exit
+            self._writer_thread = threading.Thread(target=self._write_loop, daemon=True)
+            self._writer_thread.start()
+            atexit.register(self.close)
+            self._install_sigterm_handler()
+        else:
+            self._summ_writer = SummaryWriter(log_dir, flush_secs=1, max_queue=1)
 
     def log_scalar(self, scalar, name, step_):
+        if self._buffered:
+            self._aggregate_scalar(scalar, name, step_)
+            return
         self._summ_writer.add_scalar('{}'.format(name), scalar, step_)
 
+    def _aggregate_scalar(self, scalar, name, step):
+        scalar = float(scalar)
+        with self._lock:
+            window = step // self._aggregate_steps
+            aggregate = self._aggregates.get(name)
+            if aggregate is not None and aggregate.first_step // self._aggregate_steps != window:
+                # the tag moved on to a later window: the previous one is complete
+                self._pending.append((name, self._aggregates.pop(name)))
+                aggregate = None
+            if aggregate is None:
+                aggregate = self._aggregates[name] = _ScalarAggregate(scalar, step)
+            else:
+                aggregate.add(scalar, step)
+            if (step + 1) % self._aggregate_steps == 0:
+                # last step of the window, nothing more can go into this aggregate
+                self._pending.append((name, self._aggregates.pop(name)))
+
+    def _write_loop(self):
+        while not self._stop.wait(self._write_secs):
+            self._write_pending()
+
+    def _write_pending(self, include_partial=False):
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if include_partial:
+                pending.extend(self._aggregates.items())
+                self._aggregates = {}
+        for name, aggregate in pending:
+            step = aggregate.last_step
+            self._summ_writer.add_scalar(name, aggregate.last, step)
+            if aggregate.count > 1:
+                self._summ_writer.add_scalar(name + '/mean', aggregate.total / aggregate.count, step)
+                self._summ_writer.add_scalar(name + '/min', aggregate.min, step)
+                self._summ_writer.add_scalar(name + '/max', aggregate.max, step)
+
+    def _install_sigterm_handler(self):
+        if threading.current_thread() is not threading.main_thread():
+            return
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def handler(signum, frame):
+            # the main thread may be inside _aggregate_scalar, holding the lock
+            # close() needs: only stop the writer here, and leave the drain to
+            # close() at exit, once SystemExit has unwound out of the lock
+            self._stop.set()
+            if callable(previous):
+                previous(signum, frame)
+            else:
+                raise SystemExit(128 + signum)
+
+        signal.signal(signal.SIGTERM, handler)
+
+    def close(self):
+        """Writes out all buffered scalars and closes the event file."""
+        if self._buffered:
+            if self._closed.is_set():
+                return
+            self._closed.set()
+            self._stop.set()
+            self._writer_thread.join()
+            self._write_pending(include_partial=True)
+        self._summ_writer.close()
+
     def log_scalars(self, scalar_dict, group_name, step, phase):
         """Will log all scalars in the same plot."""
         self._summ_writer.add_scalars('{}_{}'.format(group_name, phase), scalar_dict, step)
@@ -67,6 +180,8 @@ class Logger:
         self._summ_writer.export_scalars_to_json(log_path)
 
     def flush(self):
+        if self._buffered:
+            return  # the writer thread takes care of it
         self._summ_writer.flush()
 
 
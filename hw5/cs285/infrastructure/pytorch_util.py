@@ -93,3 +93,15 @@ def to_numpy(tensor: Union[torch.Tensor, dict]):
         return {k: to_numpy(v) for k, v in tensor.items()}
     else:
         return tensor.to("cpu").detach().numpy()
+
+
+def to_scalars(metrics: dict) -> dict:
+    """
+    Turns the detached 0-d tensors in a dict of metrics (as returned by the
+    agents' update functions) into floats, with a single device sync.
+    """
+    tensor_keys = [k for k, v in metrics.items() if isinstance(v, torch.Tensor)]
+    if not tensor_keys:
+        return dict(metrics)
+    values = torch.stack([metrics[k].detach().float() for k in tensor_keys]).tolist()
+    return {**metrics, **dict(zip(tensor_keys, values))}
@@ -0,0 +1,193 @@
+"""
+Signal hooks for inspecting a long run in place, without restarting it.
+
+    hook = signal_hooks.install(logger._log_dir, {"replay_buffer": replay_buffer})
+    for step in ...:
+        hook.step(step)
+        ...
+
+    kill -USR1 <pid>   # profile the next --profile_steps training steps
+    kill -USR2 <pid>   # dump the phase timers, replay buffer fill and RSS
+
+SIGUSR1 starts a torch.profiler capture (cProfile with --profiler cprofile, or
+if torch.profiler is unavailable) at the next step() and stops it after
+profile_steps steps. The torch capture is written to the log dir as a Chrome
+trace, profile_<step>.json (open it in chrome://tracing or Perfetto), plus a
+table of the most expensive ops in profile_<step>.txt; the cProfile one as
+profile_<step>.prof (pstats).
+
+SIGUSR2 prints the state to stderr and appends it to <log_dir>/state_dumps.jsonl.
+The phase timings are only there if the run was started with --time_phases.
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+from typing import Dict, Optional
+
+from cs285.infrastructure import timers
+
+
+def add_signal_args(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--profile_steps", type=int, default=100
+    )  # training steps captured after a SIGUSR1
+    parser.add_argument("--profiler", type=str, default="torch", choices=["torch", "cprofile"])
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process."""
+    import resource
+
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def ignore(*signums):
+    """Keeps the run alive on these signals (e.g. SIGINT, SIGHUP), only reporting them."""
+
+    def handler(signum, frame):
+        sys.stderr.write(f"[INFO] {signal.Signals(signum).name} ignored\n")
+
+    for signum in signums:
+        signal.signal(signum, handler)
+
+
+class SignalHook:
+    def __init__(
+        self,
+        log_dir: str,
+        replay_buffers: Optional[Dict[str, object]] = None,
+        profile_steps: int = 100,
+        profiler: str = "torch",
+    ):
+        self.log_dir = log_dir
+        self.replay_buffers = replay_buffers or {}
+        self.profile_steps = profile_steps
+        self.profiler = profiler
+
+        self.num_steps = 0
+        self.last_step = None
+        self._profile_requested = False
+        self._capture = None
+        self._capture_kind = None
+        self._capture_path = None
+        self._capture_steps_left = 0
+
+    def step(self, step: Optional[int] = None):
+        """Call once per training step; starts and stops requested profiler captures."""
+        self.last_step = self.num_steps if step is None else step
+        self.num_steps += 1
+        if self._capture is not None:
+            self._capture_steps_left -= 1
+            if self._capture_steps_left <= 0:
+                self._stop_capture()
+        elif self._profile_requested:
+            self._profile_requested = False
+            self._start_capture()
+
+    def _start_capture(self):
+        path = os.path.join(self.log_dir, f"profile_{self.last_step}")
+        kind = self.profiler
+        if kind == "torch":
+            try:
+                import torch
+                from torch.profiler import ProfilerActivity, profile
+
+                activities = [ProfilerActivity.CPU]
+                if torch.cuda.is_available():
+                    activities.append(ProfilerActivity.CUDA)
+                self._capture = profile(activities=activities)
+            except ImportError:
+                kind = "cprofile"
+        if kind == "cprofile":
+            import cProfile
+
+            self._capture = cProfile.Profile()
+            self._capture.enable()
+        else:
+            self._capture.start()
+
+        self._capture_kind = kind
+        self._capture_path = path
+        self._capture_steps_left = self.profile_steps
+        sys.stderr.write(
+            f"[INFO] profiling the next {self.profile_steps} steps with {kind} into {path}.*\n"
+        )
+
+    def _stop_capture(self):
+        capture, path = self._capture, self._capture_path
+        self._capture = None
+        if self._capture_kind == "cprofile":
+            capture.disable()
+            capture.dump_stats(path + ".prof")
+            sys.stderr.write(f"[INFO] wrote {path}.prof\n")
+            return
+        capture.stop()
+        capture.export_chrome_trace(path + ".json")
+        with open(path + ".txt", "w") as f:
+            f.write(capture.key_averages().table(sort_by="self_cpu_time_total", row_limit=40))
+        sys.stderr.write(f"[INFO] wrote {path}.json and {path}.txt\n")
+
+    def state(self) -> dict:
+        state = {
+            "time": time.strftime("%d-%m-%Y_%H-%M-%S"),
+            "step": self.last_step,
+            "rss_mb": rss_bytes() / 2**20,
+            "peak_rss_mb": peak_rss_bytes() / 2**20,
+            "replay_buffers": {
+                # len() of the hw3-5 buffers counts every insert, also past capacity
+                name: {
+                    "size": min(len(buffer), buffer.max_size),
+                    "capacity": buffer.max_size,
+                    "fill": min(len(buffer), buffer.max_size) / buffer.max_size,
+                    "inserted": len(buffer),
+                }
+                for name, buffer in self.replay_buffers.items()
+            },
+            "profiling": self._capture is not None,
+        }
+        if timers.enabled:
+            state["timers"] = timers.summary(reset_interval=False)
+        return state
+
+    def dump(self):
+        state = self.state()
+        sys.stderr.write("[INFO] state dump\n" + json.dumps(state, indent=2) + "\n")
+        with open(os.path.join(self.log_dir, "state_dumps.jsonl"), "a") as f:
+            f.write(json.dumps(state) + "\n")
+
+    def _on_sigusr1(self, signum, frame):
+        # only set a flag here; the capture is started by the training loop
+        self._profile_requested = True
+
+    def _on_sigusr2(self, signum, frame):
+        self.dump()
+
+
+def install(
+    log_dir: str,
+    replay_buffers: Optional[Dict[str, object]] = None,
+    profile_steps: int = 100,
+    profiler: str = "torch",
+) -> SignalHook:
+    """Installs the SIGUSR1 (profile) and SIGUSR2 (dump) handlers; call from the main thread."""
+    hook = SignalHook(log_dir, replay_buffers, profile_steps, profiler)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, hook._on_sigusr1)
+        signal.signal(signal.SIGUSR2, hook._on_sigusr2)
+    else:
+        print("[WARN] SIGUSR1/SIGUSR2 are not available on this platform")
+    return hook
@@ -17,6 +17,8 @@ import tqdm
 
 from cs285.infrastructure import utils
 from cs285.infrastructure.logger import Logger
+from cs285.infrastructure import timers
+from cs285.infrastructure import signal_hooks
 from cs285.infrastructure.replay_buffer import ReplayBuffer
 
 from scripting_utils import make_logger, make_config
@@ -82,26 +84,36 @@ def run_training_loop(config: dict, logger: Logger, args: argparse.Namespace):
 
     recent_observations = []
 
+    hook = signal_hooks.install(
+        logger._log_dir, {"replay_buffer": replay_buffer}, args.profile_steps, args.profiler
+    )
+
     for step in tqdm.trange(config["total_steps"], dynamic_ncols=True):
+        hook.step(step)
         if exploration_schedule is not None:
             epsilon = exploration_schedule.value(step)
-            action = agent.get_action(observation, epsilon)
+            with timers.phase("action"):
+                action = agent.get_action(observation, epsilon)
         else:
             epsilon = None
-            action = agent.get_action(observation)
+            with timers.phase("action"):
+                action = agent.get_action(observation)
 
-        next_observation, reward, done, info = env.step(action)
+        with timers.phase("env_step"):
+            next_observation, reward, done, info = env.step(action)
+        timers.count("env_steps")
         next_observation = np.asarray(next_observation)
 
         truncated = info.get("TimeLimit.truncated", False)
 
-        replay_buffer.insert(
-            observation=observation,
-            action=action,
-            reward=reward,
-            done=done and not truncated,
-            next_observation=next_observation,
-        )
+        with timers.phase("insert"):
+            replay_buffer.insert(
+                observation=observation,
+                action=action,
+                reward=reward,
+                done=done and not truncated,
+                next_observation=next_observation,
+            )
         recent_observations.append(observation)
 
         # Handle episode termination
@@ -114,37 +126,45 @@ def run_training_loop(config: dict, logger: Logger, args: argparse.Namespace):
             observation = next_observation
 
         # Main training loop
-        batch = replay_buffer.sample(config["batch_size"])
+        with timers.phase("sample"):
+            batch = replay_buffer.sample(config["batch_size"])
 
         # Convert to PyTorch tensors
-        batch = ptu.from_numpy(batch)
-
-        update_info = agent.update(
-            batch["observations"],
-            batch["actions"],
-            batch["rewards"] * (1 if config.get("use_reward", False) else 0),
-            batch["next_observations"],
-            batch["dones"],
-            step,
-        )
+        with timers.phase("h2d"):
+            batch = ptu.from_numpy(batch)
+
+        with timers.phase("update"):
+            update_info = agent.update(
+                batch["observations"],
+                batch["actions"],
+                batch["rewards"] * (1 if config.get("use_reward", False) else 0),
+                batch["next_observations"],
+                batch["dones"],
+                step,
+            )
+        timers.count("updates")
 
         # Logging code
         if epsilon is not None:
             update_info["epsilon"] = epsilon
 
         if step % args.log_interval == 0:
-            for k, v in update_info.items():
-                logger.log_scalar(v, k, step)
-            logger.flush()
+            with timers.phase("logging"):
+                update_info = ptu.to_scalars(update_info)
+                for k, v in update_info.items():
+                    logger.log_scalar(v, k, step)
+                timers.log(logger, step)
+                logger.flush()
 
         if step % args.eval_interval == 0:
             # Evaluate
-            trajectories = utils.sample_n_trajectories(
-                env,
-                agent,
-                args.num_eval_trajectories,
-                ep_len,
-            )
+            with timers.phase("eval"):
+                trajectories = utils.sample_n_trajectories(
+                    env,
+                    agent,
+                    args.num_eval_trajectories,
+                    ep_len,
+                )
             returns = [t["episode_statistics"]["r"] for t in trajectories]
             ep_lens = [t["episode_statistics"]["l"] for t in trajectories]
 
@@ -206,17 +226,32 @@ def main():
     parser.add_argument("--no_gpu", "-ngpu", action="store_true")
     parser.add_argument("--which_gpu", "-gpu_id", default=0)
     parser.add_argument("--log_interval", type=int, default=1)
+    parser.add_argument(
+        "--time_phases", action="store_true"
+    )  # log per-phase timings and env-steps/updates per second at log_interval
+    signal_hooks.add_signal_args(parser)
+    parser.add_argument(
+        "--buffered_logging", action="store_true"
+    )  # aggregate scalars in memory and write them from a background thread
+    parser.add_argument("--log_aggregate_steps", type=int, default=1000)
 
     parser.add_argument("--use_reward", action="store_true")
     parser.add_argument("--dataset_dir", type=str, required=True)
 
     args = parser.parse_args()
+    if args.time_phases:
+        timers.enable()
 
     # create directory for logging
     logdir_prefix = "hw5_explore_"  # keep for autograder
 
     config = make_config(args.config_file)
-    logger = make_logger(logdir_prefix, config)
+    logger = make_logger(
+        logdir_prefix,
+        config,
+        buffered=args.buffered_logging,
+        aggregate_steps=args.log_aggregate_steps,
+    )
 
     os.makedirs(args.dataset_dir, exist_ok=True)
     print(banner.format(env=config["env_name"], alg=config["agent"], dataset_dir=args.dataset_dir))
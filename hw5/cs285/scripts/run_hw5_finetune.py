@@ -17,6 +17,8 @@ import tqdm
 
 from cs285.infrastructure import utils
 from cs285.infrastructure.logger import Logger
+from cs285.infrastructure import timers
+from cs285.infrastructure import signal_hooks
 from cs285.infrastructure.replay_buffer import ReplayBuffer
 
 from scripting_utils import make_logger, make_config
@@ -80,22 +82,31 @@ def run_training_loop(config: dict, logger: Logger, args: argparse.Namespace):
     num_online_steps = config["total_steps"] - num_offline_steps
     epsilon = None
 
+    hook = signal_hooks.install(
+        logger._log_dir, {"replay_buffer": replay_buffer}, args.profile_steps, args.profiler
+    )
+
     for step in tqdm.trange(config["total_steps"], dynamic_ncols=True):
+        hook.step(step)
         # TODO(student): Borrow code from another online training script here. Only run the online training loop after `num_offline_steps` steps.
 
         if step > num_offline_steps:
             # do online training: collect one data from env and add to buffer
             epsilon = exploration_schedule.value(step-num_offline_steps)
-            action = agent.get_action(observation,epsilon=epsilon)
-            next_state,reward,done,info=env.step(action)
+            with timers.phase("action"):
+                action = agent.get_action(observation,epsilon=epsilon)
+            with timers.phase("env_step"):
+                next_state,reward,done,info=env.step(action)
+            timers.count("env_steps")
             truncated = info.get('TimeLimit.truncated', False)
-            replay_buffer.insert(
-                observation=observation,
-                action=action,
-                reward=reward,
-                next_observation=next_state,
-                done=done and not truncated
-            )
+            with timers.phase("insert"):
+                replay_buffer.insert(
+                    observation=observation,
+                    action=action,
+                    reward=reward,
+                    next_observation=next_state,
+                    done=done and not truncated
+                )
             recent_observations.append(observation)
             # Handle episode termination (copied from explore.py)
             if done:
@@ -104,37 +115,45 @@ def run_training_loop(config: dict, logger: Logger, args: argparse.Namespace):
                 observation = next_state
 
         # Main training loop
-        batch = replay_buffer.sample(config["batch_size"])
+        with timers.phase("sample"):
+            batch = replay_buffer.sample(config["batch_size"])
 
         # Convert to PyTorch tensors
-        batch = ptu.from_numpy(batch)
-
-        update_info = agent.update(
-            batch["observations"],
-            batch["actions"],
-            batch["rewards"], #* (1 if config.get("use_reward", False) else 0), # No! We must use rewards otherwise there is no way to get to the goal!!!
-            batch["next_observations"],
-            batch["dones"],
-            step,
-        )
+        with timers.phase("h2d"):
+            batch = ptu.from_numpy(batch)
+
+        with timers.phase("update"):
+            update_info = agent.update(
+                batch["observations"],
+                batch["actions"],
+                batch["rewards"], #* (1 if config.get("use_reward", False) else 0), # No! We must use rewards otherwise there is no way to get to the goal!!!
+                batch["next_observations"],
+                batch["dones"],
+                step,
+            )
+        timers.count("updates")
 
         # Logging code
         if epsilon is not None:
             update_info["epsilon"] = epsilon
 
         if step % args.log_interval == 0:
-            for k, v in update_info.items():
-                logger.log_scalar(v, k, step)
-            logger.flush()
+            with timers.phase("logging"):
+                update_info = ptu.to_scalars(update_info)
+                for k, v in update_info.items():
+                    logger.log_scalar(v, k, step)
+                timers.log(logger, step)
+                logger.flush()
 
         if step % args.eval_interval == 0:
             # Evaluate
-            trajectories = utils.sample_n_trajectories(
-                env,
-                agent,
-                args.num_eval_trajectories,
-                ep_len,
-            )
+            with timers.phase("eval"):
+                trajectories = utils.sample_n_trajectories(
+                    env,
+                    agent,
+                    args.num_eval_trajectories,
+                    ep_len,
+                )
             returns = [t["episode_statistics"]["r"] for t in trajectories]
             ep_lens = [t["episode_statistics"]["l"] for t in trajectories]
 
@@ -209,17 +228,32 @@ def main():
     parser.add_argument("--no_gpu", "-ngpu", action="store_true")
     parser.add_argument("--which_gpu", "-gpu_id", default=0)
     parser.add_argument("--log_interval", type=int, default=1)
+    parser.add_argument(
+        "--time_phases", action="store_true"
+    )  # log per-phase timings and env-steps/updates per second at log_interval
+    signal_hooks.add_signal_args(parser)
+    parser.add_argument(
+        "--buffered_logging", action="store_true"
+    )  # aggregate scalars in memory and write them from a background thread
+    parser.add_argument("--log_aggregate_steps", type=int, default=1000)
 
     parser.add_argument("--use_reward", action="store_true")
     parser.add_argument("--dataset_dir", type=str, required=True)
 
     args = parser.parse_args()
+    if args.time_phases:
+        timers.enable()
 
     # create directory for logging
     logdir_prefix = "hw5_finetune_"  # keep for autograder
 
     config = make_config(args.config_file)
-    logger = make_logger(logdir_prefix, config)
+    logger = make_logger(
+        logdir_prefix,
+        config,
+        buffered=args.buffered_logging,
+        aggregate_steps=args.log_aggregate_steps,
+    )
 
     os.makedirs(args.dataset_dir, exist_ok=True)
     print(
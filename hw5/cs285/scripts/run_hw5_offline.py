@@ -19,6 +19,8 @@ import tqdm
 from cs285.agents import agents
 from cs285.infrastructure import utils
 from cs285.infrastructure.logger import Logger
+from cs285.infrastructure import timers
+from cs285.infrastructure import signal_hooks
 from cs285.infrastructure.replay_buffer import MemoryEfficientReplayBuffer, ReplayBuffer
 
 from scripting_utils import make_logger, make_config
@@ -50,35 +52,48 @@ def run_training_loop(config: dict, logger: Logger, args: argparse.Namespace):
     with open(os.path.join(args.dataset_dir, f"{config['dataset_name']}.pkl"), "rb") as f:
         dataset = pickle.load(f)
 
+    hook = signal_hooks.install(
+        logger._log_dir, {"dataset": dataset}, args.profile_steps, args.profiler
+    )
+
     for step in tqdm.trange(config["training_steps"], dynamic_ncols=True):
+        hook.step(step)
         # Train with offline RL
-        batch = dataset.sample(config["batch_size"])
-
-        batch = {
-            k: ptu.from_numpy(v) if isinstance(v, np.ndarray) else v for k, v in batch.items()
-        }
-
-        metrics = agent.update(
-            batch["observations"],
-            batch["actions"],
-            batch["rewards"],
-            batch["next_observations"],
-            batch["dones"],
-            step,
-        )
+        with timers.phase("sample"):
+            batch = dataset.sample(config["batch_size"])
+
+        with timers.phase("h2d"):
+            batch = {
+                k: ptu.from_numpy(v) if isinstance(v, np.ndarray) else v for k, v in batch.items()
+            }
+
+        with timers.phase("update"):
+            metrics = agent.update(
+                batch["observations"],
+                batch["actions"],
+                batch["rewards"],
+                batch["next_observations"],
+                batch["dones"],
+                step,
+            )
+        timers.count("updates")
 
         if step % args.log_interval == 0:
-            for k, v in metrics.items():
-                logger.log_scalar(v, k, step)
+            with timers.phase("logging"):
+                metrics = ptu.to_scalars(metrics)
+                for k, v in metrics.items():
+                    logger.log_scalar(v, k, step)
+                timers.log(logger, step)
         
         if step % args.eval_interval == 0:
             # Evaluate
-            trajectories = utils.sample_n_trajectories(
-                env,
-                agent,
-                args.num_eval_trajectories,
-                ep_len,
-            )
+            with timers.phase("eval"):
+                trajectories = utils.sample_n_trajectories(
+                    env,
+                    agent,
+                    args.num_eval_trajectories,
+                    ep_len,
+                )
             returns = [t["episode_statistics"]["r"] for t in trajectories]
             ep_lens = [t["episode_statistics"]["l"] for t in trajectories]
 
@@ -114,16 +129,31 @@ def main():
     parser.add_argument("--no_gpu", "-ngpu", action="store_true")
     parser.add_argument("--which_gpu", "-gpu_id", default=0)
     parser.add_argument("--log_interval", type=int, default=1)
+    parser.add_argument(
+        "--time_phases", action="store_true"
+    )  # log per-phase timings and env-steps/updates per second at log_interval
+    signal_hooks.add_signal_args(parser)
+    parser.add_argument(
+        "--buffered_logging", action="store_true"
+    )  # aggregate scalars in memory and write them from a background thread
+    parser.add_argument("--log_aggregate_steps", type=int, default=1000)
 
     parser.add_argument("--dataset_dir", type=str, required=True)
 
     args = parser.parse_args()
+    if args.time_phases:
+        timers.enable()
 
     # create directory for logging
     logdir_prefix = "hw5_offline_"  # keep for autograder
 
     config = make_config(args.config_file)
-    logger = make_logger(logdir_prefix, config)
+    logger = make_logger(
+        logdir_prefix,
+        config,
+        buffered=args.buffered_logging,
+        aggregate_steps=args.log_aggregate_steps,
+    )
 
     run_training_loop(config, logger, args)
 
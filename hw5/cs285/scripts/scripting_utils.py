@@ -13,7 +13,7 @@ def make_config(config_file: str) -> dict:
     base_config_name = config_kwargs.pop("base_config")
     return cs285.env_configs.configs[base_config_name](**config_kwargs)
 
-def make_logger(logdir_prefix: str, config: dict) -> Logger:
+def make_logger(logdir_prefix: str, config: dict, **logger_kwargs) -> Logger:
     data_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../data")
 
     if not (os.path.exists(data_path)):
@@ -26,4 +26,4 @@ def make_logger(logdir_prefix: str, config: dict) -> Logger:
     if not (os.path.exists(logdir)):
         os.makedirs(logdir)
 
-    return Logger(logdir)
+    return Logger(logdir, **logger_kwargs)
@@ -1,58 +1,200 @@
-from tensorflow.core.util import event_pb2
-from tensorflow.python.lib.io import tf_record
-import os,json
-
-def remove_all_bytes(s):
-    if isinstance(s,list):
-        for i,item in enumerate(s):
-            s[i]=remove_all_bytes(item)
-        return s
-    elif isinstance(s,dict):
-        new_dic = dict()
-        for k,v in s.items():
-            new_dic[remove_all_bytes(k)]=remove_all_bytes(v)
-        return new_dic
-    else:
-        if isinstance(s,(str,float,int)):
-            return s
-        if isinstance(s,bytes):
-            return  s.hex()
-        return None
-
-def decode_file(file_path):
-    records = []
-    for record in tf_record.tf_record_iterator(file_path):
-        event = event_pb2.Event.FromString(record)
-        record_dict = {}
-        for field in event.DESCRIPTOR.fields:
-            value = getattr(event, field.name)
-            if field.name == 'summary':
-                value = {v.tag: v.simple_value for v in value.value}
-            if not field.name in ['wall_time','file_version','graph_def','log_message','session_log','tagged_run_metadata','meta_graph_def']:
-                record_dict[field.name] = value
-        records.append(record_dict)
-    return remove_all_bytes(records)
-
-def read_tfevents_file(file_path):
-    l = decode_file(file_path)
-    final = dict()
-    for dic in l:
-        step = dic['step']
-        if not step in final:
-            final[step]=dic['summary']
+import os,json,struct
+import numpy as np
+
+# A TensorFlow-free reader for tfevents files. A file is a sequence of TFRecords
+#   uint64 length | uint32 masked crc32c(length) | data[length] | uint32 masked crc32c(data)
+# whose data is an `Event` protobuf. Only the scalar summaries are decoded:
+#   Event:   step = 2 (int64), summary = 5 (Summary)
+#   Summary: value = 1 (repeated Value)
+#   Value:   tag = 1 (string), simple_value = 2 (float), tensor = 8 (TensorProto)
+# Records are read one at a time. The length CRC is always checked (a corrupt length
+# would derail the rest of the file); the data CRC only with verify=True, since the
+# pure-Python crc32c is slow. A truncated last record (a run still writing) is skipped.
+#
+# Every file gets a sidecar index <dir>/.scalar_index/<name>.npz (with "tfevents"
+# in the name replaced, so TensorBoard doesn't try to load it as an event file)
+# with the step/value arrays of all its scalar tags, which is rebuilt when the
+# file's size or mtime changes.
+
+_DT_FLOAT, _DT_DOUBLE = 1, 2
+
+def _crc32c_table():
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ (0x82f63b78 if crc & 1 else 0)
+        table.append(crc)
+    return table
+
+_CRC32C_TABLE = _crc32c_table()
+
+def _masked_crc32c(data):
+    crc = 0xffffffff
+    for b in data:
+        crc = _CRC32C_TABLE[(crc ^ b) & 0xff] ^ (crc >> 8)
+    crc ^= 0xffffffff
+    return (((crc >> 15) | (crc << 17)) + 0xa282ead8) & 0xffffffff
+
+def _varint(buf, pos):
+    result = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7f) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+def _fields(buf):
+    """Yields (field number, wire type, value) of a protobuf message; length-delimited values are memoryviews."""
+    pos, end = 0, len(buf)
+    while pos < end:
+        key, pos = _varint(buf, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _varint(buf, pos)
+        elif wire_type == 1:
+            value = buf[pos:pos+8]; pos += 8
+        elif wire_type == 2:
+            length, pos = _varint(buf, pos)
+            value = buf[pos:pos+length]; pos += length
+        elif wire_type == 5:
+            value = buf[pos:pos+4]; pos += 4
         else:
-            final[step].update(dic['summary'])
-    ret = []
-    for k,v in final.items():
-        d = {'step':k}
-        d.update(v)
-        ret.append(d.copy())
-    return ret
+            raise ValueError(f'unsupported wire type {wire_type}')
+        yield field, wire_type, value
+
+def _tensor_scalar(buf):
+    dtype, content, float_val, double_val = None, None, None, None
+    for field, wire_type, value in _fields(buf):
+        if field == 1:
+            dtype = value
+        elif field == 4:
+            content = bytes(value)
+        elif field == 5:
+            float_val = struct.unpack('<f', value)[0] if wire_type == 5 else struct.unpack_from('<f', value)[0]
+        elif field == 6:
+            double_val = struct.unpack('<d', value)[0] if wire_type == 1 else struct.unpack_from('<d', value)[0]
+    if dtype == _DT_FLOAT:
+        return float_val if float_val is not None else (struct.unpack_from('<f', content)[0] if content else None)
+    if dtype == _DT_DOUBLE:
+        return double_val if double_val is not None else (struct.unpack_from('<d', content)[0] if content else None)
+    return None
+
+def _scalar_values(summary):
+    for field, _, value in _fields(summary):
+        if field != 1:
+            continue
+        tag, scalar = None, None
+        for f, _, v in _fields(value):
+            if f == 1:
+                tag = bytes(v).decode('utf-8')
+            elif f == 2:
+                scalar = struct.unpack('<f', v)[0]
+            elif f == 8:
+                scalar = _tensor_scalar(v)
+        if tag is not None and scalar is not None:
+            yield tag, scalar
+
+def iter_records(file_path, verify=False):
+    """Yields the data of each record, reading the file one record at a time."""
+    with open(file_path, 'rb') as f:
+        while True:
+            pos = f.tell()
+            header = f.read(12)
+            if len(header) < 12:
+                return
+            length, length_crc = struct.unpack('<QI', header)
+            if _masked_crc32c(header[:8]) != length_crc:
+                raise ValueError(f'{file_path}: corrupt record length at offset {pos}')
+            data = f.read(length)
+            footer = f.read(4)
+            if len(footer) < 4:
+                return
+            if verify and _masked_crc32c(data) != struct.unpack('<I', footer)[0]:
+                raise ValueError(f'{file_path}: corrupt record data at offset {pos}')
+            yield memoryview(data)
+
+def iter_scalars(file_path, verify=False):
+    """Yields (step, tag, value) for every scalar summary in the file."""
+    for record in iter_records(file_path, verify):
+        step, summary = 0, None
+        for field, _, value in _fields(record):
+            if field == 2:
+                step = value
+            elif field == 5:
+                summary = value
+        if summary is not None:
+            for tag, scalar in _scalar_values(summary):
+                yield step, tag, scalar
+
+def _index_path(file_path):
+    folder, name = os.path.split(file_path)
+    return os.path.join(folder, '.scalar_index', name.replace('tfevents', 'scalars') + '.npz')
+
+def _build_index(file_path, tags=None):
+    steps, values = {}, {}
+    wanted = None if tags is None else set(tags)
+    for step, tag, scalar in iter_scalars(file_path):
+        if wanted is not None and tag not in wanted:
+            continue
+        steps.setdefault(tag, []).append(step)
+        values.setdefault(tag, []).append(scalar)
+    tags = sorted(steps)
+    return {tag: (np.array(steps[tag], dtype=np.int64), np.array(values[tag], dtype=np.float64)) for tag in tags}
+
+def read_scalars(file_path, tags=None, use_index=True):
+    """{tag: (steps, values)} for the requested scalar tags (all of them if tags is None)."""
+    stat = os.stat(file_path)
+    index_path = _index_path(file_path)
+    index = None
+    if use_index and os.path.exists(index_path):
+        try:
+            with np.load(index_path) as data:
+                if int(data['size']) == stat.st_size and float(data['mtime']) == stat.st_mtime:
+                    index_tags = [str(t) for t in data['tags']]
+                    wanted = index_tags if tags is None else [t for t in tags if t in index_tags]
+                    index = {t: (data[f'step_{index_tags.index(t)}'], data[f'value_{index_tags.index(t)}']) for t in wanted}
+                    return index
+        except (OSError, KeyError, ValueError):
+            pass
+
+    # the cached index holds every tag; without it only the requested ones are kept
+    index = _build_index(file_path, None if use_index else tags)
+    if use_index:
+        columns = {'size': stat.st_size, 'mtime': stat.st_mtime, 'tags': np.array(list(index), dtype=str)}
+        for i, (tag, (s, v)) in enumerate(index.items()):
+            columns[f'step_{i}'] = s
+            columns[f'value_{i}'] = v
+        try:
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+            tmp_path = f'{index_path[:-len(".npz")]}.{os.getpid()}.tmp.npz'
+            np.savez(tmp_path, **columns)
+            os.replace(tmp_path, index_path)
+        except OSError:
+            pass  # read-only log dir: just don't cache
+    if tags is None:
+        return index
+    return {t: index[t] for t in tags if t in index}
+
+def find_event_file(folder):
+    """The (latest) tfevents file in a run's log directory, skipping other outputs (and indices left by older versions)."""
+    files = sorted(f for f in os.listdir(folder) if f.startswith('events.out.tfevents') and not f.endswith('.npz'))
+    assert len(files) > 0, f'no tfevents file in {folder}'
+    return os.path.join(folder, files[-1])
+
+def read_tfevents_file(file_path, tags=None):
+    """[{'step': step, tag: value, ...}, ...] with one dict per step, sorted by step (not in file order)."""
+    final = dict()
+    for tag, (steps, values) in read_scalars(file_path, tags).items():
+        for step, value in zip(steps.tolist(), values.tolist()):
+            final.setdefault(step, {'step': step})[tag] = value
+    return [final[step] for step in sorted(final)]
 
 if __name__ == '__main__':
     file_path = '/root/CS285_homework/hw5/cs285/scripts/../../data/hw5_finetune_PointmassHard-v0_cql0.1_23-06-2024_21-29-30'.strip()
-    file_name = os.listdir(file_path)
-    file_path = os.path.abspath(os.path.join(file_path,file_name[0]))
+    file_path = os.path.abspath(find_event_file(file_path))
     print(file_path)
     assert os.path.exists(file_path)
 